@@ -0,0 +1,38 @@
+"""Add image variant columns to posts, profiles and stories
+
+Revision ID: 0004_image_variants
+Revises: 0003_schema_cleanup_and_indexes
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+# revision identifiers, used by Alembic.
+revision = "0004_image_variants"
+down_revision = "0003_schema_cleanup_and_indexes"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(conn: Connection, table: str, column: str) -> bool:
+    return any(col["name"] == column for col in sa.inspect(conn).get_columns(table))
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if not _column_exists(conn, "posts", "image_variants"):
+        op.add_column("posts", sa.Column("image_variants", sa.JSON(), nullable=True))
+
+    if not _column_exists(conn, "profiles", "profile_picture_variants"):
+        op.add_column("profiles", sa.Column("profile_picture_variants", sa.JSON(), nullable=True))
+
+    if not _column_exists(conn, "stories", "image_variants"):
+        op.add_column("stories", sa.Column("image_variants", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    # SQLite does not support DROP COLUMN easily; leave as no-op to keep safety
+    pass
@@ -0,0 +1,44 @@
+"""Add media_blobs table for the content-addressed media store
+
+Revision ID: 0005_media_blobs
+Revises: 0004_image_variants
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005_media_blobs"
+down_revision = "0004_image_variants"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_blobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("folder", sa.String(length=50), nullable=False),
+        sa.Column("path", sa.String(length=500), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("refcount", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("folder", "path", name="unique_media_blob_path"),
+    )
+    op.create_index("ix_media_blobs_id", "media_blobs", ["id"], unique=False)
+    op.create_index("ix_media_blobs_sha256", "media_blobs", ["sha256"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_blobs_sha256", table_name="media_blobs")
+    op.drop_index("ix_media_blobs_id", table_name="media_blobs")
+    op.drop_table("media_blobs")
@@ -0,0 +1,51 @@
+"""Add story_uploads table for resumable story uploads
+
+Revision ID: 0006_story_uploads
+Revises: 0005_media_blobs
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006_story_uploads"
+down_revision = "0005_media_blobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "story_uploads",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("file_ext", sa.String(length=10), nullable=False),
+        sa.Column("media_type", sa.String(length=10), nullable=False),
+        sa.Column("total_size", sa.BigInteger(), nullable=False),
+        sa.Column("received_size", sa.BigInteger(), nullable=False),
+        sa.Column("caption", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=True,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_story_uploads_user_id", "story_uploads", ["user_id"], unique=False)
+    op.create_index("ix_story_uploads_updated_at", "story_uploads", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_story_uploads_updated_at", table_name="story_uploads")
+    op.drop_index("ix_story_uploads_user_id", table_name="story_uploads")
+    op.drop_table("story_uploads")
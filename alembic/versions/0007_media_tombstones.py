@@ -0,0 +1,41 @@
+"""Add media_tombstones table for deferred media deletion
+
+Revision ID: 0007_media_tombstones
+Revises: 0006_story_uploads
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_media_tombstones"
+down_revision = "0006_story_uploads"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("folder", sa.String(length=50), nullable=False),
+        sa.Column("path", sa.String(length=500), nullable=False),
+        sa.Column("released", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_media_tombstones_id", "media_tombstones", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_tombstones_id", table_name="media_tombstones")
+    op.drop_table("media_tombstones")
@@ -0,0 +1,25 @@
+"""Add composite follows indexes for cursor-paginated follower lists
+
+Revision ID: 0009_follow_pagination_indexes
+Revises: 0008_cache_versions
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0009_follow_pagination_indexes"
+down_revision = "0008_cache_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_follows_following_id_id", "follows", ["following_id", "id"], unique=False)
+    op.create_index("ix_follows_follower_id_id", "follows", ["follower_id", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_follows_follower_id_id", table_name="follows")
+    op.drop_index("ix_follows_following_id_id", table_name="follows")
@@ -0,0 +1,61 @@
+"""Add user_suggestions and suggestion_dirty_users tables
+
+Revision ID: 0010_user_suggestions
+Revises: 0009_follow_pagination_indexes
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0010_user_suggestions"
+down_revision = "0009_follow_pagination_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_suggestions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("suggested_user_id", sa.Integer(), nullable=False),
+        sa.Column("mutual_count", sa.Integer(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column(
+            "computed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["suggested_user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "suggested_user_id", name="unique_user_suggestion"),
+    )
+    op.create_index("ix_user_suggestions_id", "user_suggestions", ["id"], unique=False)
+    op.create_index(
+        "ix_user_suggestions_user_id_rank", "user_suggestions", ["user_id", "rank"], unique=False
+    )
+
+    op.create_table(
+        "suggestion_dirty_users",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "marked_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("suggestion_dirty_users")
+    op.drop_index("ix_user_suggestions_user_id_rank", table_name="user_suggestions")
+    op.drop_index("ix_user_suggestions_id", table_name="user_suggestions")
+    op.drop_table("user_suggestions")
@@ -0,0 +1,25 @@
+"""Add composite comments index for paginated comment threads
+
+Revision ID: 0011_comment_thread_index
+Revises: 0010_user_suggestions
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0011_comment_thread_index"
+down_revision = "0010_user_suggestions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_comments_post_id_parent_id_id", "comments", ["post_id", "parent_id", "id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_comments_post_id_parent_id_id", table_name="comments")
@@ -0,0 +1,60 @@
+"""Add comments.replies_count and precomputed top comments on posts
+
+Revision ID: 0012_comment_counters
+Revises: 0011_comment_thread_index
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+
+# revision identifiers, used by Alembic.
+revision = "0012_comment_counters"
+down_revision = "0011_comment_thread_index"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(conn: Connection, table: str, column: str) -> bool:
+    return any(col["name"] == column for col in sa.inspect(conn).get_columns(table))
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if not _column_exists(conn, "comments", "replies_count"):
+        op.add_column(
+            "comments", sa.Column("replies_count", sa.Integer(), nullable=False, server_default="0")
+        )
+    op.execute(
+        sa.text(
+            "UPDATE comments SET replies_count = "
+            "(SELECT COUNT(*) FROM comments AS replies WHERE replies.parent_id = comments.id)"
+        )
+    )
+
+    if not _column_exists(conn, "posts", "top_comments"):
+        op.add_column("posts", sa.Column("top_comments", sa.JSON(), nullable=True))
+    if not _column_exists(conn, "posts", "top_comments_stale"):
+        op.add_column(
+            "posts",
+            sa.Column(
+                "top_comments_stale", sa.Boolean(), nullable=False, server_default=sa.false()
+            ),
+        )
+        op.create_index(
+            "ix_posts_top_comments_stale", "posts", ["top_comments_stale"], unique=False
+        )
+    # The first refresh run fills in every post that has comments
+    op.execute(
+        sa.text(
+            "UPDATE posts SET top_comments_stale = :stale WHERE id IN (SELECT DISTINCT post_id FROM comments)"
+        ).bindparams(stale=True)
+    )
+
+
+def downgrade() -> None:
+    # SQLite does not support DROP COLUMN easily; leave as no-op to keep safety
+    pass
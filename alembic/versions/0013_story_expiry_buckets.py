@@ -0,0 +1,54 @@
+"""Add story_expiry_buckets and bucket existing stories
+
+Revision ID: 0013_story_expiry_buckets
+Revises: 0012_comment_counters
+Create Date: 2026-10-19
+"""
+
+from datetime import datetime, timezone
+import math
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0013_story_expiry_buckets"
+down_revision = "0012_comment_counters"
+branch_labels = None
+depends_on = None
+
+
+def _bucket(expires_at) -> int:
+    if isinstance(expires_at, str):  # SQLite returns text for raw selects
+        expires_at = datetime.fromisoformat(expires_at)
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return math.ceil(expires_at.timestamp() / 60)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "story_expiry_buckets",
+        sa.Column("story_id", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["story_id"], ["stories.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("story_id"),
+    )
+    op.create_index(
+        "ix_story_expiry_buckets_bucket", "story_expiry_buckets", ["bucket"], unique=False
+    )
+
+    # Already expired stories land in past buckets and go on the reaper's next run
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text("SELECT id, expires_at FROM stories WHERE expires_at IS NOT NULL")
+    ).fetchall()
+    if rows:
+        buckets = sa.table("story_expiry_buckets", sa.column("story_id"), sa.column("bucket"))
+        op.bulk_insert(buckets, [{"story_id": row[0], "bucket": _bucket(row[1])} for row in rows])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_story_expiry_buckets_bucket", table_name="story_expiry_buckets")
+    op.drop_table("story_expiry_buckets")
@@ -0,0 +1,48 @@
+"""Add stories.views_count and an index for paging story viewers
+
+Revision ID: 0014_story_view_counts
+Revises: 0013_story_expiry_buckets
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+
+# revision identifiers, used by Alembic.
+revision = "0014_story_view_counts"
+down_revision = "0013_story_expiry_buckets"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(conn: Connection, table: str, column: str) -> bool:
+    return any(col["name"] == column for col in sa.inspect(conn).get_columns(table))
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if not _column_exists(conn, "stories", "views_count"):
+        op.add_column(
+            "stories", sa.Column("views_count", sa.Integer(), nullable=False, server_default="0")
+        )
+    op.execute(
+        sa.text(
+            "UPDATE stories SET views_count = "
+            "(SELECT COUNT(*) FROM story_views WHERE story_views.story_id = stories.id)"
+        )
+    )
+
+    op.create_index(
+        "ix_story_views_story_id_viewed_at_id",
+        "story_views",
+        ["story_id", "viewed_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_story_views_story_id_viewed_at_id", table_name="story_views")
+    # SQLite does not support DROP COLUMN easily; leave views_count in place
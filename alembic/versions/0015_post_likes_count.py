@@ -0,0 +1,40 @@
+"""Add posts.likes_count
+
+Revision ID: 0015_post_likes_count
+Revises: 0014_story_view_counts
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+
+# revision identifiers, used by Alembic.
+revision = "0015_post_likes_count"
+down_revision = "0014_story_view_counts"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(conn: Connection, table: str, column: str) -> bool:
+    return any(col["name"] == column for col in sa.inspect(conn).get_columns(table))
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if not _column_exists(conn, "posts", "likes_count"):
+        op.add_column(
+            "posts", sa.Column("likes_count", sa.Integer(), nullable=False, server_default="0")
+        )
+    op.execute(
+        sa.text(
+            "UPDATE posts SET likes_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.id)"
+        )
+    )
+
+
+def downgrade() -> None:
+    # SQLite does not support DROP COLUMN easily; leave as no-op to keep safety
+    pass
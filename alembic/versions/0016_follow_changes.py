@@ -0,0 +1,44 @@
+"""Add follow_changes log for incremental follow graph sync
+
+Revision ID: 0016_follow_changes
+Revises: 0015_post_likes_count
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0016_follow_changes"
+down_revision = "0015_post_likes_count"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "follow_changes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("follower_id", sa.Integer(), nullable=False),
+        sa.Column("following_id", sa.Integer(), nullable=False),
+        sa.Column("followed", sa.Boolean(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_follow_changes_id", "follow_changes", ["id"], unique=False)
+    op.create_index("ix_follow_changes_version", "follow_changes", ["version"], unique=False)
+    op.create_index("ix_follow_changes_created_at", "follow_changes", ["created_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_follow_changes_created_at", table_name="follow_changes")
+    op.drop_index("ix_follow_changes_version", table_name="follow_changes")
+    op.drop_index("ix_follow_changes_id", table_name="follow_changes")
+    op.drop_table("follow_changes")
@@ -13,6 +13,10 @@ celery_app = Celery(
     include=[
         "app.tasks.notifications",
         "app.tasks.stories",
+        "app.tasks.media",
+        "app.tasks.suggestions",
+        "app.tasks.comments",
+        "app.tasks.follows",
     ],
 )
 
@@ -30,7 +34,31 @@ celery_app.conf.update(
 celery_app.conf.beat_schedule = {
     "cleanup-expired-stories": {
         "task": "app.tasks.stories.cleanup_expired_stories",
-        "schedule": crontab(minute="*/10"),  # every 10 minutes (stories expire after 24 hours)
+        "schedule": crontab(minute="*"),  # every minute; only due expiry buckets are read
+    },
+    "cleanup-abandoned-uploads": {
+        "task": "app.tasks.stories.cleanup_abandoned_uploads",
+        "schedule": crontab(minute=15),  # hourly
+    },
+    "purge-media-tombstones": {
+        "task": "app.tasks.media.purge_media_tombstones",
+        "schedule": crontab(minute="*"),  # every minute; deletes also enqueue a purge directly
+    },
+    "refresh-top-comments": {
+        "task": "app.tasks.comments.refresh_top_comments",
+        "schedule": crontab(minute="*/2"),  # posts whose comments changed
+    },
+    "refresh-suggestions": {
+        "task": "app.tasks.suggestions.refresh_suggestions",
+        "schedule": crontab(minute="*/5"),  # users whose follows changed
+    },
+    "prune-follow-changes": {
+        "task": "app.tasks.follows.prune_follow_changes",
+        "schedule": crontab(minute=45),  # hourly
+    },
+    "rebuild-suggestions": {
+        "task": "app.tasks.suggestions.rebuild_suggestions",
+        "schedule": crontab(hour=3, minute=30),  # daily full recompute at 03:30 UTC
     },
     "cleanup-old-notifications": {
         "task": "app.tasks.notifications.cleanup_old_notifications",
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 
@@ -18,8 +20,51 @@ class Settings(BaseSettings):
     
     MAX_FILE_SIZE: int = 5 * 1024 * 1024
     ALLOWED_IMAGE_EXTENSIONS: set = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+    IMAGE_VARIANT_WIDTHS: list = [150, 320, 640, 1080]
+    IMAGE_VARIANT_QUALITY: int = 80
+    MEDIA_PURGE_BATCH_SIZE: int = 500
+    MEDIA_PURGE_WORKERS: int = 8
+    MEDIA_PURGE_MAX_ATTEMPTS: int = 5
+    
+    FOLLOW_GRAPH_SYNC_SECONDS: float = 1.0  # how often workers check for follows made elsewhere
+    FOLLOW_GRAPH_COMPACT_THRESHOLD: int = 10000  # pending edge changes before the CSR is rebuilt
+    FOLLOW_CHANGE_LOG_HOURS: int = 24  # workers further behind than this reload the whole graph
+    
+    SUGGESTIONS_TOP_K: int = 30  # suggestions stored per user
+    SUGGESTIONS_BATCH_ROWS: int = 2000  # users per sparse A @ A product (bounds worker memory)
+    
+    MUTUAL_FOLLOWERS_BUDGET_MS: float = 20.0  # beyond this the summary is returned as partial
+    MUTUAL_FOLLOWERS_CACHE_SIZE: int = 10000  # (viewer, profile) pairs kept per worker
+    
+    PROFILE_CACHE_SIZE: int = 10000  # rendered profiles kept per worker
+    # The local TTL bounds staleness from writes made in other processes
+    PROFILE_CACHE_LOCAL_SECONDS: float = 10.0
+    PROFILE_CACHE_SHARED_URL: Optional[str] = None  # "redis://host:6379/2", or "memory://" in tests
+    PROFILE_CACHE_SHARED_SECONDS: int = 300
+    
+    COMMENT_REPLIES_PREVIEW: int = 3  # replies embedded under each top-level comment
+    TOP_COMMENTS_PER_POST: int = 2  # embedded in post payloads, ranked by replies then recency
+    
+    SOCIAL_BATCH_MAX: int = 100  # targets accepted per bulk like/unlike/follow/unfollow request
+    BATCH_GET_MAX: int = 100  # ids accepted by /posts/batch and /users/batch
+    STREAM_CHUNK_SIZE: int = 500  # rows fetched per round trip by NDJSON list streams
+    
+    COMPRESSION_MIN_SIZE: int = 1024  # smaller responses go out uncompressed
+    COMPRESSION_THREAD_SIZE: int = 64 * 1024  # bodies this large are compressed off the event loop
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4  # 0-11; higher is smaller but much slower for dynamic responses
+    LIKE_WRITE_BEHIND: bool = False  # queue likes per worker and write them in batches
+    LIKE_FLUSH_SECONDS: float = 1.0
+    LIKE_BUFFER_MAX: int = 5000  # flush early once this many like operations are waiting
     
     STORY_EXPIRY_HOURS: int = 24
+    STORY_UPLOAD_EXPIRY_HOURS: int = 24  # abandoned resumable uploads are reaped after this
+    STORY_VIEW_FLUSH_SECONDS: float = 2.0  # buffered story views are written at least this often
+    STORY_VIEW_BUFFER_MAX: int = 5000  # flush early once this many views are waiting
+    STORY_VIEW_BATCH_MAX: int = 100  # story ids accepted per batch view request
+    STORY_VIEWERS_PREVIEW: int = 20  # viewers embedded in an owner's story response
+    STORY_TRAY_CACHE_SECONDS: int = 30  # cached trays are also dropped at the first story expiry
+    STORY_TRAY_CACHE_SIZE: int = 10000
     APP_NAME: str = "Instagram Clone"
     
     @field_validator('SECRET_KEY', 'REFRESH_SECRET_KEY')
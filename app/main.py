@@ -1,9 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
 
+from app.core.config import settings
+from app.core.database import SessionLocal
 from app.routers import users, posts, social, notifications
+from app.services import follow_graph
+from app.services.likes import like_buffer
+from app.services.profile_cache import profile_cache
+from app.services.story_views import story_view_buffer
+from app.utils.compression import CompressionMiddleware
+from app.utils.media_files import MediaStaticFiles
 
 
 app = FastAPI(
@@ -24,19 +31,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization", "Accept"],
-    expose_headers=["Content-Type", "X-Total-Count"]
+    expose_headers=["Content-Type", "X-Total-Count", "X-Next-Cursor"]
+)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    thread_size=settings.COMPRESSION_THREAD_SIZE,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+    exclude_paths=("/uploads",)
 )
 
 os.makedirs("uploads/posts", exist_ok=True)
 os.makedirs("uploads/profiles", exist_ok=True)
 os.makedirs("uploads/stories", exist_ok=True)
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", MediaStaticFiles(directory="uploads"), name="uploads")
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(posts.router, prefix="/api/posts", tags=["posts"])
 app.include_router(social.router, prefix="/api/social", tags=["social"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["notifications"])
 
+@app.on_event("startup")
+def warm_follow_graph():
+    """Build the follow index before the first request instead of during it."""
+    db = SessionLocal()
+    try:
+        follow_graph.warm(db)
+    except Exception:
+        # Tables missing (migrations not applied yet): the index loads lazily on first use
+        pass
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+def flush_write_buffers():
+    """Write out buffered story views and likes before the worker exits."""
+    story_view_buffer.stop()
+    like_buffer.stop()
+
 @app.get("/")
 def read_root():
     return {"message": "Instagram Clone API - Visit /docs for API documentation"}
@@ -45,3 +79,8 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics/profile-cache")
+def profile_cache_metrics():
+    """This worker's profile cache: hits per tier, misses, invalidations, memory and payload age."""
+    return profile_cache.stats()
+
@@ -1,7 +1,24 @@
 from app.models.user import User, Profile
 from app.models.post import Post, Tag
-from app.models.social import Comment, Like, Follow, Story, StoryView
+from app.models.social import (
+    Comment,
+    Like,
+    Follow,
+    FollowChange,
+    Story,
+    StoryUpload,
+    StoryView,
+    UserSuggestion,
+    SuggestionDirtyUser,
+    StoryExpiry
+)
 from app.models.notification import Notification
+from app.models.media import MediaBlob, MediaTombstone
+from app.models.cache import CacheVersion
 
-__all__ = ["User", "Profile", "Post", "Tag", "Comment", "Like", "Follow", "Story", "StoryView", "Notification"]
+__all__ = [
+    "User", "Profile", "Post", "Tag", "Comment", "Like", "Follow", "FollowChange", "Story",
+    "StoryUpload", "StoryView", "UserSuggestion", "SuggestionDirtyUser", "StoryExpiry",
+    "Notification", "MediaBlob", "MediaTombstone", "CacheVersion"
+]
 
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class MediaBlob(Base):
+    """One stored file in the content-addressed media store, shared by every row that references it."""
+
+    __tablename__ = "media_blobs"
+    __table_args__ = (UniqueConstraint("folder", "path", name="unique_media_blob_path"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    folder = Column(String(50), nullable=False)  # posts, profiles, stories
+    path = Column(String(500), nullable=False)  # ab/cd/<sha256><ext>, relative to uploads/<folder>
+    sha256 = Column(String(64), nullable=False, index=True)
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class MediaTombstone(Base):
+    """A file reference to drop, written in the same transaction as the row that used it."""
+
+    __tablename__ = "media_tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    folder = Column(String(50), nullable=False)
+    path = Column(String(500), nullable=False)
+    released = Column(Boolean, nullable=False, default=False)  # refcount already decremented
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
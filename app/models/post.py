@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Table
+from sqlalchemy import (
+    Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Table, JSON, false
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -18,10 +20,18 @@ class Post(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     caption = Column(Text, nullable=True)
     image = Column(String(500), nullable=False)
+    # {"<width>": "variants/<stem>_<width>w.webp"}
+    image_variants = Column(JSON(none_as_null=True), nullable=True)
     is_published = Column(Boolean, default=True)
     scheduled_time = Column(DateTime(timezone=True), nullable=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    top_comments = Column(JSON, nullable=True)  # precomputed by the refresh_top_comments task
+    top_comments_stale = Column(
+        Boolean, nullable=False, default=False, server_default=false(), index=True
+    )
+    # Maintained with every like write
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     user = relationship("User", back_populates="posts")
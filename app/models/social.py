@@ -1,16 +1,25 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey, UniqueConstraint,
+    Index, JSON
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Keyset pagination of a post's top-level comments
+        Index('ix_comments_post_id_parent_id_id', 'post_id', 'parent_id', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False, index=True)
     parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True, index=True)  # For replies
     text = Column(Text, nullable=False)
+    # Maintained on reply create/delete
+    replies_count = Column(Integer, nullable=False, default=0, server_default="0")
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -37,6 +46,9 @@ class Follow(Base):
     __tablename__ = "follows"
     __table_args__ = (
         UniqueConstraint('follower_id', 'following_id', name='unique_follower_following'),
+        # Keyset pagination of followers/following lists (newest first)
+        Index('ix_follows_following_id_id', 'following_id', 'id'),
+        Index('ix_follows_follower_id_id', 'follower_id', 'id'),
     )
     
     id = Column(Integer, primary_key=True, index=True)
@@ -48,26 +60,65 @@ class Follow(Base):
     follower = relationship("User", foreign_keys=[follower_id], back_populates="following")
     following = relationship("User", foreign_keys=[following_id], back_populates="followers")
 
+class FollowChange(Base):
+    """
+    Log of follows and unfollows keyed by the ``follow_graph`` version they were committed
+    under, so other workers replay what they missed instead of re-reading ``follows``.
+    """
+    __tablename__ = "follow_changes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    version = Column(Integer, nullable=False, index=True)
+    follower_id = Column(Integer, nullable=False)
+    following_id = Column(Integer, nullable=False)
+    followed = Column(Boolean, nullable=False)  # False for an unfollow
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
 class Story(Base):
     __tablename__ = "stories"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     image = Column(String(500), nullable=False)  # Now stores both images and videos
+    image_variants = Column(JSON(none_as_null=True), nullable=True)  # Only populated for images
     media_type = Column(String(10), nullable=False, default="image")  # "image" or "video"
     caption = Column(Text, nullable=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)  # Stories expire after 24 hours
+    # Maintained when buffered views are written
+    views_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     user = relationship("User", back_populates="stories")
     views = relationship("StoryView", back_populates="story", cascade="all, delete-orphan")
+    # Deleted with the story by the ORM: SQLite does not enforce the bucket's ON DELETE CASCADE
+    expiry = relationship("StoryExpiry", uselist=False, cascade="all, delete-orphan")
+
+
+class StoryUpload(Base):
+    """State of a resumable (chunked) story upload; bytes live in uploads/.tmp until finalized."""
+    __tablename__ = "story_uploads"
+    
+    id = Column(String(36), primary_key=True)  # uuid4, also names the partial file
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    file_ext = Column(String(10), nullable=False)
+    media_type = Column(String(10), nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    received_size = Column(BigInteger, nullable=False, default=0)
+    caption = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True
+    )
 
 
 class StoryView(Base):
     __tablename__ = "story_views"
     __table_args__ = (
         UniqueConstraint('story_id', 'viewer_id', name='unique_story_view'),
+        Index('ix_story_views_story_id_viewed_at_id', 'story_id', 'viewed_at', 'id'),
     )
     
     id = Column(Integer, primary_key=True, index=True)
@@ -78,3 +129,38 @@ class StoryView(Base):
     story = relationship("Story", back_populates="views")
     viewer = relationship("User", back_populates="story_views")
 
+
+
+class UserSuggestion(Base):
+    """
+    Precomputed "suggested for you" entry: a user followed by `mutual_count` of the
+    people `user_id` follows.
+    """
+    __tablename__ = "user_suggestions"
+    __table_args__ = (
+        UniqueConstraint('user_id', 'suggested_user_id', name='unique_user_suggestion'),
+        Index('ix_user_suggestions_user_id_rank', 'user_id', 'rank'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    suggested_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    mutual_count = Column(Integer, nullable=False)
+    rank = Column(Integer, nullable=False)  # 0 = best
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SuggestionDirtyUser(Base):
+    """Users whose follows changed since suggestions were last computed."""
+    __tablename__ = "suggestion_dirty_users"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    marked_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class StoryExpiry(Base):
+    """Expiry time wheel: each story sits in the bucket of the minute it expires in."""
+    __tablename__ = "story_expiry_buckets"
+    
+    story_id = Column(Integer, ForeignKey("stories.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(Integer, nullable=False, index=True)  # minutes since the epoch, rounded up
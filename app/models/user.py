@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -46,6 +46,7 @@ class Profile(Base):
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     bio = Column(Text, nullable=True)
     profile_picture = Column(String(500), nullable=True, default=None)
+    profile_picture_variants = Column(JSON(none_as_null=True), nullable=True)
     website = Column(String(200), nullable=True)
     location = Column(String(100), nullable=True)
     birth_date = Column(DateTime, nullable=True)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from typing import List
@@ -8,22 +8,31 @@ from app.core.security import get_current_active_user
 from app.models.user import User, Profile
 from app.models.notification import Notification
 from app.schemas.notification import NotificationResponse
+from app.utils.responses import model_list_response, ndjson_stream, wants_ndjson
 
 router = APIRouter()
 
 @router.get("/", response_model=List[NotificationResponse])
 def get_notifications(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
     skip: int = 0,
     limit: int = 50
 ):
-    """Get all notifications for current user"""
-    notifications = db.query(Notification).filter(
-        Notification.recipient_id == current_user.id
-    ).order_by(desc(Notification.timestamp)).offset(skip).limit(limit).all()
-    
-    return [get_notification_with_details(notification, db) for notification in notifications]
+    """
+    Get all notifications for current user, newest first.
+    Send `Accept: application/x-ndjson` to stream all of them after `skip`, one per line.
+    """
+    def notifications_query(session: Session):
+        return notification_rows(session, Notification.recipient_id == current_user.id).offset(skip)
+
+    if wants_ndjson(request):
+        return ndjson_stream(
+            notifications_query, lambda session, rows: notification_responses(rows)
+        )
+
+    return model_list_response(notification_responses(notifications_query(db).limit(limit).all()))
 
 @router.get("/unread", response_model=List[NotificationResponse])
 def get_unread_notifications(
@@ -31,12 +40,13 @@ def get_unread_notifications(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get unread notifications for current user"""
-    notifications = db.query(Notification).filter(
+    rows = notification_rows(
+        db,
         Notification.recipient_id == current_user.id,
         Notification.is_read == False
-    ).order_by(desc(Notification.timestamp)).all()
+    ).all()
     
-    return [get_notification_with_details(notification, db) for notification in notifications]
+    return model_list_response(notification_responses(rows))
 
 @router.get("/unread/count")
 def get_unread_count(
@@ -119,7 +129,34 @@ def clear_all_notifications(
     
     return None
 
-# Helper function
+# Helper functions
+def notification_rows(db: Session, *criteria):
+    """Notifications matching `criteria`, newest first, with their sender's username and picture."""
+    return (
+        db.query(Notification, User.username, Profile.profile_picture)
+        .outerjoin(User, User.id == Notification.sender_id)
+        .outerjoin(Profile, Profile.user_id == Notification.sender_id)
+        .filter(*criteria)
+        .order_by(desc(Notification.timestamp), desc(Notification.id))
+    )
+
+def notification_responses(rows) -> List[NotificationResponse]:
+    return [
+        NotificationResponse(
+            id=notification.id,
+            recipient_id=notification.recipient_id,
+            sender_id=notification.sender_id,
+            notification_type=notification.notification_type,
+            message=notification.message,
+            post_id=notification.post_id,
+            is_read=notification.is_read,
+            timestamp=notification.timestamp,
+            sender_username=username,
+            sender_profile_picture=profile_picture
+        )
+        for notification, username, profile_picture in rows
+    ]
+
 def get_notification_with_details(notification: Notification, db: Session):
     """Get notification with sender details"""
     sender = None
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import (
+    APIRouter, Depends, HTTPException, Query, Request, Response, status, UploadFile, File, Form
+)
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import desc
 from typing import List, Optional
+from datetime import datetime, timezone
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import get_current_active_user
-from app.models.user import User, Profile
+from app.models.user import User
 from app.models.post import Post, Tag, post_tags
-from app.models.social import Like, Comment
-from app.schemas.post import PostCreate, PostUpdate, PostResponse, TagResponse
-from app.utils.file_upload import save_upload_file, delete_file
+from app.schemas.post import PostCreate, PostUpdate, PostResponse, PostBatchItem, TagResponse
+from app.utils.file_upload import release_on_failure, save_upload_file, schedule_file_deletion
+from app.tasks.media import enqueue_image_variants, enqueue_media_purge
+from app.services.authorization import Authorizer, get_authorizer
+from app.services.profile_cache import invalidate_profiles
+from app.services.post_details import build_posts, post_load_options, post_versions
+from app.utils.batching import parse_ids
+from app.utils.etags import conditional, make_etag
+from app.utils.fieldsets import FIELDS_DESCRIPTION, parse_fields, sparse_response
 
 router = APIRouter()
 
@@ -24,14 +34,15 @@ async def create_post(
     """Create a new post"""
     filename = await save_upload_file(image, "posts")
     
-    db_post = Post(
-        user_id=current_user.id,
-        caption=caption,
-        image=filename,
-        is_published=True
-    )
-    db.add(db_post)
-    db.commit()
+    with release_on_failure(db, filename, "posts"):
+        db_post = Post(
+            user_id=current_user.id,
+            caption=caption,
+            image=filename,
+            is_published=True
+        )
+        db.add(db_post)
+        db.commit()
     db.refresh(db_post)
     
     if tags:
@@ -46,104 +57,129 @@ async def create_post(
             db_post.tags.append(db_tag)
         db.commit()
     
+    invalidate_profiles(current_user.id)
+    enqueue_image_variants("post", db_post.id)
+    
     return get_post_with_details(db_post, db, current_user.id)
 
 @router.get("/", response_model=List[PostResponse])
 def get_posts(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer),
     skip: int = 0,
-    limit: int = 20
+    limit: int = 20,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
-    """Get posts from followed users only (personalized feed)"""
-    from app.models.social import Follow
-    
-    following_ids = db.query(Follow.following_id).filter(Follow.follower_id == current_user.id).all()
-    following_ids = [fid[0] for fid in following_ids]
-    following_ids.append(current_user.id)
-    posts = db.query(Post).filter(
-        Post.user_id.in_(following_ids),
+    """
+    Get posts from followed users only (personalized feed).
+    Send the page's `ETag` back as `If-None-Match` to get a 304 when nothing on it changed.
+    """
+    wanted = parse_fields(fields, PostResponse)
+    page = db.query(Post).filter(
+        Post.user_id.in_(auth.feed_author_ids()),
         Post.is_published == True
-    ).order_by(desc(Post.timestamp)).offset(skip).limit(limit).all()
+    ).order_by(desc(Post.timestamp)).offset(skip).limit(limit)
     
-    return [get_post_with_details(post, db, current_user.id) for post in posts]
+    return post_page_response(db, request, response, page, current_user.id, wanted)
 
 @router.get("/following", response_model=List[PostResponse])
 def get_following_posts(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer),
     skip: int = 0,
-    limit: int = 20
+    limit: int = 20,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """Get posts from users that current user follows"""
-    from app.models.social import Follow
-    following_ids = db.query(Follow.following_id).filter(Follow.follower_id == current_user.id).all()
-    following_ids = [fid[0] for fid in following_ids]
-    following_ids.append(current_user.id)
-    
-    posts = db.query(Post).filter(
-        Post.user_id.in_(following_ids),
+    wanted = parse_fields(fields, PostResponse)
+    page = db.query(Post).filter(
+        Post.user_id.in_(auth.feed_author_ids()),
         Post.is_published == True
-    ).order_by(desc(Post.timestamp)).offset(skip).limit(limit).all()
+    ).order_by(desc(Post.timestamp)).offset(skip).limit(limit)
+    
+    return post_page_response(db, request, response, page, current_user.id, wanted)
+
+@router.get("/batch", response_model=List[PostBatchItem])
+def get_posts_batch(
+    ids: str = Query(..., description="Comma-separated post ids"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer)
+):
+    """Get many posts at once, in request order; ids that cannot be shown carry an `error`"""
+    post_ids = parse_ids(ids, "posts", settings.BATCH_GET_MAX)
+    posts = {post.id: post for post in db.query(Post).filter(Post.id.in_(post_ids)).all()}
+    visible = auth.visible_authors(post.user_id for post in posts.values())
+    shown = build_posts(
+        db,
+        [
+            posts[post_id] for post_id in post_ids
+            if post_id in posts and posts[post_id].user_id in visible
+        ],
+        current_user.id
+    )
+    hydrated = {post.id: post for post in shown}
     
-    return [get_post_with_details(post, db, current_user.id) for post in posts]
+    items = []
+    for post_id in post_ids:
+        if post_id not in posts:
+            items.append(PostBatchItem(id=post_id, error="not found"))
+        elif post_id not in hydrated:
+            items.append(PostBatchItem(id=post_id, error="forbidden"))
+        else:
+            items.append(PostBatchItem(id=post_id, post=hydrated[post_id]))
+    return items
 
 @router.get("/{post_id}", response_model=PostResponse)
 def get_post(
     post_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer)
 ):
-    """Get a specific post (only if from followed user or own post)"""
-    from app.models.social import Follow
-    
+    """Get a specific post (only if from followed user or own post). Supports `If-None-Match`."""
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    if post.user_id != current_user.id:
-        is_following = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == post.user_id
-        ).first()
-        
-        if not is_following:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only view posts from users you follow"
-            )
+    auth.require_can_view(post.user_id, "You can only view posts from users you follow")
     
+    etag = make_etag("post", post.id, post_versions(db, [post.id], current_user.id).get(post.id))
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
     return get_post_with_details(post, db, current_user.id)
 
 @router.get("/user/{user_id}", response_model=List[PostResponse])
 def get_user_posts(
     user_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer),
     skip: int = 0,
-    limit: int = 20
+    limit: int = 20,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """Get posts by a specific user (only if followed or own profile)"""
-    from app.models.social import Follow
-    
-    if user_id != current_user.id:
-        is_following = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == user_id
-        ).first()
-        
-        if not is_following:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only view posts from users you follow"
-            )
-    
-    posts = db.query(Post).filter(
+    auth.require_can_view(user_id, "You can only view posts from users you follow")
+    
+    wanted = parse_fields(fields, PostResponse)
+    page = db.query(Post).filter(
         Post.user_id == user_id,
         Post.is_published == True
-    ).order_by(desc(Post.timestamp)).offset(skip).limit(limit).all()
+    ).order_by(desc(Post.timestamp)).offset(skip).limit(limit)
     
-    return [get_post_with_details(post, db, current_user.id) for post in posts]
+    return post_page_response(db, request, response, page, current_user.id, wanted)
 
 @router.put("/{post_id}", response_model=PostResponse)
 def update_post(
@@ -161,6 +197,8 @@ def update_post(
     if post.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this post")
     
+    # Tag edits do not touch the posts row, so bump the version the ETags read explicitly
+    post.updated_at = datetime.now(timezone.utc)
     if post_data.caption is not None:
         post.caption = post_data.caption
     
@@ -197,44 +235,47 @@ def delete_post(
     if post.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this post")
     
-    delete_file(post.image, "posts")
+    schedule_file_deletion(db, post.image, "posts")
     
     db.delete(post)
     db.commit()
+    invalidate_profiles(current_user.id)
+    enqueue_media_purge()
     
     return None
 
-# Helper function
+# Helper functions
 def get_post_with_details(post: Post, db: Session, current_user_id: int = None):
     """Get post with user details, likes count, comments count, and is_liked status"""
-    user = db.query(User).filter(User.id == post.user_id).first()
-    profile = db.query(Profile).filter(Profile.user_id == post.user_id).first()
-    
-    likes_count = db.query(func.count(Like.id)).filter(Like.post_id == post.id).scalar()
-    comments_count = db.query(func.count(Comment.id)).filter(Comment.post_id == post.id).scalar()
-    
-    is_liked = False
-    if current_user_id:
-        is_liked = db.query(Like).filter(
-            Like.post_id == post.id,
-            Like.user_id == current_user_id
-        ).first() is not None
-    
-    post_dict = {
-        "id": post.id,
-        "user_id": post.user_id,
-        "caption": post.caption,
-        "image": post.image,
-        "is_published": post.is_published,
-        "scheduled_time": post.scheduled_time,
-        "timestamp": post.timestamp,
-        "username": user.username if user else None,
-        "user_profile_picture": profile.profile_picture if profile else None,
-        "likes_count": likes_count,
-        "comments_count": comments_count,
-        "tags": post.tags,
-        "is_liked": is_liked
-    }
-    
-    return PostResponse(**post_dict)
+    return build_posts(db, [post], current_user_id)[0]
 
+def post_page_response(
+    db: Session,
+    request: Request,
+    response: Response,
+    page,
+    current_user_id: int,
+    fields: Optional[set]
+):
+    """
+    One page of posts from `page` (a filtered, ordered and limited Post query) with an
+    ETag over its ids and post versions. Posts are only loaded and hydrated when the
+    client's copy is out of date.
+    """
+    post_ids = [post_id for (post_id,) in page.with_entities(Post.id).all()]
+    versions = post_versions(db, post_ids, current_user_id)
+    etag = make_etag(
+        "posts",
+        sorted(fields) if fields else None,
+        [(post_id, versions.get(post_id)) for post_id in post_ids]
+    )
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+
+    loaded = {
+        post.id: post for post in
+        db.query(Post).options(*post_load_options(fields)).filter(Post.id.in_(post_ids)).all()
+    }
+    posts = [loaded[post_id] for post_id in post_ids if post_id in loaded]
+    return sparse_response(build_posts(db, posts, current_user_id, fields), fields, response)
@@ -1,29 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import (
+    APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
+)
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
+import os
+import uuid
+import anyio
 
 from app.core.database import get_db
 from app.core.security import get_current_active_user
 from app.core.config import settings
 from app.models.user import User, Profile
 from app.models.post import Post
-from app.models.social import Comment, Like, Follow, Story, StoryView
+from app.models.social import Comment, Like, Follow, Story, StoryUpload, UserSuggestion
 from app.schemas.social import (
     CommentCreate,
     CommentResponse,
+    BatchResult,
+    LikeBatch,
     LikeCreate,
     LikeResponse,
+    FollowBatch,
     FollowCreate,
     FollowResponse,
     FollowerInfo,
+    SuggestedUser,
     StoryCreate,
     StoryResponse,
+    StoryRing,
+    StoryViewBatch,
+    StoryViewBatchResponse,
+    StoryUploadCreate,
+    StoryUploadResponse,
     StoryViewer
 )
-from app.utils.file_upload import save_upload_file, save_media_file, delete_file
-from app.tasks.notifications import create_notification
+from app.utils.file_upload import (
+    save_media_file,
+    release_on_failure,
+    schedule_file_deletion,
+    check_media_filename,
+    story_upload_path,
+    story_segment_path,
+    append_story_segment,
+    discard_story_upload
+)
+from app.utils.media_store import store_file
+from app.utils.batching import unique_batch
+from app.utils.fieldsets import FIELDS_DESCRIPTION, parse_fields, sparse_response
+from app.utils.db_writes import (
+    add_to_counters,
+    delete_returning,
+    insert_ignore_one,
+    insert_ignore_returning
+)
+from app.utils.responses import model_list_response, ndjson_stream, wants_ndjson
+from app.utils.pagination import decode_cursor, encode_cursor, set_next_cursor
+from app.tasks.notifications import create_notification, create_notifications
+from app.tasks.media import enqueue_image_variants, enqueue_media_purge
+from app.services import follow_graph
+from app.services.authorization import Authorizer, get_authorizer
+from app.services.comment_threads import build_threads, load_comment_page, load_reply_page
+from app.services.story_tray import build_stories, get_tray, invalidate_tray, load_viewer_page
+from app.services.story_views import record_views
+from app.services.likes import is_liked, liked_among, queue_like
+from app.services.profile_cache import invalidate_profiles
+from app.services.story_expiry import as_utc, schedule_expiry
+from app.services.suggestions import mark_dirty as mark_suggestions_dirty
 
 router = APIRouter()
 
@@ -32,24 +78,15 @@ router = APIRouter()
 def create_comment(
     comment_data: CommentCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer)
 ):
     """Create a comment on a post (only if from followed user or own post)"""
     post = db.query(Post).filter(Post.id == comment_data.post_id).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    if post.user_id != current_user.id:
-        is_following = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == post.user_id
-        ).first()
-        
-        if not is_following:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only comment on posts from users you follow"
-            )
+    auth.require_can_view(post.user_id, "You can only comment on posts from users you follow")
     
     if comment_data.parent_id:
         parent_comment = db.query(Comment).filter(Comment.id == comment_data.parent_id).first()
@@ -80,6 +117,7 @@ def create_comment(
         text=comment_data.text
     )
     db.add(db_comment)
+    track_comment_change(db, comment_data.post_id, comment_data.parent_id, 1)
     db.commit()
     db.refresh(db_comment)
     
@@ -111,32 +149,53 @@ def create_comment(
 @router.get("/comments/post/{post_id}", response_model=List[CommentResponse])
 def get_post_comments(
     post_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    replies_preview: int = Query(settings.COMMENT_REPLIES_PREVIEW, ge=0, le=20)
 ):
-    """Get all comments for a post (only if from followed user or own post)"""
+    """
+    Get a page of a post's comments, oldest first, each with its first replies
+    (only if from followed user or own post)
+    """
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    if post.user_id != current_user.id:
-        is_following = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == post.user_id
-        ).first()
-        
-        if not is_following:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only view comments on posts from users you follow"
-            )
+    auth.require_can_view(post.user_id, "You can only view comments on posts from users you follow")
+    
+    comments, next_cursor = load_comment_page(db, post_id, cursor, limit, replies_preview)
+    set_next_cursor(response, next_cursor)
+    return comments
+
+@router.get("/comments/{comment_id}/replies", response_model=List[CommentResponse])
+def get_comment_replies(
+    comment_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Get more replies to a comment, starting from the comment's `replies_next_cursor`"""
+    row = (
+        db.query(Comment.id, Post.user_id)
+        .join(Post, Post.id == Comment.post_id)
+        .filter(Comment.id == comment_id)
+        .first()
+    )
+    if not row:
+        raise HTTPException(status_code=404, detail="Comment not found")
     
-    comments = db.query(Comment).filter(
-        Comment.post_id == post_id,
-        Comment.parent_id == None
-    ).order_by(Comment.timestamp).all()
+    auth.require_can_view(row.user_id, "You can only view comments on posts from users you follow")
     
-    return [get_comment_with_details(comment, db) for comment in comments]
+    replies, next_cursor = load_reply_page(db, comment_id, cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return replies
 
 @router.delete("/comments/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_comment(
@@ -153,6 +212,7 @@ def delete_comment(
     if comment.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
     
+    track_comment_change(db, comment.post_id, comment.parent_id, -1)
     db.delete(comment)
     db.commit()
     
@@ -163,41 +223,38 @@ def delete_comment(
 def like_post(
     like_data: LikeCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer)
 ):
-    """Like a post (only if from followed user or own post)"""
+    """
+    Like a post (only if from followed user or own post). With LIKE_WRITE_BEHIND the like is queued,
+    `id` is null and the owner is notified once the flush writes it. Only the worker that queued it
+    reports the like before that flush, so behind several workers the liker's next read may not
+    show it yet.
+    """
     post = db.query(Post).filter(Post.id == like_data.post_id).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    if post.user_id != current_user.id:
-        is_following = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == post.user_id
-        ).first()
-        
-        if not is_following:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only like posts from users you follow"
-            )
-    
-    existing_like = db.query(Like).filter(
-        Like.user_id == current_user.id,
-        Like.post_id == like_data.post_id
-    ).first()
+    auth.require_can_view(post.user_id, "You can only like posts from users you follow")
     
-    if existing_like:
+    like_values = {
+        "user_id": current_user.id, "post_id": post.id, "timestamp": datetime.now(timezone.utc)
+    }
+    if settings.LIKE_WRITE_BEHIND:
+        if is_liked(db, current_user.id, post.id):
+            raise HTTPException(status_code=400, detail="Post already liked")
+        queue_like(current_user.id, post.id, True)
+        # The flush notifies the owner if the like is actually written
+        return LikeResponse(id=None, **like_values)
+    
+    # One statement: a double-tap race inserts nothing the second time instead of failing on
+    # the unique constraint
+    like_id = insert_ignore_one(db, Like, like_values, ("user_id", "post_id"))
+    if like_id is None:
         raise HTTPException(status_code=400, detail="Post already liked")
-    
-    # Create like
-    db_like = Like(
-        user_id=current_user.id,
-        post_id=like_data.post_id
-    )
-    db.add(db_like)
+    add_to_counters(db, Post.likes_count, {post.id: 1})
     db.commit()
-    db.refresh(db_like)
     
     if post.user_id != current_user.id:
         create_notification(
@@ -208,7 +265,7 @@ def like_post(
             post_id=post.id
         )
     
-    return db_like
+    return LikeResponse(id=like_id, **like_values)
 
 @router.delete("/likes/post/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 def unlike_post(
@@ -217,69 +274,149 @@ def unlike_post(
     current_user: User = Depends(get_current_active_user)
 ):
     """Unlike a post"""
-    like = db.query(Like).filter(
+    if settings.LIKE_WRITE_BEHIND:
+        if not is_liked(db, current_user.id, post_id):
+            raise HTTPException(status_code=404, detail="Like not found")
+        queue_like(current_user.id, post_id, False)
+        return None
+    
+    deleted = db.query(Like).filter(
         Like.user_id == current_user.id,
         Like.post_id == post_id
-    ).first()
+    ).delete(synchronize_session=False)
     
-    if not like:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Like not found")
     
-    db.delete(like)
+    add_to_counters(db, Post.likes_count, {post_id: -1})
     db.commit()
     
     return None
 
+@router.post("/likes/batch", response_model=BatchResult)
+def like_posts(
+    batch: LikeBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer)
+):
+    """Like many posts in one transaction (e.g. replaying offline actions); reports each outcome"""
+    post_ids = unique_batch(batch.post_ids, "posts")
+    posts = {
+        row.id: row for row in db.query(Post.id, Post.user_id).filter(Post.id.in_(post_ids)).all()
+    }
+    visible = auth.visible_authors(row.user_id for row in posts.values())
+    
+    result = BatchResult()
+    targets = []
+    for post_id in post_ids:
+        post = posts.get(post_id)
+        if post is None:
+            result.rejected[post_id] = "not found"
+        elif post.user_id not in visible:
+            result.rejected[post_id] = "forbidden"
+        else:
+            targets.append(post_id)
+    
+    if settings.LIKE_WRITE_BEHIND:
+        already = liked_among(db, current_user.id, targets)
+        liked = [post_id for post_id in targets if post_id not in already]
+        for post_id in liked:
+            queue_like(current_user.id, post_id, True)
+    else:
+        now = datetime.now(timezone.utc)
+        liked = [
+            post_id for (post_id,) in insert_ignore_returning(
+                db,
+                Like,
+                [
+                    {"user_id": current_user.id, "post_id": post_id, "timestamp": now}
+                    for post_id in targets
+                ],
+                ("user_id", "post_id"),
+                returning=("post_id",)
+            )
+        ]
+        add_to_counters(db, Post.likes_count, {post_id: 1 for post_id in liked})
+        db.commit()
+    
+    record_batch_outcome(result, targets, liked, "already liked")
+    if not settings.LIKE_WRITE_BEHIND:  # queued likes are notified by the flush that writes them
+        create_notifications([
+            {
+                "recipient_id": posts[post_id].user_id,
+                "sender_id": current_user.id,
+                "notification_type": "like",
+                "message": f"{current_user.username} liked your post",
+                "post_id": post_id
+            }
+            for post_id in liked if posts[post_id].user_id != current_user.id
+        ])
+    return result
+
+@router.post("/likes/batch/unlike", response_model=BatchResult)
+def unlike_posts(
+    batch: LikeBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Unlike many posts in one transaction; reports the outcome per post"""
+    post_ids = unique_batch(batch.post_ids, "posts")
+    
+    if settings.LIKE_WRITE_BEHIND:
+        liked = liked_among(db, current_user.id, post_ids)
+        unliked = [post_id for post_id in post_ids if post_id in liked]
+        for post_id in unliked:
+            queue_like(current_user.id, post_id, False)
+    else:
+        unliked = [
+            post_id for _, post_id in delete_returning(
+                db,
+                Like,
+                ("user_id", "post_id"),
+                [(current_user.id, post_id) for post_id in post_ids]
+            )
+        ]
+        add_to_counters(db, Post.likes_count, {post_id: -1 for post_id in unliked})
+        db.commit()
+    
+    result = BatchResult()
+    record_batch_outcome(result, post_ids, unliked, "not liked")
+    return result
+
 @router.get("/likes/post/{post_id}", response_model=List[FollowerInfo])
 def get_post_likes(
     post_id: int,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer)
 ):
-    """Get users who liked a post (only if from followed user or own post)"""
+    """
+    Get users who liked a post, newest first (only if from followed user or own post).
+    Send `Accept: application/x-ndjson` to stream them one per line.
+    """
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    if post.user_id != current_user.id:
-        is_following = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == post.user_id
-        ).first()
-        
-        if not is_following:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only view likes on posts from users you follow"
-            )
+    auth.require_can_view(post.user_id, "You can only view likes on posts from users you follow")
     
-    rows = (
-        db.query(User.id, User.username, Profile.profile_picture)
-        .join(Like, Like.user_id == User.id)
-        .outerjoin(Profile, Profile.user_id == User.id)
-        .filter(Like.post_id == post_id)
-        .all()
-    )
-
-    liked_user_ids = [row.id for row in rows]
-    following_lookup = set(
-        user_id for (user_id,) in db.query(Follow.following_id)
-        .filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id.in_(liked_user_ids)
+    def likers_query(session: Session):
+        return (
+            session.query(User.id, User.username, Profile.profile_picture)
+            .join(Like, Like.user_id == User.id)
+            .outerjoin(Profile, Profile.user_id == User.id)
+            .filter(Like.post_id == post_id)
+            .order_by(desc(Like.id))
         )
-        .all()
-    )
 
-    return [
-        FollowerInfo(
-            id=row.id,
-            username=row.username,
-            profile_picture=row.profile_picture,
-            is_following=row.id in following_lookup
-        )
-        for row in rows
-    ]
+    if wants_ndjson(request):
+        return stream_follower_infos(likers_query, current_user.id)
+
+    rows = likers_query(db).all()
+    following_lookup = auth.following_among(row.id for row in rows)
+    return model_list_response(follower_infos(rows, following_lookup))
 
 # ============ FOLLOWS ============
 @router.post("/follows", response_model=FollowResponse, status_code=status.HTTP_201_CREATED)
@@ -296,21 +433,24 @@ def follow_user(
     if follow_data.following_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
     
-    existing_follow = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.following_id == follow_data.following_id
-    ).first()
-    
-    if existing_follow:
+    follow_values = {
+        "follower_id": current_user.id,
+        "following_id": follow_data.following_id,
+        "timestamp": datetime.now(timezone.utc)
+    }
+    # One statement: a concurrent duplicate follow inserts nothing instead of failing on the
+    # unique constraint
+    follow_id = insert_ignore_one(db, Follow, follow_values, ("follower_id", "following_id"))
+    if follow_id is None:
         raise HTTPException(status_code=400, detail="Already following this user")
     
-    db_follow = Follow(
-        follower_id=current_user.id,
-        following_id=follow_data.following_id
+    graph_version = follow_graph.record_follow_change(
+        db, added=[(current_user.id, follow_data.following_id)]
     )
-    db.add(db_follow)
+    mark_suggestions_dirty(db, current_user.id)
     db.commit()
-    db.refresh(db_follow)
+    follow_graph.follow_graph.add_edge(current_user.id, follow_data.following_id, graph_version)
+    invalidate_profiles(current_user.id, follow_data.following_id)
     
     create_notification(
         recipient_id=follow_data.following_id,
@@ -319,7 +459,7 @@ def follow_user(
         message=f"{current_user.username} started following you"
     )
     
-    return db_follow
+    return FollowResponse(id=follow_id, **follow_values)
 
 @router.delete("/follows/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def unfollow_user(
@@ -328,90 +468,173 @@ def unfollow_user(
     current_user: User = Depends(get_current_active_user)
 ):
     """Unfollow a user"""
-    follow = db.query(Follow).filter(
+    deleted = db.query(Follow).filter(
         Follow.follower_id == current_user.id,
         Follow.following_id == user_id
-    ).first()
+    ).delete(synchronize_session=False)
     
-    if not follow:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Not following this user")
     
-    db.delete(follow)
+    graph_version = follow_graph.record_follow_change(db, removed=[(current_user.id, user_id)])
+    mark_suggestions_dirty(db, current_user.id)
     db.commit()
+    follow_graph.follow_graph.remove_edge(current_user.id, user_id, graph_version)
+    invalidate_profiles(current_user.id, user_id)
     
     return None
 
-@router.get("/followers/{user_id}", response_model=List[FollowerInfo])
-def get_followers(
-    user_id: int,
+@router.post("/follows/batch", response_model=BatchResult)
+def follow_users(
+    batch: FollowBatch,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get followers of a user"""
-    rows = (
-        db.query(User.id, User.username, Profile.profile_picture)
-        .join(Follow, Follow.follower_id == User.id)
-        .outerjoin(Profile, Profile.user_id == User.id)
-        .filter(Follow.following_id == user_id)
-        .all()
-    )
-
-    follower_ids = [row.id for row in rows]
-    following_lookup = set(
-        following_id
-        for (following_id,) in db.query(Follow.following_id)
-        .filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id.in_(follower_ids)
+    """Follow many users in one transaction (e.g. "follow all" suggestions); reports each outcome"""
+    user_ids = unique_batch(batch.user_ids, "users")
+    existing = {user_id for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids)).all()}
+    
+    result = BatchResult()
+    targets = []
+    for user_id in user_ids:
+        if user_id not in existing:
+            result.rejected[user_id] = "not found"
+        elif user_id == current_user.id:
+            result.rejected[user_id] = "cannot follow yourself"
+        else:
+            targets.append(user_id)
+    
+    now = datetime.now(timezone.utc)
+    followed = [
+        user_id for (user_id,) in insert_ignore_returning(
+            db,
+            Follow,
+            [
+                {"follower_id": current_user.id, "following_id": user_id, "timestamp": now}
+                for user_id in targets
+            ],
+            ("follower_id", "following_id"),
+            returning=("following_id",)
         )
-        .all()
-    )
+    ]
+    edges = [(current_user.id, user_id) for user_id in followed]
+    if edges:
+        graph_version = follow_graph.record_follow_change(db, added=edges)
+        mark_suggestions_dirty(db, current_user.id)
+    db.commit()
+    if edges:
+        follow_graph.follow_graph.apply_edges(edges, [], graph_version)
+        invalidate_profiles(current_user.id, *followed)
+    
+    record_batch_outcome(result, targets, followed, "already following")
+    create_notifications([
+        {
+            "recipient_id": user_id,
+            "sender_id": current_user.id,
+            "notification_type": "follow",
+            "message": f"{current_user.username} started following you"
+        }
+        for user_id in followed
+    ])
+    return result
 
-    return [
-        FollowerInfo(
-            id=row.id,
-            username=row.username,
-            profile_picture=row.profile_picture,
-            is_following=row.id in following_lookup
+@router.post("/follows/batch/unfollow", response_model=BatchResult)
+def unfollow_users(
+    batch: FollowBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Unfollow many users in one transaction; reports the outcome per user"""
+    user_ids = unique_batch(batch.user_ids, "users")
+    unfollowed = [
+        user_id for _, user_id in delete_returning(
+            db,
+            Follow,
+            ("follower_id", "following_id"),
+            [(current_user.id, user_id) for user_id in user_ids]
         )
-        for row in rows
     ]
+    edges = [(current_user.id, user_id) for user_id in unfollowed]
+    if edges:
+        graph_version = follow_graph.record_follow_change(db, removed=edges)
+        mark_suggestions_dirty(db, current_user.id)
+    db.commit()
+    if edges:
+        follow_graph.follow_graph.apply_edges([], edges, graph_version)
+        invalidate_profiles(current_user.id, *unfollowed)
+    
+    result = BatchResult()
+    record_batch_outcome(result, user_ids, unfollowed, "not following")
+    return result
+
+@router.get("/followers/{user_id}", response_model=List[FollowerInfo])
+def get_followers(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    Get followers of a user, newest first. Pass `X-Next-Cursor` back as `cursor` for the next page,
+    or send `Accept: application/x-ndjson` to stream the whole list one user per line.
+    """
+    return get_follow_page(
+        db, auth, request, response,
+        match=Follow.following_id, listed=Follow.follower_id,
+        user_id=user_id, cursor=cursor, limit=limit
+    )
 
 @router.get("/following/{user_id}", response_model=List[FollowerInfo])
 def get_following(
     user_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
 ):
-    """Get users that a user is following"""
-    rows = (
-        db.query(User.id, User.username, Profile.profile_picture)
-        .join(Follow, Follow.following_id == User.id)
-        .outerjoin(Profile, Profile.user_id == User.id)
-        .filter(Follow.follower_id == user_id)
-        .all()
+    """Get users that a user is following, newest first. Paginated like `/followers`."""
+    return get_follow_page(
+        db, auth, request, response,
+        match=Follow.follower_id, listed=Follow.following_id,
+        user_id=user_id, cursor=cursor, limit=limit
     )
 
-    following_ids = [row.id for row in rows]
-    mutual_lookup = set(
-        following_id
-        for (following_id,) in db.query(Follow.following_id)
-        .filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id.in_(following_ids)
-        )
+@router.get("/suggestions", response_model=List[SuggestedUser])
+def get_suggestions(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer),
+    limit: int = Query(10, ge=1, le=settings.SUGGESTIONS_TOP_K)
+):
+    """Users followed by many of the people you follow (recomputed in the background)."""
+    rows = (
+        db.query(User.id, User.username, Profile.profile_picture, UserSuggestion.mutual_count)
+        .join(UserSuggestion, UserSuggestion.suggested_user_id == User.id)
+        .outerjoin(Profile, Profile.user_id == User.id)
+        .filter(UserSuggestion.user_id == current_user.id, User.is_active == True)
+        .order_by(UserSuggestion.rank)
         .all()
     )
 
+    # Drop anyone followed since the suggestions were computed
+    followed = auth.following_among(row.id for row in rows)
     return [
-        FollowerInfo(
+        SuggestedUser(
             id=row.id,
             username=row.username,
             profile_picture=row.profile_picture,
-            is_following=row.id in mutual_lookup
+            mutual_count=row.mutual_count
         )
         for row in rows
-    ]
+        if row.id not in followed
+    ][:limit]
 
 # ============ STORIES ============
 @router.post("/stories", response_model=StoryResponse, status_code=status.HTTP_201_CREATED)
@@ -423,88 +646,231 @@ async def create_story(
 ):
     """Create a new story (image or video)"""
     filename, media_type = await save_media_file(media, "stories")
-    expires_at = datetime.now(timezone.utc) + timedelta(hours=settings.STORY_EXPIRY_HOURS)
+    db_story = create_story_record(db, current_user.id, filename, media_type, caption)
+    
+    return get_story_with_details(db_story, db, current_user_id=current_user.id, include_viewers=True)
+
+# ============ RESUMABLE STORY UPLOADS ============
+@router.post(
+    "/stories/uploads", response_model=StoryUploadResponse, status_code=status.HTTP_201_CREATED
+)
+def initiate_story_upload(
+    upload_data: StoryUploadCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Start a resumable story upload; send the bytes with PUT, then finalize with /complete"""
+    file_ext, media_type, max_size = check_media_filename(upload_data.filename)
+    if upload_data.size > max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size for {media_type}: {max_size / (1024*1024):.1f}MB"
+        )
     
-    db_story = Story(
+    upload = StoryUpload(
+        id=str(uuid.uuid4()),
         user_id=current_user.id,
-        image=filename,
+        file_ext=file_ext,
         media_type=media_type,
-        caption=caption,
-        expires_at=expires_at
+        total_size=upload_data.size,
+        received_size=0,
+        caption=upload_data.caption
     )
-    db.add(db_story)
+    db.add(upload)
     db.commit()
-    db.refresh(db_story)
+    db.refresh(upload)
+    
+    open(story_upload_path(upload.id), "wb").close()
+    
+    return get_story_upload_response(upload)
+
+@router.get("/stories/uploads/{upload_id}", response_model=StoryUploadResponse)
+def get_story_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Return how many bytes the server has, so the client knows where to resume"""
+    upload = get_own_story_upload(upload_id, db, current_user)
+    return get_story_upload_response(upload)
+
+@router.put("/stories/uploads/{upload_id}", response_model=StoryUploadResponse)
+async def upload_story_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Append a chunk (raw request body) at `offset`, which must equal the current offset.
+    Bytes received before a dropped connection are kept, so the client only resends the rest.
+    """
+    upload = await run_in_threadpool(get_own_story_upload, upload_id, db, current_user)
+    
+    if offset != upload.received_size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Offset mismatch. Resume from offset {upload.received_size}"
+        )
+    
+    # The body goes to a segment of its own; only the PUT that claims `offset` copies it into
+    # the upload
+    segment_path = story_segment_path(upload.id)
+    try:
+        received = 0
+        async with await anyio.open_file(segment_path, "wb") as segment:
+            try:
+                async for chunk in request.stream():
+                    if offset + received + len(chunk) > upload.total_size:
+                        raise HTTPException(
+                            status_code=400, detail="Chunk exceeds declared upload size"
+                        )
+                    await segment.write(chunk)
+                    received += len(chunk)
+            except ClientDisconnect:
+                # Keep what arrived; the client resumes from the offset it reads back
+                pass
+        
+        claimed = await run_in_threadpool(
+            append_story_chunk, db, upload.id, offset, segment_path, received
+        )
+    finally:
+        if os.path.exists(segment_path):
+            os.remove(segment_path)
+    
+    if not claimed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Upload was modified concurrently"
+        )
+    
+    await run_in_threadpool(db.refresh, upload)
+    return get_story_upload_response(upload)
+
+@router.post(
+    "/stories/uploads/{upload_id}/complete",
+    response_model=StoryResponse,
+    status_code=status.HTTP_201_CREATED
+)
+def complete_story_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Finalize a fully received upload into a story"""
+    upload = get_own_story_upload(upload_id, db, current_user)
+    
+    if upload.received_size != upload.total_size:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Upload incomplete: received {upload.received_size} of {upload.total_size} bytes"
+            )
+        )
+    
+    file_ext, media_type, caption = upload.file_ext, upload.media_type, upload.caption
+    # Claim the upload before touching its file, so a concurrent /complete deletes nothing and
+    # gets a 409. The claim commits on its own: storing the file writes its blob reference
+    # through another session, which must not wait on this one
+    claimed = db.query(StoryUpload).filter(
+        StoryUpload.id == upload.id,
+        StoryUpload.received_size == StoryUpload.total_size
+    ).delete(synchronize_session=False)
+    db.commit()
+    if not claimed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Upload is already being completed"
+        )
+    
+    partial_path = story_upload_path(upload_id)
+    if not os.path.exists(partial_path):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE, detail="Upload data is gone; start a new upload"
+        )
+    try:
+        filename = store_file(partial_path, "stories", file_ext)
+    finally:
+        # Nothing points at the partial file once the upload is claimed
+        discard_story_upload(upload_id)
+    db_story = create_story_record(db, current_user.id, filename, media_type, caption)
     
     return get_story_with_details(db_story, db, current_user_id=current_user.id, include_viewers=True)
 
+@router.delete("/stories/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+def abort_story_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Abandon a resumable upload and discard the received bytes"""
+    upload = get_own_story_upload(upload_id, db, current_user)
+    
+    db.delete(upload)
+    db.commit()
+    discard_story_upload(upload_id)
+    
+    return None
+
 @router.get("/stories", response_model=List[StoryResponse])
 def get_stories(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """Get active stories from followed users"""
-    following_ids = db.query(Follow.following_id).filter(Follow.follower_id == current_user.id).all()
-    following_ids = [fid[0] for fid in following_ids]
-    following_ids.append(current_user.id)
-    
+    wanted = parse_fields(fields, StoryResponse)
     now = datetime.now(timezone.utc)
     stories = db.query(Story).filter(
-        Story.user_id.in_(following_ids),
+        Story.user_id.in_(auth.feed_author_ids()),
         Story.expires_at > now
     ).order_by(Story.timestamp).all()
     
-    return [
-        get_story_with_details(
-            story,
-            db,
-            current_user_id=current_user.id
-        )
-        for story in stories
-    ]
+    return sparse_response(
+        build_stories(db, stories, current_user_id=current_user.id, fields=wanted), wanted
+    )
+
+@router.get("/stories/tray", response_model=List[StoryRing])
+def get_story_tray(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer)
+):
+    """
+    Story rings of followed users (own ring first, then unseen, then seen); open a ring
+    with /stories/user/{user_id}
+    """
+    return get_tray(db, current_user.id, auth.feed_author_ids())
 
 @router.get("/stories/user/{user_id}", response_model=List[StoryResponse])
 def get_user_stories(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """Get active stories from a specific user (only if followed or own stories)"""
-    if user_id != current_user.id:
-        is_following = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == user_id
-        ).first()
-        
-        if not is_following:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only view stories from users you follow"
-            )
+    auth.require_can_view(user_id, "You can only view stories from users you follow")
     
+    wanted = parse_fields(fields, StoryResponse)
     now = datetime.now(timezone.utc)
     stories = db.query(Story).filter(
         Story.user_id == user_id,
         Story.expires_at > now
     ).order_by(Story.timestamp).all()
     
-    include_owner_views = user_id == current_user.id
-    return [
-        get_story_with_details(
-            story,
-            db,
-            current_user_id=current_user.id,
-            include_viewers=include_owner_views
-        )
-        for story in stories
-    ]
+    return sparse_response(
+        build_stories(db, stories, current_user_id=current_user.id, fields=wanted), wanted
+    )
 
 
 @router.post("/stories/{story_id}/view", status_code=status.HTTP_204_NO_CONTENT)
 def mark_story_viewed(
     story_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer)
 ):
     """Track when a user views a story."""
     story = db.query(Story).filter(Story.id == story_id).first()
@@ -512,49 +878,67 @@ def mark_story_viewed(
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
     
-    if story.expires_at <= datetime.now(timezone.utc):
+    if as_utc(story.expires_at) <= datetime.now(timezone.utc):
         raise HTTPException(status_code=410, detail="Story has expired")
     
-    if story.user_id != current_user.id:
-        is_following = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == story.user_id
-        ).first()
-        
-        if not is_following:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only view stories from users you follow"
-            )
+    auth.require_can_view(story.user_id, "You can only view stories from users you follow")
     
     if story.user_id == current_user.id:
         return None
     
-    view_exists = db.query(StoryView).filter(
-        StoryView.story_id == story_id,
-        StoryView.viewer_id == current_user.id
-    ).first()
-    
-    if view_exists:
-        return None
-    
-    db_view = StoryView(
-        story_id=story_id,
-        viewer_id=current_user.id
-    )
-    db.add(db_view)
-    db.commit()
+    record_views(current_user.id, [story_id])
     
     return None
 
 
+@router.post("/stories/views", response_model=StoryViewBatchResponse)
+def mark_stories_viewed(
+    batch: StoryViewBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    auth: Authorizer = Depends(get_authorizer)
+):
+    """Record views for many stories at once (e.g. after tapping a tray); written later"""
+    story_ids = unique_batch(batch.story_ids, "stories", settings.STORY_VIEW_BATCH_MAX)
+    
+    now = datetime.now(timezone.utc)
+    stories = {
+        row.id: row
+        for row in db.query(Story.id, Story.user_id, Story.expires_at)
+        .filter(Story.id.in_(story_ids))
+        .all()
+    }
+    visible = auth.visible_authors(row.user_id for row in stories.values())
+    
+    result = StoryViewBatchResponse()
+    for story_id in story_ids:
+        story = stories.get(story_id)
+        if story is None:
+            result.rejected[story_id] = "not found"
+        elif as_utc(story.expires_at) <= now:
+            result.rejected[story_id] = "expired"
+        elif story.user_id not in visible:
+            result.rejected[story_id] = "forbidden"
+        else:
+            # Own stories are accepted but never recorded as views
+            result.accepted.append(story_id)
+    
+    record_views(current_user.id, [
+        story_id for story_id in result.accepted if stories[story_id].user_id != current_user.id
+    ])
+    return result
+
+
 @router.get("/stories/{story_id}/views", response_model=List[StoryViewer])
 def get_story_viewers(
     story_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
 ):
-    """Return users who viewed a story (only accessible to the story owner)."""
+    """Return users who viewed a story, most recent first (only accessible to the story owner)."""
     story = db.query(Story).filter(Story.id == story_id).first()
     
     if not story:
@@ -566,25 +950,9 @@ def get_story_viewers(
             detail="Only the story owner can view viewers"
         )
     
-    views = (
-        db.query(StoryView, User, Profile)
-        .join(User, StoryView.viewer_id == User.id)
-        .outerjoin(Profile, Profile.user_id == User.id)
-        .filter(StoryView.story_id == story_id)
-        .order_by(StoryView.viewed_at.desc())
-        .all()
-    )
-    
-    result = []
-    for view, viewer_user, viewer_profile in views:
-        result.append(StoryViewer(
-            id=viewer_user.id,
-            username=viewer_user.username,
-            profile_picture=viewer_profile.profile_picture if viewer_profile else None,
-            viewed_at=view.viewed_at
-        ))
-    
-    return result
+    viewers, next_cursor = load_viewer_page(db, story_id, cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return viewers
 
 @router.put("/stories/{story_id}", response_model=StoryResponse)
 def update_story(
@@ -630,62 +998,172 @@ def delete_story(
     if story.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this story")
     
-    # Delete image file
-    delete_file(story.image, "stories")
+    # Queue the media file for deletion with the story (purged after commit)
+    schedule_file_deletion(db, story.image, "stories")
     
     # Delete story
     db.delete(story)
     db.commit()
+    invalidate_tray(current_user.id)
+    enqueue_media_purge()
     
     return None
 
 # Helper functions
-def get_comment_with_details(comment: Comment, db: Session):
-    """Get comment with user details and replies"""
-    user = db.query(User).filter(User.id == comment.user_id).first()
-    profile = db.query(Profile).filter(Profile.user_id == comment.user_id).first()
-    
-    replies = []
-    replies_count = 0
-    if comment.parent_id is None:
-        reply_comments = db.query(Comment).filter(
-            Comment.parent_id == comment.id
-        ).order_by(Comment.timestamp).all()
-        
-        replies_count = len(reply_comments)
-        
-        # Build reply objects
-        for reply in reply_comments:
-            reply_user = db.query(User).filter(User.id == reply.user_id).first()
-            reply_profile = db.query(Profile).filter(Profile.user_id == reply.user_id).first()
-            
-            replies.append({
-                "id": reply.id,
-                "user_id": reply.user_id,
-                "post_id": reply.post_id,
-                "parent_id": reply.parent_id,
-                "text": reply.text,
-                "timestamp": reply.timestamp,
-                "username": reply_user.username if reply_user else None,
-                "user_profile_picture": reply_profile.profile_picture if reply_profile else None,
-                "replies": [],  # Replies don't have sub-replies
-                "replies_count": 0
-            })
-    
-    comment_dict = {
-        "id": comment.id,
-        "user_id": comment.user_id,
-        "post_id": comment.post_id,
-        "parent_id": comment.parent_id,
-        "text": comment.text,
-        "timestamp": comment.timestamp,
-        "username": user.username if user else None,
-        "user_profile_picture": profile.profile_picture if profile else None,
-        "replies": replies,
-        "replies_count": replies_count
-    }
+def create_story_record(
+    db: Session, user_id: int, filename: str, media_type: str, caption: Optional[str]
+):
+    """Insert a story for an already stored media file and kick off its image variants"""
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=settings.STORY_EXPIRY_HOURS)
     
-    return CommentResponse(**comment_dict)
+    with release_on_failure(db, filename, "stories"):
+        db_story = Story(
+            user_id=user_id,
+            image=filename,
+            media_type=media_type,
+            caption=caption,
+            expires_at=expires_at
+        )
+        db.add(db_story)
+        db.flush()
+        schedule_expiry(db, db_story)
+        db.commit()
+    invalidate_tray(user_id)
+    
+    if media_type == "image":
+        enqueue_image_variants("story", db_story.id)
+    db.refresh(db_story)
+    
+    return db_story
+
+def get_own_story_upload(upload_id: str, db: Session, current_user: User):
+    """Load a resumable upload session owned by the current user"""
+    upload = db.query(StoryUpload).filter(StoryUpload.id == upload_id).first()
+    
+    if not upload or upload.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return upload
+
+def append_story_chunk(
+    db: Session, upload_id: str, offset: int, segment_path: str, size: int
+) -> bool:
+    """
+    Claim `offset` for a received segment and copy it into the partial file; False if another
+    PUT got there first. The conditional UPDATE holds the row lock until the commit after the
+    copy, so a concurrent PUT at the same offset waits, then matches nothing and never writes.
+    """
+    updated = db.query(StoryUpload).filter(
+        StoryUpload.id == upload_id,
+        StoryUpload.received_size == offset
+    ).update({StoryUpload.received_size: offset + size}, synchronize_session=False)
+    if not updated:
+        db.rollback()
+        return False
+    
+    try:
+        append_story_segment(upload_id, segment_path, offset)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return True
+
+def get_story_upload_response(upload: StoryUpload):
+    return StoryUploadResponse(
+        id=upload.id,
+        offset=upload.received_size,
+        size=upload.total_size,
+        media_type=upload.media_type
+    )
+
+def follower_infos(rows, following_lookup) -> List[FollowerInfo]:
+    """FollowerInfo for (id, username, profile_picture) rows, flagged by the viewer's follows."""
+    return [
+        FollowerInfo(
+            id=row.id,
+            username=row.username,
+            profile_picture=row.profile_picture,
+            is_following=row.id in following_lookup
+        )
+        for row in rows
+    ]
+
+def stream_follower_infos(make_query, viewer_id: int):
+    """NDJSON stream of FollowerInfo for a user-list query, checking viewer follows per chunk."""
+    return ndjson_stream(
+        make_query,
+        lambda session, rows: follower_infos(
+            rows, Authorizer(session, viewer_id).following_among(row.id for row in rows)
+        )
+    )
+
+def get_follow_page(
+    db: Session,
+    auth: Authorizer,
+    request: Request,
+    response: Response,
+    match,
+    listed,
+    user_id: int,
+    cursor: Optional[str],
+    limit: int
+):
+    """
+    One page of a follow list, keyset-paginated on Follow.id (newest first).
+    `match` is the column equal to `user_id`, `listed` the column naming the users returned.
+    NDJSON clients get the rest of the list after `cursor` in one stream instead.
+    """
+    key = decode_cursor(cursor, int)
+
+    def follow_query(session: Session):
+        query = (
+            session.query(
+                Follow.id.label("follow_id"), User.id, User.username, Profile.profile_picture
+            )
+            .join(User, User.id == listed)
+            .outerjoin(Profile, Profile.user_id == User.id)
+            .filter(match == user_id)
+        )
+        if key is not None:
+            query = query.filter(Follow.id < key[0])
+        return query.order_by(desc(Follow.id))
+
+    if wants_ndjson(request):
+        return stream_follower_infos(follow_query, auth.viewer_id)
+
+    rows = follow_query(db).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    set_next_cursor(response, encode_cursor(rows[-1].follow_id) if has_more else None)
+
+    following_lookup = auth.following_among(row.id for row in rows)
+    return model_list_response(follower_infos(rows, following_lookup), response)
+
+def record_batch_outcome(
+    result: BatchResult, targets: List[int], changed: List[int], unchanged_reason: str
+):
+    """Accept the targets that were written; the rest were already in the requested state."""
+    changed = set(changed)
+    for target in targets:
+        if target in changed:
+            result.accepted.append(target)
+        else:
+            result.rejected[target] = unchanged_reason
+
+def track_comment_change(db: Session, post_id: int, parent_id: Optional[int], delta: int):
+    """Keep the parent's replies_count in step and queue the post's top comments for a refresh."""
+    if parent_id:
+        db.query(Comment).filter(Comment.id == parent_id).update(
+            {Comment.replies_count: Comment.replies_count + delta}, synchronize_session=False
+        )
+    db.query(Post).filter(Post.id == post_id).update(
+        {Post.top_comments_stale: True}, synchronize_session=False
+    )
+
+def get_comment_with_details(comment: Comment, db: Session):
+    """Get comment with user details and its first replies"""
+    return build_threads(db, [comment], settings.COMMENT_REPLIES_PREVIEW)[0]
 
 def get_story_with_details(
     story: Story,
@@ -694,68 +1172,7 @@ def get_story_with_details(
     include_viewers: bool = False
 ):
     """Get story with user details, view counts, and optional viewer list."""
-    user = db.query(User).filter(User.id == story.user_id).first()
-    profile = db.query(Profile).filter(Profile.user_id == story.user_id).first()
-    
-    # Build user info
-    user_info = None
-    if user:
-        user_info = {
-            "id": user.id,
-            "username": user.username,
-            "profile": {
-                "profile_picture": profile.profile_picture if profile else None,
-                "bio": profile.bio if profile else None,
-                "website": profile.website if profile else None
-            }
-        }
-    
-    if current_user_id == story.user_id:
-        include_viewers = True
-        has_viewed = True
-    else:
-        has_viewed = False
-        if current_user_id:
-            has_viewed = db.query(StoryView.id).filter(
-                StoryView.story_id == story.id,
-                StoryView.viewer_id == current_user_id
-            ).first() is not None
-    
-    viewers = []
-    if include_viewers:
-        view_rows = (
-            db.query(StoryView, User, Profile)
-            .join(User, StoryView.viewer_id == User.id)
-            .outerjoin(Profile, Profile.user_id == User.id)
-            .filter(StoryView.story_id == story.id)
-            .order_by(StoryView.viewed_at.desc())
-            .all()
-        )
-        views_count = len(view_rows)
-        
-        for view, viewer_user, viewer_profile in view_rows:
-            viewers.append({
-                "id": viewer_user.id,
-                "username": viewer_user.username,
-                "profile_picture": viewer_profile.profile_picture if viewer_profile else None,
-                "viewed_at": view.viewed_at
-            })
-    else:
-        views_count = db.query(StoryView.id).filter(StoryView.story_id == story.id).count()
-    
-    story_dict = {
-        "id": story.id,
-        "user_id": story.user_id,
-        "image": story.image,
-        "media_type": getattr(story, 'media_type', 'image'),  # Add media_type with fallback
-        "caption": story.caption,
-        "timestamp": story.timestamp,
-        "expires_at": story.expires_at,
-        "user": user_info,
-        "views_count": views_count,
-        "has_viewed": has_viewed,
-        "viewers": viewers
-    }
-    
-    return StoryResponse(**story_dict)
+    return build_stories(
+        db, [story], current_user_id=current_user_id, include_viewers=include_viewers
+    )[0]
 
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import (
+    APIRouter, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
+)
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import (
     get_password_hash,
@@ -14,19 +16,27 @@ from app.core.security import (
     get_current_active_user
 )
 from app.models.user import User, Profile
-from app.models.post import Post
-from app.models.social import Follow
 from app.schemas.user import (
     UserCreate,
     UserLogin,
     UserResponse,
     UserWithProfile,
+    UserBatchItem,
+    MutualFollowers,
     Token,
     RefreshTokenRequest,
     ProfileUpdate,
     ProfileResponse
 )
-from app.utils.file_upload import save_upload_file, delete_file
+from app.utils.file_upload import release_on_failure, save_upload_file, schedule_file_deletion
+from app.utils.image_variants import variant_urls
+from app.tasks.media import enqueue_image_variants, enqueue_media_purge
+from app.services.mutual_followers import get_mutual_followers, mutual_summaries
+from app.services.profile_cache import cached_profile, invalidate_profiles, load_profile
+from app.services.user_details import build_users
+from app.utils.batching import parse_ids
+from app.utils.etags import conditional, make_etag
+from app.utils.fieldsets import FIELDS_DESCRIPTION, parse_fields, sparse_response
 from datetime import timedelta
 
 router = APIRouter()
@@ -124,29 +134,57 @@ def get_all_users(
     db: Session = Depends(get_db), 
     current_user: User = Depends(get_current_active_user),
     skip: int = 0,
-    limit: int = 50
+    limit: int = 50,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """Get all users"""
+    wanted = parse_fields(fields, UserWithProfile)
     users = db.query(User).filter(User.is_active == True).offset(skip).limit(limit).all()
-    return [get_user_with_stats(user, db, current_user.id) for user in users]
+    return sparse_response(build_users(db, users, current_user.id, fields=wanted), wanted)
+
+@router.get("/batch", response_model=List[UserBatchItem])
+def get_users_batch(
+    ids: str = Query(..., description="Comma-separated user ids"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get many users at once, in request order; unknown ids carry an `error` instead"""
+    user_ids = parse_ids(ids, "users", settings.BATCH_GET_MAX)
+    users = db.query(User).filter(User.id.in_(user_ids)).all()
+    hydrated = {
+        user.id: user for user in build_users(db, users, current_user.id, include_mutuals=True)
+    }
+    return [
+        UserBatchItem(id=user_id, user=hydrated[user_id]) if user_id in hydrated
+        else UserBatchItem(id=user_id, error="not found")
+        for user_id in user_ids
+    ]
 
 @router.get("/{user_id}", response_model=UserWithProfile)
-def get_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    """Get user by ID"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    return get_user_with_stats(user, db, current_user.id)
+def get_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get user by ID. Supports `If-None-Match`."""
+    return profile_response(db, request, response, current_user.id, user_id)
 
 @router.get("/username/{username}", response_model=UserWithProfile)
-def get_user_by_username(username: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    """Get user by username"""
+def get_user_by_username(
+    username: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get user by username. Supports `If-None-Match`."""
     user = db.query(User).filter(User.username == username).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return get_user_with_stats(user, db, current_user.id)
+    return profile_response(db, request, response, current_user.id, user.id, user)
 
 @router.put("/profile", response_model=ProfileResponse)
 def update_profile(
@@ -165,6 +203,7 @@ def update_profile(
     
     db.commit()
     db.refresh(profile)
+    invalidate_profiles(current_user.id)
     
     return profile
 
@@ -180,16 +219,26 @@ async def upload_profile_picture(
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     
-    if profile.profile_picture:
-        delete_file(profile.profile_picture, "profiles")
-    
     filename = await save_upload_file(file, "profiles")
-    profile.profile_picture = filename
     
-    db.commit()
+    # The old file is released after the new one is stored, so re-uploading the same image
+    # keeps its bytes
+    with release_on_failure(db, filename, "profiles"):
+        schedule_file_deletion(db, profile.profile_picture, "profiles")
+        profile.profile_picture = filename
+        profile.profile_picture_variants = None
+        db.commit()
+    invalidate_profiles(current_user.id)
+    enqueue_media_purge()
+    
+    enqueue_image_variants("profile", profile.id)
     db.refresh(profile)
     
-    return {"message": "Profile picture updated", "filename": filename}
+    return {
+        "message": "Profile picture updated",
+        "filename": filename,
+        "variants": variant_urls("profiles", profile.profile_picture_variants)
+    }
 
 @router.get("/search/{query}", response_model=List[UserWithProfile])
 def search_users(
@@ -206,24 +255,35 @@ def search_users(
     return [get_user_with_stats(user, db, current_user.id) for user in users]
 
 # Helper function
-def get_user_with_stats(user: User, db: Session, current_user_id: int = None):
-    """Get user with profile and stats"""
-    profile = db.query(Profile).filter(Profile.user_id == user.id).first()
-    posts_count = db.query(func.count(Post.id)).filter(Post.user_id == user.id).scalar()
-    followers_count = db.query(func.count(Follow.id)).filter(Follow.following_id == user.id).scalar()
-    following_count = db.query(func.count(Follow.id)).filter(Follow.follower_id == user.id).scalar()
-    
-    user_dict = {
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "is_active": user.is_active,
-        "date_joined": user.date_joined,
-        "profile": profile,
-        "posts_count": posts_count,
-        "followers_count": followers_count,
-        "following_count": following_count
-    }
-    
-    return UserWithProfile(**user_dict)
+def get_user_with_stats(
+    user: User, db: Session, current_user_id: int = None, include_mutuals: bool = False
+):
+    """
+    Get user with profile and stats (from the profile cache); profile views also get
+    the mutual-follower summary
+    """
+    profile = load_profile(cached_profile(db, user.id, user))
+    if include_mutuals and current_user_id:
+        with_mutuals(profile, db, current_user_id)
+    return profile
 
+def with_mutuals(profile: UserWithProfile, db: Session, current_user_id: int) -> UserWithProfile:
+    summary = get_mutual_followers(db, current_user_id, profile.id)
+    profile.mutual_followers = MutualFollowers(**summary) if summary is not None else None
+    return profile
+
+def profile_response(db: Session, request: Request, response: Response, current_user_id: int,
+                     user_id: int, user: User = None):
+    """
+    A profile view, or a 304 when the client's copy is still current. The ETag covers the
+    cached payload and the viewer's mutual-follower summary, so a hit needs no queries.
+    """
+    payload = cached_profile(db, user_id, user)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    summary = mutual_summaries(db, current_user_id, [user_id]).get(user_id)
+    etag = make_etag("user", payload, sorted(summary.items()) if summary else None)
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    return with_mutuals(load_profile(payload), db, current_user_id)
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Dict
 from datetime import datetime
 
+from app.utils.image_variants import variant_urls
+
 # Tag Schemas
 class TagBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=50)
@@ -28,10 +30,20 @@ class PostUpdate(BaseModel):
     caption: Optional[str] = None
     tags: Optional[List[str]] = None
 
+class TopComment(BaseModel):
+    id: int
+    user_id: int
+    username: Optional[str] = None
+    user_profile_picture: Optional[str] = None
+    text: str
+    timestamp: Optional[datetime] = None
+    replies_count: int = 0
+
 class PostResponse(PostBase):
     id: int
     user_id: int
     image: str
+    image_variants: Dict[str, str] = Field(default_factory=dict)  # width -> URL
     is_published: bool
     timestamp: datetime
     username: Optional[str] = None
@@ -40,7 +52,18 @@ class PostResponse(PostBase):
     comments_count: Optional[int] = 0
     tags: List[TagResponse] = []
     is_liked: Optional[bool] = False
+    top_comments: List[TopComment] = []  # refreshed in the background, may lag new comments briefly
+    
+    @field_validator("image_variants", mode="before")
+    @classmethod
+    def expose_variant_urls(cls, v):
+        return variant_urls("posts", v)
     
     class Config:
         from_attributes = True
 
+class PostBatchItem(BaseModel):
+    id: int
+    post: Optional[PostResponse] = None
+    error: Optional[str] = None  # "not found" or "forbidden"
+
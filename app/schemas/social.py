@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Dict
 from datetime import datetime
 
+from app.utils.image_variants import variant_urls
+
 # Comment Schemas
 class CommentBase(BaseModel):
     text: str = Field(..., min_length=1)
@@ -20,6 +22,7 @@ class CommentResponse(CommentBase):
     user_profile_picture: Optional[str] = None
     replies: List['CommentResponse'] = Field(default_factory=list)  # Nested replies (1 level only)
     replies_count: int = 0
+    replies_next_cursor: Optional[str] = None  # pass to /comments/{id}/replies for the rest
     
     class Config:
         from_attributes = True
@@ -32,7 +35,7 @@ class LikeCreate(BaseModel):
     post_id: int
 
 class LikeResponse(BaseModel):
-    id: int
+    id: Optional[int] = None  # null while the like is queued for a write-behind flush
     user_id: int
     post_id: int
     timestamp: datetime
@@ -40,10 +43,16 @@ class LikeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class LikeBatch(BaseModel):
+    post_ids: List[int] = Field(..., min_length=1)
+
 # Follow Schemas
 class FollowCreate(BaseModel):
     following_id: int
 
+class FollowBatch(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1)
+
 class FollowResponse(BaseModel):
     id: int
     follower_id: int
@@ -62,6 +71,15 @@ class FollowerInfo(BaseModel):
     class Config:
         from_attributes = True
 
+class SuggestedUser(BaseModel):
+    id: int
+    username: str
+    profile_picture: Optional[str] = None
+    mutual_count: int
+    
+    class Config:
+        from_attributes = True
+
 # Story Schemas
 class StoryBase(BaseModel):
     caption: Optional[str] = None
@@ -81,13 +99,56 @@ class StoryResponse(StoryBase):
     id: int
     user_id: int
     image: str
+    image_variants: Dict[str, str] = Field(default_factory=dict)  # width -> URL, images only
     media_type: str = "image"  # "image" or "video"
     timestamp: datetime
     expires_at: datetime
     user: Optional[StoryUserInfo] = None
     views_count: int = 0
     has_viewed: bool = False
-    viewers: List['StoryViewer'] = Field(default_factory=list)
+    viewers: List['StoryViewer'] = Field(default_factory=list)  # owner only, most recent first
+    viewers_next_cursor: Optional[str] = None  # pass to /stories/{id}/views for older viewers
+    
+    @field_validator("image_variants", mode="before")
+    @classmethod
+    def expose_variant_urls(cls, v):
+        return variant_urls("stories", v)
+    
+    class Config:
+        from_attributes = True
+
+
+class StoryRing(BaseModel):
+    """One author in the story tray; stories load per ring from /stories/user/{user_id}."""
+    user_id: int
+    user: Optional[StoryUserInfo] = None
+    stories_count: int
+    unseen_count: int = 0
+    all_seen: bool = False
+    latest_at: datetime
+    start_story_id: int  # first unseen story, or the first story once all are seen
+
+
+class StoryViewBatch(BaseModel):
+    story_ids: List[int] = Field(..., min_length=1)
+
+class BatchResult(BaseModel):
+    accepted: List[int] = []
+    rejected: Dict[int, str] = {}  # target id -> reason
+
+class StoryViewBatchResponse(BatchResult):
+    pass
+
+
+class StoryUploadCreate(StoryBase):
+    filename: str = Field(..., min_length=1)
+    size: int = Field(..., gt=0)
+
+class StoryUploadResponse(BaseModel):
+    id: str
+    offset: int
+    size: int
+    media_type: str
     
     class Config:
         from_attributes = True
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Optional, Dict, List
 from datetime import datetime
 
+from app.utils.image_variants import variant_urls
+
 # User Schemas
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=150)
@@ -40,17 +42,34 @@ class ProfileResponse(ProfileBase):
     id: int
     user_id: int
     profile_picture: Optional[str] = None
+    profile_picture_variants: Dict[str, str] = Field(default_factory=dict)  # width -> URL
     created_at: datetime
     
+    @field_validator("profile_picture_variants", mode="before")
+    @classmethod
+    def expose_variant_urls(cls, v):
+        return variant_urls("profiles", v)
+    
     class Config:
         from_attributes = True
 
 # Combined User with Profile
+class MutualFollowers(BaseModel):
+    count: int = 0
+    top_usernames: List[str] = []
+    is_partial: bool = False  # count is a lower bound when the lookup ran out of time
+
 class UserWithProfile(UserResponse):
     profile: Optional[ProfileResponse] = None
     posts_count: Optional[int] = 0
     followers_count: Optional[int] = 0
     following_count: Optional[int] = 0
+    mutual_followers: Optional[MutualFollowers] = None
+
+class UserBatchItem(BaseModel):
+    id: int
+    user: Optional[UserWithProfile] = None
+    error: Optional[str] = None  # "not found"
 
 # Token Schema
 class Token(BaseModel):
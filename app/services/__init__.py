@@ -0,0 +1,3 @@
+"""
+In-process services shared by the routers (indexes, caches, authorization).
+"""
@@ -0,0 +1,72 @@
+"""
+Visibility rules for content owned by other users.
+
+Posts, comments, likes and stories are visible to their author and to the
+author's followers. Handlers take an ``Authorizer`` dependency instead of
+querying follows themselves; decisions are memoized for the request, so a
+handler that checks the same author several times (or filters a page of
+authors) pays for each author once.
+"""
+from typing import Dict, Iterable, List, Set
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.security import get_current_active_user
+from app.models.user import User
+from app.services import follow_graph
+
+
+class Authorizer:
+    """Per-request visibility decisions for one viewer."""
+
+    def __init__(self, db: Session, viewer_id: int):
+        self.db = db
+        self.viewer_id = viewer_id
+        self._following: Dict[int, bool] = {}
+
+    def _follows(self, author_ids: Iterable[int]) -> Dict[int, bool]:
+        missing = [author_id for author_id in author_ids if author_id not in self._following]
+        if missing:
+            follow_graph.follow_graph.ensure_fresh(self.db)
+            for author_id in missing:
+                self._following[author_id] = follow_graph.follow_graph.is_following(
+                    self.viewer_id, author_id
+                )
+        return self._following
+
+    def is_following(self, user_id: int) -> bool:
+        return self._follows([user_id])[user_id]
+
+    def following_among(self, user_ids: Iterable[int]) -> Set[int]:
+        """Subset of `user_ids` the viewer follows (for `is_following` flags on a page)."""
+        user_ids = list(user_ids)
+        lookup = self._follows(user_ids)
+        return {user_id for user_id in user_ids if lookup[user_id]}
+
+    def can_view(self, author_id: int) -> bool:
+        return author_id == self.viewer_id or self.is_following(author_id)
+
+    def require_can_view(self, author_id: int, detail: str) -> None:
+        """Raise 403 with `detail` unless the viewer may see the author's content."""
+        if not self.can_view(author_id):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+    def visible_authors(self, author_ids: Iterable[int]) -> Set[int]:
+        """Batch form of `can_view`: the subset of `author_ids` the viewer may see."""
+        author_ids = set(author_ids)
+        author_ids.discard(self.viewer_id)
+        visible = self.following_among(author_ids)
+        visible.add(self.viewer_id)
+        return visible
+
+    def feed_author_ids(self) -> List[int]:
+        """Every author whose content may appear in the viewer's feed."""
+        return follow_graph.following_ids(self.db, self.viewer_id) + [self.viewer_id]
+
+
+def get_authorizer(
+    db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+) -> Authorizer:
+    return Authorizer(db, current_user.id)
@@ -0,0 +1,185 @@
+"""
+Comment thread loading in a fixed number of queries.
+
+A page of top-level comments is keyset-paginated on ``Comment.id`` (ids grow
+with creation time, so this is also chronological order). Reply counts are
+stored on the parent (``Comment.replies_count``). For the whole page the loader
+then runs one ROW_NUMBER() window query returning the first
+``replies_preview`` replies of every parent and one query for all authors -
+three queries however many comments or replies there are. Remaining replies
+are fetched per parent through a reply cursor.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.social import Comment
+from app.models.user import Profile, User
+from app.schemas.social import CommentResponse
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def comment_authors(db: Session, user_ids: Iterable[int]) -> Dict[int, Tuple[str, Optional[str]]]:
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    rows = (
+        db.query(User.id, User.username, Profile.profile_picture)
+        .outerjoin(Profile, Profile.user_id == User.id)
+        .filter(User.id.in_(user_ids))
+        .all()
+    )
+    return {row.id: (row.username, row.profile_picture) for row in rows}
+
+
+def _reply_previews(
+    db: Session, parent_ids: List[int], per_parent: int
+) -> Dict[int, List[Comment]]:
+    """The first `per_parent` replies of every parent in one windowed query."""
+    previews: Dict[int, List[Comment]] = {parent_id: [] for parent_id in parent_ids}
+    if not parent_ids or per_parent <= 0:
+        return previews
+    ranked = (
+        db.query(
+            Comment.id.label("id"),
+            func.row_number()
+            .over(partition_by=Comment.parent_id, order_by=Comment.id)
+            .label("position"),
+        )
+        .filter(Comment.parent_id.in_(parent_ids))
+        .subquery()
+    )
+    replies = (
+        db.query(Comment)
+        .join(ranked, ranked.c.id == Comment.id)
+        .filter(ranked.c.position <= per_parent)
+        .order_by(Comment.parent_id, Comment.id)
+        .all()
+    )
+    for reply in replies:
+        previews[reply.parent_id].append(reply)
+    return previews
+
+
+def _to_response(comment: Comment, authors: dict, **extra) -> CommentResponse:
+    username, profile_picture = authors.get(comment.user_id, (None, None))
+    return CommentResponse(
+        id=comment.id,
+        user_id=comment.user_id,
+        post_id=comment.post_id,
+        parent_id=comment.parent_id,
+        text=comment.text,
+        timestamp=comment.timestamp,
+        username=username,
+        user_profile_picture=profile_picture,
+        **extra,
+    )
+
+
+def build_threads(
+    db: Session, comments: List[Comment], replies_preview: int
+) -> List[CommentResponse]:
+    """Hydrate top-level comments with reply counts, reply previews and authors."""
+    parent_ids = [comment.id for comment in comments]
+    previews = _reply_previews(db, parent_ids, replies_preview)
+    authors = comment_authors(
+        db,
+        [comment.user_id for comment in comments]
+        + [reply.user_id for replies in previews.values() for reply in replies],
+    )
+
+    threads = []
+    for comment in comments:
+        replies = previews.get(comment.id, [])
+        replies_count = comment.replies_count or 0
+        replies_next_cursor = None
+        if replies_count > len(replies):
+            replies_next_cursor = encode_cursor(replies[-1].id if replies else 0)
+        threads.append(
+            _to_response(
+                comment,
+                authors,
+                replies=[_to_response(reply, authors) for reply in replies],
+                replies_count=replies_count,
+                replies_next_cursor=replies_next_cursor,
+            )
+        )
+    return threads
+
+
+def load_comment_page(
+    db: Session, post_id: int, cursor: Optional[str], limit: int, replies_preview: int
+) -> Tuple[List[CommentResponse], Optional[str]]:
+    """One page of a post's top-level comments (oldest first) and the cursor for the next page."""
+    query = db.query(Comment).filter(Comment.post_id == post_id, Comment.parent_id == None)
+    key = decode_cursor(cursor, int)
+    if key is not None:
+        query = query.filter(Comment.id > key[0])
+    comments = query.order_by(Comment.id).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(comments[limit - 1].id) if len(comments) > limit else None
+    return build_threads(db, comments[:limit], replies_preview), next_cursor
+
+
+def load_reply_page(
+    db: Session, parent_id: int, cursor: Optional[str], limit: int
+) -> Tuple[List[CommentResponse], Optional[str]]:
+    """One page of replies to a comment (oldest first) and the cursor for the next page."""
+    query = db.query(Comment).filter(Comment.parent_id == parent_id)
+    key = decode_cursor(cursor, int)
+    if key is not None:
+        query = query.filter(Comment.id > key[0])
+    replies = query.order_by(Comment.id).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(replies[limit - 1].id) if len(replies) > limit else None
+    replies = replies[:limit]
+    authors = comment_authors(db, [reply.user_id for reply in replies])
+    return [_to_response(reply, authors) for reply in replies], next_cursor
+
+
+def top_comments_for_posts(
+    db: Session, post_ids: List[int], per_post: int
+) -> Dict[int, List[dict]]:
+    """
+    The `per_post` top-level comments with the most replies (newest first on ties)
+    for every post, as JSON-ready dicts. One windowed query plus one author query.
+    """
+    top: Dict[int, List[dict]] = {post_id: [] for post_id in post_ids}
+    if not post_ids:
+        return top
+    ranked = (
+        db.query(
+            Comment.id.label("id"),
+            func.row_number()
+            .over(
+                partition_by=Comment.post_id,
+                order_by=(Comment.replies_count.desc(), Comment.id.desc()),
+            )
+            .label("position"),
+        )
+        .filter(Comment.post_id.in_(post_ids), Comment.parent_id == None)
+        .subquery()
+    )
+    comments = (
+        db.query(Comment)
+        .join(ranked, ranked.c.id == Comment.id)
+        .filter(ranked.c.position <= per_post)
+        .order_by(Comment.post_id, ranked.c.position)
+        .all()
+    )
+    authors = comment_authors(db, [comment.user_id for comment in comments])
+    for comment in comments:
+        username, profile_picture = authors.get(comment.user_id, (None, None))
+        top[comment.post_id].append(
+            {
+                "id": comment.id,
+                "user_id": comment.user_id,
+                "username": username,
+                "user_profile_picture": profile_picture,
+                "text": comment.text,
+                "timestamp": comment.timestamp.isoformat() if comment.timestamp else None,
+                "replies_count": comment.replies_count or 0,
+            }
+        )
+    return top
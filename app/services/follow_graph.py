@@ -0,0 +1,422 @@
+"""
+Process-local index of the follow graph for visibility checks.
+
+Adjacency is kept CSR-style in flat ``array`` buffers instead of ORM objects:
+for each direction an ``offsets`` array indexed by user id and a ``targets``
+array holding every neighbour list back to back, sorted, so a membership
+check is a binary search over one slice (a few microseconds).
+
+Memory cost: 4 bytes per edge per direction (8 bytes per follow, since both
+"following" and "followers" are indexed) plus 8 bytes per user id slot for
+the two offset arrays. One million follows among 100k users is ~8.8 MB.
+Follows/unfollows since the last rebuild sit in a small overlay of sets
+(roughly 200 bytes per change) until FOLLOW_GRAPH_COMPACT_THRESHOLD changes
+trigger a rebuild of the arrays.
+
+Multi-worker sync: follow/unfollow bump the ``follow_graph`` row in
+``cache_versions`` and log their edges in ``follow_changes`` under the new
+version, inside their transaction, then apply the change locally. Every
+FOLLOW_GRAPH_SYNC_SECONDS one request thread per worker compares the stored
+version with the one this process has seen and replays the missed versions
+from the log into the overlay, so catching up costs O(changes), not O(follows).
+
+Full rebuilds (compaction, or a reload when the log no longer reaches back to
+this worker's version) run in a background thread; requests keep answering
+from the current arrays plus the overlay, and changes applied meanwhile are
+carried over onto the new arrays. Only the very first load blocks.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.social import Follow, FollowChange
+from app.services.versions import bump_version, get_version
+
+VERSION_NAME = "follow_graph"
+
+logger = logging.getLogger(__name__)
+
+
+class _CSR:
+    """Immutable compressed adjacency for one direction."""
+
+    __slots__ = ("offsets", "targets")
+
+    def __init__(self, offsets: array, targets: array):
+        self.offsets = offsets
+        self.targets = targets
+
+    def row(self, node: int) -> Tuple[int, int]:
+        if node + 1 >= len(self.offsets):
+            return 0, 0
+        return self.offsets[node], self.offsets[node + 1]
+
+    def contains(self, node: int, target: int) -> bool:
+        lo, hi = self.row(node)
+        if lo == hi:
+            return False
+        i = bisect_left(self.targets, target, lo, hi)
+        return i < hi and self.targets[i] == target
+
+    def neighbours(self, node: int) -> array:
+        lo, hi = self.row(node)
+        return self.targets[lo:hi]
+
+    def nbytes(self) -> int:
+        return len(self.offsets) * self.offsets.itemsize + len(self.targets) * self.targets.itemsize
+
+
+def _build_csr(sources: array, destinations: array, size: int) -> _CSR:
+    """Counting-sort (source, destination) pairs into CSR. Rows come out sorted
+    when the input is sorted by (source, destination) or by destination."""
+    counts = array("I", bytes(4 * (size + 1)))
+    for node in sources:
+        counts[node + 1] += 1
+    for i in range(1, size + 1):
+        counts[i] += counts[i - 1]
+    offsets = array("I", counts)
+
+    targets = array("I", bytes(4 * len(sources)))
+    cursor = array("I", counts[:-1])
+    for node, target in zip(sources, destinations):
+        targets[cursor[node]] = target
+        cursor[node] += 1
+    return _CSR(offsets, targets)
+
+
+Edges = List[Tuple[int, int]]
+
+
+class FollowGraph:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()  # one thread per worker loads or catches up at a time
+        self._out = _CSR(array("I", [0]), array("I"))  # follower -> following
+        self._in = _CSR(array("I", [0]), array("I"))  # following -> follower
+        self._added: Set[Tuple[int, int]] = set()
+        self._removed: Set[Tuple[int, int]] = set()
+        self._added_out: Dict[int, Set[int]] = {}
+        self._added_in: Dict[int, Set[int]] = {}
+        self._removed_out: Dict[int, Set[int]] = {}
+        self._removed_in: Dict[int, Set[int]] = {}
+        self.version = -1  # -1: never loaded
+        self._stale = False
+        self._checked_at = 0.0
+        # While a background rebuild runs: the changes applied since it started, as (version, added, removed)
+        self._rebuild_changes: Optional[List[Tuple[int, Edges, Edges]]] = None
+
+    # ----- loading -----
+    def load(self, db: Session) -> None:
+        """(Re)build both directions from the follows table, blocking the caller."""
+        out_csr, in_csr, version = self._read(db)
+        with self._lock:
+            self._swap(out_csr, in_csr)
+            self.version = version
+            self._stale = False
+            self._checked_at = time.monotonic()
+
+    def _read(self, db: Session) -> Tuple[_CSR, _CSR, int]:
+        version = get_version(db, VERSION_NAME)
+        sources, destinations = array("I"), array("I")
+        max_id = 0
+        rows = (
+            db.query(Follow.follower_id, Follow.following_id)
+            .order_by(Follow.follower_id, Follow.following_id)
+            .yield_per(10000)
+        )
+        for follower_id, following_id in rows:
+            sources.append(follower_id)
+            destinations.append(following_id)
+            max_id = max(max_id, follower_id, following_id)
+
+        out_csr = _build_csr(sources, destinations, max_id + 1)
+        # Iterating in (follower, following) order leaves every in-row sorted by follower
+        in_csr = _build_csr(destinations, sources, max_id + 1)
+        return out_csr, in_csr, version
+
+    def _read_in_session(self) -> Tuple[_CSR, _CSR, int]:
+        db = SessionLocal()
+        try:
+            return self._read(db)
+        finally:
+            db.close()
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Load on first use, then replay follows made by other workers."""
+        if self.version >= 0 and not self._stale:
+            if time.monotonic() - self._checked_at < settings.FOLLOW_GRAPH_SYNC_SECONDS:
+                return
+        if self.version < 0:
+            with self._sync_lock:
+                if self.version < 0:
+                    self.load(db)
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return  # another request thread is catching up; answer from the current state
+        try:
+            self._checked_at = time.monotonic()
+            if self._rebuild_changes is None:
+                latest = get_version(db, VERSION_NAME)
+                if latest != self.version:
+                    self._catch_up(db, latest)
+        finally:
+            self._sync_lock.release()
+
+    def _catch_up(self, db: Session, latest: int) -> None:
+        """Replay the logged changes after this worker's version, or reload in the background
+        when the log has been pruned past it."""
+        since = self.version
+        rows = (
+            db.query(
+                FollowChange.version,
+                FollowChange.follower_id,
+                FollowChange.following_id,
+                FollowChange.followed,
+            )
+            .filter(FollowChange.version > since)
+            .order_by(FollowChange.version, FollowChange.id)
+            .all()
+        )
+        logged = rows[-1].version if rows else since
+        with self._lock:
+            if self._rebuild_changes is not None or self.version != since:
+                self._stale = (
+                    True  # a local change or rebuild moved the version; retry on the next read
+                )
+                return
+            if logged < latest or {row.version for row in rows} != set(
+                range(since + 1, logged + 1)
+            ):
+                self._start_rebuild(self._read_in_session)
+                return
+            for row in rows:
+                edge = (row.follower_id, row.following_id)
+                if row.followed:
+                    self._apply([edge], [])
+                else:
+                    self._apply([], [edge])
+            self.version = logged
+            self._stale = False
+            self._maybe_compact()
+
+    # ----- queries -----
+    def is_following(self, follower_id: int, following_id: int) -> bool:
+        edge = (follower_id, following_id)
+        if edge in self._added:
+            return True
+        if edge in self._removed:
+            return False
+        return self._out.contains(follower_id, following_id)
+
+    def following_ids(self, user_id: int) -> List[int]:
+        """Sorted ids the user follows."""
+        return self._merged(self._out, self._added_out, user_id, lambda other: (user_id, other))
+
+    def follower_ids(self, user_id: int) -> List[int]:
+        """Sorted ids following the user."""
+        return self._merged(self._in, self._added_in, user_id, lambda other: (other, user_id))
+
+    def _merged(self, csr: _CSR, added: Dict[int, Set[int]], user_id: int, edge) -> List[int]:
+        with self._lock:
+            base = csr.neighbours(user_id)
+            extra = added.get(user_id)
+            if not extra and not self._removed:
+                return base.tolist()
+            ids = [other for other in base if edge(other) not in self._removed]
+            if extra:
+                ids = sorted(set(ids).union(extra))
+            return ids
+
+    def following_count(self, user_id: int) -> int:
+        """Out-degree, counting pending follows and unfollows."""
+        with self._lock:
+            lo, hi = self._out.row(user_id)
+            return (
+                hi
+                - lo
+                + len(self._added_out.get(user_id, ()))
+                - len(self._removed_out.get(user_id, ()))
+            )
+
+    def follower_count(self, user_id: int) -> int:
+        """In-degree, counting pending follows and unfollows."""
+        with self._lock:
+            lo, hi = self._in.row(user_id)
+            return (
+                hi
+                - lo
+                + len(self._added_in.get(user_id, ()))
+                - len(self._removed_in.get(user_id, ()))
+            )
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "edges": len(self._out.targets) + len(self._added) - len(self._removed),
+            "pending_changes": len(self._added) + len(self._removed),
+            "rebuilding": self._rebuild_changes is not None,
+            "bytes": self._out.nbytes() + self._in.nbytes(),
+        }
+
+    # ----- updates -----
+    def add_edge(self, follower_id: int, following_id: int, version: int) -> None:
+        self.apply_edges([(follower_id, following_id)], [], version)
+
+    def remove_edge(self, follower_id: int, following_id: int, version: int) -> None:
+        self.apply_edges([], [(follower_id, following_id)], version)
+
+    def apply_edges(self, added: Edges, removed: Edges, version: int) -> None:
+        """Apply the follows/unfollows committed under one version bump."""
+        with self._lock:
+            if 0 <= version <= self.version:
+                return  # already replayed from the change log
+            self._apply(added, removed)
+            if self._rebuild_changes is not None:
+                self._rebuild_changes.append((version, added, removed))
+            self._advance(version)
+
+    def _apply(self, added: Iterable[Tuple[int, int]], removed: Iterable[Tuple[int, int]]) -> None:
+        for follower_id, following_id in added:
+            edge = (follower_id, following_id)
+            if edge in self._removed:
+                self._removed.discard(edge)
+                self._removed_out[follower_id].discard(following_id)
+                self._removed_in[following_id].discard(follower_id)
+            if not self._out.contains(follower_id, following_id):
+                self._added.add(edge)
+                self._added_out.setdefault(follower_id, set()).add(following_id)
+                self._added_in.setdefault(following_id, set()).add(follower_id)
+        for follower_id, following_id in removed:
+            edge = (follower_id, following_id)
+            if edge in self._added:
+                self._added.discard(edge)
+                self._added_out[follower_id].discard(following_id)
+                self._added_in[following_id].discard(follower_id)
+            elif self._out.contains(follower_id, following_id):
+                self._removed.add(edge)
+                self._removed_out.setdefault(follower_id, set()).add(following_id)
+                self._removed_in.setdefault(following_id, set()).add(follower_id)
+
+    def _advance(self, version: int) -> None:
+        if self.version < 0:
+            return
+        if version == self.version + 1:
+            self.version = version
+        else:
+            # Another worker wrote in between; catch up from the log on the next read
+            self._stale = True
+        self._maybe_compact()
+
+    # ----- rebuilds -----
+    def _maybe_compact(self) -> None:
+        if len(self._added) + len(self._removed) < settings.FOLLOW_GRAPH_COMPACT_THRESHOLD:
+            return
+        out_csr, added, removed = self._out, set(self._added), set(self._removed)
+        self._start_rebuild(lambda: _compacted(out_csr, added, removed) + (None,))
+
+    def _start_rebuild(self, build: Callable[[], Tuple[_CSR, _CSR, Optional[int]]]) -> None:
+        """Run `build` in a background thread (at most one at a time); called with the lock held."""
+        if self._rebuild_changes is not None:
+            return
+        self._rebuild_changes = []
+        threading.Thread(
+            target=self._rebuild, args=(build,), name="follow-graph-rebuild", daemon=True
+        ).start()
+
+    def _rebuild(self, build: Callable[[], Tuple[_CSR, _CSR, Optional[int]]]) -> None:
+        try:
+            out_csr, in_csr, version = build()
+        except Exception:
+            logger.exception("Follow graph rebuild failed; retrying on the next sync")
+            with self._lock:
+                self._rebuild_changes = None
+                self._stale = True
+            return
+        with self._lock:
+            changes, self._rebuild_changes = self._rebuild_changes, None
+            self._swap(out_csr, in_csr)
+            if version is not None:
+                # A reload: the arrays are as of `version`; newer local changes are re-applied
+                # below and the log fills in whatever else happened since
+                self.version = version
+                self._stale = True
+            for change_version, added, removed in changes:
+                if version is None or change_version > version:
+                    self._apply(added, removed)
+
+    def _swap(self, out_csr: _CSR, in_csr: _CSR) -> None:
+        self._out, self._in = out_csr, in_csr
+        self._added, self._removed = set(), set()
+        self._added_out, self._added_in = {}, {}
+        self._removed_out, self._removed_in = {}, {}
+
+
+def _compacted(
+    out_csr: _CSR, added: Set[Tuple[int, int]], removed: Set[Tuple[int, int]]
+) -> Tuple[_CSR, _CSR]:
+    """Fold an overlay into fresh CSR arrays without touching the database."""
+    edges = sorted(
+        [
+            (source, target)
+            for source in range(len(out_csr.offsets) - 1)
+            for target in out_csr.neighbours(source)
+            if (source, target) not in removed
+        ]
+        + list(added)
+    )
+    size = max([len(out_csr.offsets) - 1] + [max(edge) + 1 for edge in added])
+    sources = array("I", (s for s, _ in edges))
+    destinations = array("I", (d for _, d in edges))
+    return _build_csr(sources, destinations, size), _build_csr(destinations, sources, size)
+
+
+follow_graph = FollowGraph()
+
+
+def is_following(db: Session, follower_id: int, following_id: int) -> bool:
+    """Microsecond follow check backed by the in-process index."""
+    follow_graph.ensure_fresh(db)
+    return follow_graph.is_following(follower_id, following_id)
+
+
+def following_ids(db: Session, user_id: int) -> List[int]:
+    follow_graph.ensure_fresh(db)
+    return follow_graph.following_ids(user_id)
+
+
+def follower_ids(db: Session, user_id: int) -> List[int]:
+    follow_graph.ensure_fresh(db)
+    return follow_graph.follower_ids(user_id)
+
+
+def record_follow_change(db: Session, added: Edges = (), removed: Edges = ()) -> int:
+    """
+    Bump the graph version and log the (follower, following) edges under it, inside the
+    follow/unfollow transaction; returns the new version.
+    """
+    version = bump_version(db, VERSION_NAME)
+    db.bulk_insert_mappings(
+        FollowChange,
+        [
+            {
+                "version": version,
+                "follower_id": follower_id,
+                "following_id": following_id,
+                "followed": followed,
+            }
+            for edges, followed in ((added, True), (removed, False))
+            for follower_id, following_id in edges
+        ],
+    )
+    return version
+
+
+def warm(db: Session) -> None:
+    follow_graph.load(db)
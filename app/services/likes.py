@@ -0,0 +1,158 @@
+"""
+Like and unlike writes, optionally write-behind.
+
+By default a like is written and committed by the request that makes it. With
+LIKE_WRITE_BEHIND enabled, like/unlike operations are appended to a per-worker
+WriteBuffer and applied every LIKE_FLUSH_SECONDS in one transaction: the last
+operation per (user, post) wins, likes go in with one insert-or-ignore, unlikes
+are removed with one DELETE, and each post's ``likes_count`` is moved once
+per batch by the number of rows that actually changed. A hot post then costs
+one write transaction per flush instead of one per like.
+
+Operations that have not been flushed yet are kept in a pending map so the
+user who made them reads their own like state back (``is_liked`` and their
+contribution to ``likes_count``) straight away. The map is per worker: behind
+several workers a read served by another one shows the like only after the
+flush, so write-behind is meant for single-worker deployments or clients that
+tolerate that lag. Like notifications are sent by the flush for the likes it
+actually inserted, so a like dropped on the way (post deleted) notifies no one.
+"""
+import itertools
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.post import Post
+from app.models.social import Like
+from app.models.user import User
+from app.tasks.notifications import create_notifications
+from app.utils.db_writes import add_to_counters, delete_returning, insert_ignore_returning
+from app.utils.write_buffer import WriteBuffer
+
+# (sequence, user_id, post_id, liked); the sequence keeps repeated toggles distinct
+LikeOp = Tuple[int, int, int, bool]
+
+_sequence = itertools.count(1)
+_pending_lock = threading.Lock()
+_pending: Dict[Tuple[int, int], Tuple[int, bool]] = {}  # (user_id, post_id) -> (sequence, liked)
+
+
+def pending_likes(user_id: int, post_ids: Iterable[int]) -> Dict[int, bool]:
+    """Unflushed like state of `user_id` for any of `post_ids`: post_id -> liked."""
+    with _pending_lock:
+        return {
+            post_id: _pending[(user_id, post_id)][1]
+            for post_id in post_ids
+            if (user_id, post_id) in _pending
+        }
+
+
+def is_liked(db: Session, user_id: int, post_id: int) -> bool:
+    """Whether `user_id` likes the post, counting their unflushed operations."""
+    return post_id in liked_among(db, user_id, [post_id])
+
+
+def liked_among(db: Session, user_id: int, post_ids: Iterable[int]) -> Set[int]:
+    """Subset of `post_ids` that `user_id` likes, counting their unflushed operations."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return set()
+    pending = pending_likes(user_id, post_ids)
+    liked = {post_id for post_id, state in pending.items() if state}
+    unresolved = [post_id for post_id in post_ids if post_id not in pending]
+    if unresolved:
+        liked.update(
+            post_id
+            for (post_id,) in db.query(Like.post_id)
+            .filter(Like.user_id == user_id, Like.post_id.in_(unresolved))
+            .all()
+        )
+    return liked
+
+
+def write_likes(ops: List[LikeOp]) -> Dict[int, int]:
+    """Apply buffered like/unlike operations in one transaction. Returns the likes_count change per post."""
+    final: Dict[Tuple[int, int], Tuple[int, bool]] = {}
+    for sequence, user_id, post_id, liked in ops:
+        final[(user_id, post_id)] = (sequence, liked)
+
+    db = SessionLocal()
+    try:
+        post_ids = {post_id for _, post_id in final}
+        # Likes for posts deleted in the meantime are dropped
+        owners = dict(db.query(Post.id, Post.user_id).filter(Post.id.in_(post_ids)).all())
+        final = {key: value for key, value in final.items() if key[1] in owners}
+        liked = [key for key, (_, like) in final.items() if like]
+        unliked = [key for key, (_, like) in final.items() if not like]
+        inserted = insert_ignore_returning(
+            db,
+            Like,
+            [{"user_id": user_id, "post_id": post_id} for user_id, post_id in liked],
+            ("user_id", "post_id"),
+            returning=("user_id", "post_id"),
+        )
+        deleted = delete_returning(db, Like, ("user_id", "post_id"), unliked)
+
+        # Only rows that actually changed move the counters
+        deltas = Counter(post_id for _, post_id in inserted)
+        deltas.subtract(post_id for _, post_id in deleted)
+        add_to_counters(db, Post.likes_count, deltas)
+        notifications = like_notifications(db, inserted, owners)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    with _pending_lock:
+        for key, (sequence, _) in final.items():
+            # A newer operation for the same like stays pending until its own flush
+            if _pending.get(key, (None,))[0] == sequence:
+                del _pending[key]
+        for _, user_id, post_id, _ in ops:
+            if (user_id, post_id) not in final:
+                _pending.pop((user_id, post_id), None)
+    create_notifications(notifications)
+    return dict(deltas)
+
+
+def like_notifications(
+    db: Session, inserted: List[Tuple[int, int]], owners: Dict[int, int]
+) -> List[dict]:
+    """Notifications for newly written (user_id, post_id) likes; liking your own post notifies no one."""
+    inserted = [(user_id, post_id) for user_id, post_id in inserted if owners[post_id] != user_id]
+    if not inserted:
+        return []
+    usernames = dict(
+        db.query(User.id, User.username)
+        .filter(User.id.in_({user_id for user_id, _ in inserted}))
+        .all()
+    )
+    return [
+        {
+            "recipient_id": owners[post_id],
+            "sender_id": user_id,
+            "notification_type": "like",
+            "message": f"{usernames[user_id]} liked your post",
+            "post_id": post_id,
+        }
+        for user_id, post_id in inserted
+    ]
+
+
+like_buffer: WriteBuffer = WriteBuffer(
+    write_likes, interval=settings.LIKE_FLUSH_SECONDS, max_items=settings.LIKE_BUFFER_MAX
+)
+
+
+def queue_like(user_id: int, post_id: int, liked: bool) -> None:
+    """Record a like (or unlike) to be written on the next flush."""
+    with _pending_lock:
+        sequence = next(_sequence)
+        _pending[(user_id, post_id)] = (sequence, liked)
+    like_buffer.add([(sequence, user_id, post_id, liked)])
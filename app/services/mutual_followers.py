@@ -0,0 +1,128 @@
+"""
+"Followed by X, Y and N others you know" summaries for profile views.
+
+The mutual followers of a profile are the intersection of the viewer's
+following list with the profile's follower list. Both are sorted rows of the
+follow graph index, so the smaller side is walked and each id is binary
+searched in the other user's row: O(min(m, n) * log k) with no database
+access, regardless of how large the bigger side is.
+
+A walk that exceeds MUTUAL_FOLLOWERS_BUDGET_MS stops early and the summary is
+flagged ``is_partial`` (the count is then a lower bound). Results are kept in
+a per-worker LRU keyed by (viewer, profile) and tagged with the graph version,
+so any follow/unfollow invalidates them.
+"""
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.follow_graph import follow_graph
+
+TOP_NAMES = 3
+_CLOCK_EVERY = 256  # membership checks between budget checks
+
+
+class _PairCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def get(self, key: tuple, version: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, version: int, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.MUTUAL_FOLLOWERS_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+
+_cache = _PairCache()
+
+
+def _intersect(viewer_id: int, user_id: int) -> dict:
+    """Walk the smaller side, binary-searching each id in the other side's row."""
+    if follow_graph.follower_count(user_id) < follow_graph.following_count(viewer_id):
+        # Profile's followers that the viewer also follows
+        candidates = follow_graph.follower_ids(user_id)
+        matches = lambda other: follow_graph.is_following(viewer_id, other)
+    else:
+        # People the viewer follows who follow the profile
+        candidates = follow_graph.following_ids(viewer_id)
+        matches = lambda other: follow_graph.is_following(other, user_id)
+
+    deadline = time.perf_counter() + settings.MUTUAL_FOLLOWERS_BUDGET_MS / 1000
+    count = 0
+    top = []  # min-heap of (followers, -id): the best-known mutuals are shown by name
+    is_partial = False
+    for i, other in enumerate(candidates):
+        if i % _CLOCK_EVERY == 0 and i and time.perf_counter() > deadline:
+            is_partial = True
+            break
+        if other == viewer_id or not matches(other):
+            continue
+        count += 1
+        entry = (follow_graph.follower_count(other), -other)
+        if len(top) < TOP_NAMES:
+            heapq.heappush(top, entry)
+        elif entry > top[0]:
+            heapq.heapreplace(top, entry)
+
+    top_ids = [-negated for _, negated in sorted(top, reverse=True)]
+    return {"count": count, "top_ids": top_ids, "is_partial": is_partial}
+
+
+def get_mutual_followers(db: Session, viewer_id: int, user_id: int) -> Optional[dict]:
+    """
+    Summary for `viewer_id` looking at `user_id`'s profile:
+    ``{"count", "top_usernames", "is_partial"}``, or None for the viewer's own profile.
+    """
+    return get_mutual_followers_many(db, viewer_id, [user_id])[user_id]
+
+
+def mutual_summaries(db: Session, viewer_id: int, user_ids: Iterable[int]) -> Dict[int, dict]:
+    """Cached ``{"count", "top_ids", "is_partial"}`` per profile other than the viewer's; no database reads."""
+    follow_graph.ensure_fresh(db)
+    version = follow_graph.version
+    summaries = {}
+    for user_id in user_ids:
+        if user_id == viewer_id:
+            continue
+        key = (viewer_id, user_id)
+        summary = _cache.get(key, version)
+        if summary is None:
+            summary = _intersect(viewer_id, user_id)
+            _cache.put(key, version, summary)
+        summaries[user_id] = summary
+    return summaries
+
+
+def get_mutual_followers_many(
+    db: Session, viewer_id: int, user_ids: Iterable[int]
+) -> Dict[int, Optional[dict]]:
+    """Batch form of `get_mutual_followers`; the top usernames of every profile come from one query."""
+    summaries = mutual_summaries(db, viewer_id, user_ids)
+    top_ids = {uid for summary in summaries.values() for uid in summary["top_ids"]}
+    names = {}
+    if top_ids:
+        names = dict(db.query(User.id, User.username).filter(User.id.in_(top_ids)).all())
+    results: Dict[int, Optional[dict]] = {viewer_id: None}
+    for user_id, summary in summaries.items():
+        results[user_id] = {
+            "count": summary["count"],
+            "top_usernames": [names[uid] for uid in summary["top_ids"] if uid in names],
+            "is_partial": summary["is_partial"],
+        }
+    return results
@@ -0,0 +1,181 @@
+"""
+Batched post hydration.
+
+``build_posts`` turns any number of posts into ``PostResponse`` objects with a
+fixed number of queries: authors, comment counts, the viewer's likes and tags
+are each loaded for the whole batch at once. Like counts come from the stored
+``Post.likes_count``, adjusted for the viewer's own likes that are still
+waiting in the write-behind buffer.
+
+With a sparse fieldset only the requested columns are loaded
+(``post_load_options``) and only the queries behind requested fields run.
+
+``post_versions`` is the cheap counterpart used for ETags: one query returning,
+per post, the columns and counters that change whenever its response would.
+"""
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
+
+from app.models.post import Post, Tag, post_tags
+from app.models.social import Comment, Like
+from app.models.user import Profile, User
+from app.schemas.post import PostResponse
+from app.services.likes import pending_likes
+from app.utils.fieldsets import column_names, response_model_for, wants
+
+# PostResponse fields read straight from the posts row
+_POST_COLUMNS = (
+    "user_id",
+    "caption",
+    "image",
+    "image_variants",
+    "is_published",
+    "scheduled_time",
+    "timestamp",
+    "likes_count",
+    "top_comments",
+)
+
+
+def _post_authors(db: Session, user_ids) -> Dict[int, tuple]:
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    rows = (
+        db.query(User.id, User.username, Profile.profile_picture)
+        .outerjoin(Profile, Profile.user_id == User.id)
+        .filter(User.id.in_(user_ids))
+        .all()
+    )
+    return {row.id: (row.username, row.profile_picture) for row in rows}
+
+
+def _post_tags(db: Session, post_ids: List[int]) -> Dict[int, List[Tag]]:
+    tags: Dict[int, List[Tag]] = {post_id: [] for post_id in post_ids}
+    rows = (
+        db.query(post_tags.c.post_id, Tag)
+        .join(Tag, Tag.id == post_tags.c.tag_id)
+        .filter(post_tags.c.post_id.in_(post_ids))
+        .all()
+    )
+    for post_id, tag in rows:
+        tags[post_id].append(tag)
+    return tags
+
+
+def post_load_options(fields: Optional[Set[str]]) -> list:
+    """Query options loading only the post columns a fieldset needs."""
+    if fields is None:
+        return []
+    columns = column_names(fields, _POST_COLUMNS)
+    return [load_only(Post.id, Post.user_id, *[getattr(Post, name) for name in columns])]
+
+
+def post_versions(db: Session, post_ids: Iterable[int], current_user_id: int) -> Dict[int, tuple]:
+    """
+    Per post, what its response for `current_user_id` depends on: the row's own
+    changing columns (``updated_at`` covers caption and tag edits), the author's
+    picture, the comment count and the viewer's like, pending ones included.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return {}
+    comments_count = (
+        db.query(func.count(Comment.id))
+        .filter(Comment.post_id == Post.id)
+        .correlate(Post)
+        .scalar_subquery()
+    )
+    liked = (
+        db.query(Like.id)
+        .filter(Like.post_id == Post.id, Like.user_id == current_user_id)
+        .correlate(Post)
+        .exists()
+    )
+    rows = (
+        db.query(
+            Post.id,
+            Post.updated_at,
+            Post.is_published,
+            Post.likes_count,
+            Post.image_variants,
+            Post.top_comments,
+            Profile.profile_picture,
+            comments_count,
+            liked,
+        )
+        .outerjoin(Profile, Profile.user_id == Post.user_id)
+        .filter(Post.id.in_(post_ids))
+        .all()
+    )
+    pending = pending_likes(current_user_id, post_ids)
+    return {row[0]: tuple(row[1:]) + (pending.get(row[0]),) for row in rows}
+
+
+def build_posts(
+    db: Session,
+    posts: List[Post],
+    current_user_id: Optional[int] = None,
+    fields: Optional[Set[str]] = None,
+) -> List[PostResponse]:
+    """Hydrate posts with author, counts, tags and is_liked in up to five queries, skipping unrequested ones."""
+    if not posts:
+        return []
+    post_ids = [post.id for post in posts]
+    authors = {}
+    if wants(fields, "username", "user_profile_picture"):
+        authors = _post_authors(db, [post.user_id for post in posts])
+    comments_counts = {}
+    if wants(fields, "comments_count"):
+        comments_counts = dict(
+            db.query(Comment.post_id, func.count(Comment.id))
+            .filter(Comment.post_id.in_(post_ids))
+            .group_by(Comment.post_id)
+            .all()
+        )
+    tags = _post_tags(db, post_ids) if wants(fields, "tags") else {}
+
+    stored_likes = set()
+    pending = {}
+    if current_user_id and wants(fields, "is_liked", "likes_count"):
+        pending = pending_likes(current_user_id, post_ids)
+        # likes_count alone only needs the stored state of posts with a pending like
+        lookup = post_ids if wants(fields, "is_liked") else list(pending)
+        if lookup:
+            stored_likes = {
+                post_id
+                for (post_id,) in db.query(Like.post_id)
+                .filter(Like.user_id == current_user_id, Like.post_id.in_(lookup))
+                .all()
+            }
+
+    model = response_model_for(PostResponse, fields)
+    columns = column_names(fields, _POST_COLUMNS)
+    responses = []
+    for post in posts:
+        values = {name: getattr(post, name) for name in columns}
+        values["id"] = post.id
+        is_liked = post.id in stored_likes
+        # Read back the viewer's own like or unlike before it is flushed
+        if pending.get(post.id, is_liked) != is_liked:
+            is_liked = pending[post.id]
+            if "likes_count" in values:
+                values["likes_count"] = (values["likes_count"] or 0) + (1 if is_liked else -1)
+        if wants(fields, "is_liked"):
+            values["is_liked"] = is_liked
+        if "likes_count" in values:
+            values["likes_count"] = values["likes_count"] or 0
+        if "top_comments" in values:
+            values["top_comments"] = values["top_comments"] or []
+        if wants(fields, "username", "user_profile_picture"):
+            values["username"], values["user_profile_picture"] = authors.get(
+                post.user_id, (None, None)
+            )
+        if wants(fields, "comments_count"):
+            values["comments_count"] = comments_counts.get(post.id, 0)
+        if wants(fields, "tags"):
+            values["tags"] = tags[post.id]
+        responses.append(model(**values))
+    return responses
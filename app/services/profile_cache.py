@@ -0,0 +1,327 @@
+"""
+Two-tier cache of rendered profile payloads.
+
+A profile payload is the viewer-independent part of ``UserWithProfile`` (user,
+profile and the three counts) serialized to JSON; the viewer's mutual-follower
+summary is added per request from the follow graph. Lookups go through:
+
+1. a per-worker LRU (PROFILE_CACHE_SIZE entries), whose entries live at most
+   PROFILE_CACHE_LOCAL_SECONDS so writes made in other processes show up
+   quickly;
+2. an optional shared tier (PROFILE_CACHE_SHARED_URL: ``redis://...``, or
+   ``memory://`` for an in-process stand-in) kept for PROFILE_CACHE_SHARED_SECONDS;
+3. ``build_users`` on a miss, which fills both tiers.
+
+Writes that change a payload call ``invalidate_profiles`` after committing:
+profile edits and picture changes, follows and unfollows (both sides' counts),
+and post creation and deletion. Hit rates, memory use and the age of served
+payloads are reported by ``profile_cache.stats()``.
+
+A worker may finish building a payload after another process has invalidated
+it. Invalidation therefore also writes a fresh random token per user to the
+shared tier. Payloads are stored tagged with the token read before they were
+built, and one whose tag no longer matches the current token is treated as a
+miss. Tokens outlive every payload built before them, so an expired token
+cannot make a stale payload current again.
+"""
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.user import UserWithProfile
+from app.services.user_details import build_users
+
+KEY_PREFIX = "profile:"
+TOKEN_PREFIX = "profile-token:"
+_BUILD_HORIZON_SECONDS = 60.0  # no payload takes longer than this to build
+
+
+class SharedBackend(ABC):
+    """Interface of the shared tier: raw bytes by key with a TTL."""
+
+    @abstractmethod
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """Values of `keys` in order, None where missing."""
+
+    @abstractmethod
+    def set_many(self, items: Dict[str, bytes], ttl: int) -> None:
+        """Store every item, each expiring after `ttl` seconds."""
+
+    @abstractmethod
+    def delete(self, keys: List[str]) -> None:
+        """Remove `keys`; missing keys are ignored."""
+
+
+class MemoryBackend(SharedBackend):
+    """In-process shared tier for development and tests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, bytes]] = {}
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            return [self._get(key) for key in keys]
+
+    def _get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    def set_many(self, items: Dict[str, bytes], ttl: int) -> None:
+        with self._lock:
+            expires_at = time.monotonic() + ttl
+            for key, value in items.items():
+                self._entries[key] = (expires_at, value)
+
+    def delete(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class RedisBackend(SharedBackend):
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return self._client.mget(keys)
+
+    def set_many(self, items: Dict[str, bytes], ttl: int) -> None:
+        pipeline = self._client.pipeline()
+        for key, value in items.items():
+            pipeline.set(key, value, ex=ttl)
+        pipeline.execute()
+
+    def delete(self, keys: List[str]) -> None:
+        if keys:
+            self._client.delete(*keys)
+
+
+def make_backend(url: Optional[str]) -> Optional[SharedBackend]:
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    return RedisBackend(url)
+
+
+def _pack(rendered_at: float, token: bytes, payload: bytes) -> bytes:
+    return f"{rendered_at:.6f}\n".encode() + token + b"\n" + payload
+
+
+def _unpack(value: bytes) -> Tuple[float, bytes, bytes]:
+    stamp, _, rest = value.partition(b"\n")
+    token, _, payload = rest.partition(b"\n")
+    return float(stamp), token, payload
+
+
+class ProfileCache:
+    def __init__(self, shared: Optional[SharedBackend] = None):
+        self.shared = shared
+        self._lock = threading.Lock()
+        # user_id -> (expires_at monotonic, rendered_at wall clock, payload)
+        self._local: "OrderedDict[int, Tuple[float, float, bytes]]" = OrderedDict()
+        self._local_bytes = 0
+        # user_id -> when it was last invalidated, so a payload read before that is not stored after it
+        self._invalidated: Dict[int, float] = {}
+        self._counters = dict.fromkeys(
+            (
+                "local_hits",
+                "shared_hits",
+                "shared_stale",
+                "misses",
+                "invalidations",
+                "evictions",
+                "shared_errors",
+            ),
+            0,
+        )
+        self._served_age_sum = 0.0
+        self._served_age_max = 0.0
+
+    # ----- local tier -----
+    def _local_get(self, user_id: int) -> Optional[Tuple[float, bytes]]:
+        entry = self._local.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._local_drop(user_id)
+            return None
+        self._local.move_to_end(user_id)
+        return entry[1], entry[2]
+
+    def _local_put(self, user_id: int, rendered_at: float, payload: bytes) -> None:
+        self._local_drop(user_id)
+        self._local[user_id] = (
+            time.monotonic() + settings.PROFILE_CACHE_LOCAL_SECONDS,
+            rendered_at,
+            payload,
+        )
+        self._local_bytes += len(payload)
+        while len(self._local) > settings.PROFILE_CACHE_SIZE:
+            self._local_drop(next(iter(self._local)))
+            self._counters["evictions"] += 1
+
+    def _local_drop(self, user_id: int) -> None:
+        entry = self._local.pop(user_id, None)
+        if entry is not None:
+            self._local_bytes -= len(entry[2])
+
+    def _invalidated_since(self, user_id: int, started: float) -> bool:
+        return self._invalidated.get(user_id, float("-inf")) >= started
+
+    def _served(self, counter: str, rendered_at: float) -> None:
+        age = max(time.time() - rendered_at, 0.0)
+        self._counters[counter] += 1
+        self._served_age_sum += age
+        self._served_age_max = max(self._served_age_max, age)
+
+    # ----- shared tier -----
+    def _shared_get(self, user_id: int) -> Tuple[Optional[Tuple[float, bytes]], Optional[bytes]]:
+        """
+        The shared entry for `user_id` if it is still current, and the user's current token
+        (None when the tier is unavailable, so nothing gets stored under an unknown token).
+        """
+        if self.shared is None:
+            return None, None
+        try:
+            value, token = self.shared.get_many(
+                [KEY_PREFIX + str(user_id), TOKEN_PREFIX + str(user_id)]
+            )
+        except Exception:
+            # The shared tier is an optimization: fall back to the database
+            with self._lock:
+                self._counters["shared_errors"] += 1
+            return None, None
+        token = token or b""
+        if not value:
+            return None, token
+        rendered_at, tag, payload = _unpack(value)
+        if tag != token:
+            # Built before another process invalidated this user
+            with self._lock:
+                self._counters["shared_stale"] += 1
+            return None, token
+        return (rendered_at, payload), token
+
+    def _shared_call(self, method: str, *args) -> None:
+        if self.shared is None:
+            return
+        try:
+            getattr(self.shared, method)(*args)
+        except Exception:
+            with self._lock:
+                self._counters["shared_errors"] += 1
+
+    # ----- public -----
+    def get(self, db: Session, user_id: int, user: Optional[User] = None) -> Optional[bytes]:
+        """The payload for `user_id`, building it on a miss; None when the user does not exist."""
+        with self._lock:
+            cached = self._local_get(user_id)
+            if cached is not None:
+                self._served("local_hits", cached[0])
+                return cached[1]
+            started = time.monotonic()
+
+        # Read before building: a token written after this point makes what we build stale
+        shared, token = self._shared_get(user_id)
+        if shared is not None:
+            with self._lock:
+                self._served("shared_hits", shared[0])
+                if not self._invalidated_since(user_id, started):
+                    self._local_put(user_id, *shared)
+            return shared[1]
+
+        if user is None:
+            user = db.query(User).filter(User.id == user_id).first()
+            if user is None:
+                return None
+        profile = build_users(db, [user])[0]
+        payload = profile.__pydantic_serializer__.to_json(profile, exclude={"mutual_followers"})
+        rendered_at = time.time()
+        with self._lock:
+            self._served("misses", rendered_at)
+            if self._invalidated_since(user_id, started):
+                return payload
+            self._local_put(user_id, rendered_at, payload)
+        if token is not None:
+            self._shared_call(
+                "set_many",
+                {KEY_PREFIX + str(user_id): _pack(rendered_at, token, payload)},
+                settings.PROFILE_CACHE_SHARED_SECONDS,
+            )
+        return payload
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        with self._lock:
+            now = time.monotonic()
+            for user_id in user_ids:
+                self._local_drop(user_id)
+                self._invalidated[user_id] = now
+            self._counters["invalidations"] += len(user_ids)
+            if len(self._invalidated) > settings.PROFILE_CACHE_SIZE:
+                # Only payloads still being built can be affected by old invalidations
+                horizon = now - _BUILD_HORIZON_SECONDS
+                self._invalidated = {
+                    uid: at for uid, at in self._invalidated.items() if at > horizon
+                }
+        # New tokens first, so a payload another worker is still building is rejected once stored.
+        # They outlive any payload built before them (built within the horizon, kept for the TTL).
+        self._shared_call(
+            "set_many",
+            {TOKEN_PREFIX + str(user_id): uuid.uuid4().hex.encode() for user_id in user_ids},
+            settings.PROFILE_CACHE_SHARED_SECONDS + int(_BUILD_HORIZON_SECONDS),
+        )
+        self._shared_call("delete", [KEY_PREFIX + str(user_id) for user_id in user_ids])
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            served = counters["local_hits"] + counters["shared_hits"] + counters["misses"]
+            return {
+                **counters,
+                "hit_rate": round((counters["local_hits"] + counters["shared_hits"]) / served, 4)
+                if served
+                else None,
+                "local_entries": len(self._local),
+                "local_bytes": self._local_bytes,
+                "shared_backend": type(self.shared).__name__ if self.shared else None,
+                "served_age_avg_seconds": round(self._served_age_sum / served, 3)
+                if served
+                else None,
+                "served_age_max_seconds": round(self._served_age_max, 3),
+            }
+
+
+profile_cache = ProfileCache(make_backend(settings.PROFILE_CACHE_SHARED_URL))
+
+
+def cached_profile(db: Session, user_id: int, user: Optional[User] = None) -> Optional[bytes]:
+    """Rendered payload of `user_id`'s profile, without the mutual-follower summary."""
+    return profile_cache.get(db, user_id, user)
+
+
+def load_profile(payload: bytes) -> UserWithProfile:
+    return UserWithProfile.model_validate_json(payload)
+
+
+def invalidate_profiles(*user_ids: int) -> None:
+    """Forget cached profiles after a committed change to their user, profile or counts."""
+    profile_cache.invalidate(user_ids)
@@ -0,0 +1,40 @@
+"""
+Story expiry scheduling.
+
+Instead of scanning ``stories`` for ``expires_at <= now``, every story gets a
+row in ``story_expiry_buckets`` keyed by the minute it expires in (rounded
+up). The reaper reads the index range of buckets that are due and deletes
+exactly those stories; its cost is proportional to what expires, not to how
+many stories exist. A due row whose story is not actually expired (left by a
+deleted story whose id was reused) is moved to the story's real bucket.
+"""
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from app.models.social import Story, StoryExpiry
+
+
+def as_utc(value: datetime) -> datetime:
+    """SQLite hands back naive datetimes; treat them as the UTC they were stored as."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def expiry_bucket(expires_at: datetime) -> int:
+    """Minutes since the epoch, rounded up: a bucket is due once its minute has started."""
+    return math.ceil(as_utc(expires_at).timestamp() / 60)
+
+
+def due_bucket(now: datetime = None) -> int:
+    """Newest bucket whose stories have all expired at `now`."""
+    now = now or datetime.now(timezone.utc)
+    return math.floor(now.timestamp() / 60)
+
+
+def schedule_expiry(db: Session, story: Story) -> None:
+    """
+    Put a freshly flushed story in its expiry bucket (caller commits). Merged rather than added:
+    a bucket row left by a deleted story whose id SQLite has since reused is taken over.
+    """
+    db.merge(StoryExpiry(story_id=story.id, bucket=expiry_bucket(story.expires_at)))
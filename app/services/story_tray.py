@@ -0,0 +1,305 @@
+"""
+Story tray and batched story hydration.
+
+The tray is one ring per author with active stories. Ring state for every
+author comes from a single grouped query over ``stories`` left-joined with the
+viewer's ``story_views``; authors are fetched in one more query. Unseen rings
+sort before fully seen ones, most recent first. A ring's stories are loaded
+lazily (``/stories/user/{id}``) with ``build_stories``, which hydrates any
+number of stories with a constant number of queries. View counts are read from
+``Story.views_count``; owners get the first STORY_VIEWERS_PREVIEW viewers of
+each story and page through the rest ordered by ``viewed_at``.
+
+Trays are cached per viewer for at most STORY_TRAY_CACHE_SECONDS, tagged with
+the follow graph version. An entry never outlives the earliest story expiry in
+it, so an expired story drops out of the tray exactly when it expires. Viewing
+stories or creating/deleting one's own story drops the entry immediately.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.social import Story, StoryView
+from app.models.user import Profile, User
+from app.schemas.social import StoryResponse, StoryRing, StoryViewer
+from app.services.follow_graph import follow_graph
+from app.services.story_expiry import as_utc
+from app.utils.fieldsets import only, response_model_for, wants
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+class _TrayCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[int, datetime, List[StoryRing]]] = {}
+
+    def get(self, viewer_id: int, version: int, now: datetime) -> Optional[List[StoryRing]]:
+        with self._lock:
+            entry = self._entries.get(viewer_id)
+            if entry is None or entry[0] != version or entry[1] <= now:
+                return None
+            return entry[2]
+
+    def put(
+        self, viewer_id: int, version: int, valid_until: datetime, rings: List[StoryRing]
+    ) -> None:
+        with self._lock:
+            self._entries[viewer_id] = (version, valid_until, rings)
+            # Lazily drop entries that can no longer be served
+            if len(self._entries) > settings.STORY_TRAY_CACHE_SIZE:
+                now = datetime.now(timezone.utc)
+                for key in [key for key, (_, until, _) in self._entries.items() if until <= now]:
+                    del self._entries[key]
+                while len(self._entries) > settings.STORY_TRAY_CACHE_SIZE:
+                    del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, viewer_ids: Iterable[int]) -> None:
+        with self._lock:
+            for viewer_id in viewer_ids:
+                self._entries.pop(viewer_id, None)
+
+
+_tray_cache = _TrayCache()
+
+
+def invalidate_tray(*viewer_ids: int) -> None:
+    """Forget cached trays, e.g. after the viewer watched stories or changed their own."""
+    _tray_cache.invalidate(viewer_ids)
+
+
+def _story_authors(db: Session, user_ids: Iterable[int]) -> Dict[int, dict]:
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    rows = (
+        db.query(User.id, User.username, Profile.profile_picture, Profile.bio, Profile.website)
+        .outerjoin(Profile, Profile.user_id == User.id)
+        .filter(User.id.in_(user_ids))
+        .all()
+    )
+    return {
+        row.id: {
+            "id": row.id,
+            "username": row.username,
+            "profile": {
+                "profile_picture": row.profile_picture,
+                "bio": row.bio,
+                "website": row.website,
+            },
+        }
+        for row in rows
+    }
+
+
+def load_tray(db: Session, viewer_id: int, author_ids: List[int]) -> List[StoryRing]:
+    """One ring per author with active stories: the viewer's own first, then unseen, then seen."""
+    return _query_tray(db, viewer_id, author_ids, datetime.now(timezone.utc))[0]
+
+
+def get_tray(db: Session, viewer_id: int, author_ids: List[int]) -> List[StoryRing]:
+    """``load_tray`` through the per-viewer cache."""
+    now = datetime.now(timezone.utc)
+    follow_graph.ensure_fresh(db)
+    version = follow_graph.version
+    rings = _tray_cache.get(viewer_id, version, now)
+    if rings is None:
+        rings, first_expiry = _query_tray(db, viewer_id, author_ids, now)
+        valid_until = now + timedelta(seconds=settings.STORY_TRAY_CACHE_SECONDS)
+        if first_expiry is not None:
+            valid_until = min(valid_until, first_expiry)
+        _tray_cache.put(viewer_id, version, valid_until, rings)
+    return rings
+
+
+def _query_tray(
+    db: Session, viewer_id: int, author_ids: List[int], now: datetime
+) -> Tuple[List[StoryRing], Optional[datetime]]:
+    """The tray and the earliest expiry among its stories (when the tray next changes by itself)."""
+    unseen = case((StoryView.id == None, Story.id))
+    rows = (
+        db.query(
+            Story.user_id,
+            func.count(Story.id).label("stories_count"),
+            func.count(StoryView.id).label("seen_count"),
+            func.max(Story.timestamp).label("latest_at"),
+            func.min(unseen).label("first_unseen_id"),
+            func.min(Story.id).label("first_id"),
+            func.min(Story.expires_at).label("first_expiry"),
+        )
+        .outerjoin(
+            StoryView, and_(StoryView.story_id == Story.id, StoryView.viewer_id == viewer_id)
+        )
+        .filter(Story.user_id.in_(author_ids), Story.expires_at > now)
+        .group_by(Story.user_id)
+        .all()
+    )
+    authors = _story_authors(db, [row.user_id for row in rows])
+
+    rings = []
+    for row in rows:
+        own = row.user_id == viewer_id
+        all_seen = own or row.seen_count >= row.stories_count
+        rings.append(
+            StoryRing(
+                user_id=row.user_id,
+                user=authors.get(row.user_id),
+                stories_count=row.stories_count,
+                unseen_count=0 if own else row.stories_count - row.seen_count,
+                all_seen=all_seen,
+                latest_at=row.latest_at,
+                start_story_id=row.first_id if all_seen else row.first_unseen_id,
+            )
+        )
+
+    # Own ring first, unseen before seen, newest activity first within each group
+    rings.sort(key=lambda ring: ring.latest_at, reverse=True)
+    rings.sort(key=lambda ring: (ring.user_id != viewer_id, ring.all_seen))
+    first_expiry = min((as_utc(row.first_expiry) for row in rows), default=None)
+    return rings, first_expiry
+
+
+def _viewer_rows(db: Session):
+    return (
+        db.query(
+            StoryView.id.label("view_id"),
+            StoryView.story_id,
+            StoryView.viewed_at,
+            User.id,
+            User.username,
+            Profile.profile_picture,
+        )
+        .join(User, StoryView.viewer_id == User.id)
+        .outerjoin(Profile, Profile.user_id == User.id)
+    )
+
+
+def _to_viewer(row) -> StoryViewer:
+    return StoryViewer(
+        id=row.id,
+        username=row.username,
+        profile_picture=row.profile_picture,
+        viewed_at=row.viewed_at,
+    )
+
+
+def _viewer_cursor(row) -> str:
+    return encode_cursor(row.viewed_at.isoformat(), row.view_id)
+
+
+def _viewer_previews(db: Session, story_ids: List[int], per_story: int) -> Dict[int, list]:
+    """The `per_story` most recent viewers of every story in one windowed query."""
+    previews: Dict[int, list] = {story_id: [] for story_id in story_ids}
+    if not story_ids or per_story <= 0:
+        return previews
+    ranked = (
+        db.query(
+            StoryView.id.label("id"),
+            func.row_number()
+            .over(
+                partition_by=StoryView.story_id,
+                order_by=(StoryView.viewed_at.desc(), StoryView.id.desc()),
+            )
+            .label("position"),
+        )
+        .filter(StoryView.story_id.in_(story_ids))
+        .subquery()
+    )
+    rows = (
+        _viewer_rows(db)
+        .join(ranked, ranked.c.id == StoryView.id)
+        .filter(ranked.c.position <= per_story)
+        .order_by(StoryView.story_id, ranked.c.position)
+        .all()
+    )
+    for row in rows:
+        previews[row.story_id].append(row)
+    return previews
+
+
+def load_viewer_page(
+    db: Session, story_id: int, cursor: Optional[str], limit: int
+) -> Tuple[List[StoryViewer], Optional[str]]:
+    """One page of a story's viewers, most recent first, and the cursor for the next page."""
+    query = _viewer_rows(db).filter(StoryView.story_id == story_id)
+    key = decode_cursor(cursor, datetime.fromisoformat, int)
+    if key is not None:
+        viewed_at, view_id = key
+        query = query.filter(
+            or_(
+                StoryView.viewed_at < viewed_at,
+                and_(StoryView.viewed_at == viewed_at, StoryView.id < view_id),
+            )
+        )
+    rows = query.order_by(StoryView.viewed_at.desc(), StoryView.id.desc()).limit(limit + 1).all()
+
+    next_cursor = _viewer_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return [_to_viewer(row) for row in rows[:limit]], next_cursor
+
+
+def build_stories(
+    db: Session,
+    stories: List[Story],
+    current_user_id: Optional[int] = None,
+    include_viewers: bool = False,
+    fields: Optional[Set[str]] = None,
+) -> List[StoryResponse]:
+    """Hydrate stories with author, has_viewed and (for the owner) the first viewers in up to three queries."""
+    if not stories:
+        return []
+    story_ids = [story.id for story in stories]
+    authors = (
+        _story_authors(db, [story.user_id for story in stories]) if wants(fields, "user") else {}
+    )
+
+    viewed = set()
+    if current_user_id and wants(fields, "has_viewed"):
+        viewed = {
+            story_id
+            for (story_id,) in db.query(StoryView.story_id)
+            .filter(StoryView.story_id.in_(story_ids), StoryView.viewer_id == current_user_id)
+            .all()
+        }
+
+    # Owners always see who viewed their own stories
+    owned_ids = [
+        story.id for story in stories if include_viewers or story.user_id == current_user_id
+    ]
+    viewers = {}
+    if wants(fields, "viewers", "viewers_next_cursor"):
+        viewers = _viewer_previews(db, owned_ids, settings.STORY_VIEWERS_PREVIEW)
+
+    model = response_model_for(StoryResponse, fields)
+    responses = []
+    for story in stories:
+        story_viewers = viewers.get(story.id, [])
+        views_count = story.views_count or 0
+        viewers_next_cursor = None
+        if story_viewers and views_count > len(story_viewers):
+            viewers_next_cursor = _viewer_cursor(story_viewers[-1])
+        responses.append(
+            model(
+                **only(
+                    {
+                        "id": story.id,
+                        "user_id": story.user_id,
+                        "image": story.image,
+                        "image_variants": story.image_variants,
+                        "media_type": getattr(story, "media_type", "image"),
+                        "caption": story.caption,
+                        "timestamp": story.timestamp,
+                        "expires_at": story.expires_at,
+                        "user": authors.get(story.user_id),
+                        "views_count": views_count,
+                        "has_viewed": story.user_id == current_user_id or story.id in viewed,
+                        "viewers": [_to_viewer(row) for row in story_viewers],
+                        "viewers_next_cursor": viewers_next_cursor,
+                    },
+                    fields,
+                )
+            )
+        )
+    return responses
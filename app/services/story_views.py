@@ -0,0 +1,84 @@
+"""
+Buffered story view ingestion.
+
+Views are (story_id, viewer_id, viewed_at) items collected in a per-worker
+WriteBuffer and written every STORY_VIEW_FLUSH_SECONDS with a single
+insert-or-ignore on the ``unique_story_view`` constraint, so tapping through
+50 stories costs one transaction instead of 50. Views of stories deleted
+before the flush are dropped. The insert returns exactly the views that were
+new, and the same transaction adds them to ``Story.views_count``, so reading
+a view count never counts rows. Each flush reports how many new views every
+story received. A view keeps the time it was recorded at, not the time of
+the flush that writes it.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.social import Story, StoryView
+from app.services.story_tray import invalidate_tray
+from app.utils.db_writes import add_to_counters, insert_ignore_returning
+from app.utils.write_buffer import WriteBuffer
+
+
+# (story_id, viewer_id, viewed_at)
+ViewItem = Tuple[int, int, datetime]
+
+
+def write_story_views(items: List[ViewItem]) -> Dict[int, int]:
+    """Insert buffered views, ignoring ones already recorded. Returns new views per story."""
+    # A story viewed twice before the flush counts from the first view
+    first_seen: Dict[Tuple[int, int], datetime] = {}
+    for story_id, viewer_id, viewed_at in items:
+        pair = (story_id, viewer_id)
+        if pair not in first_seen or viewed_at < first_seen[pair]:
+            first_seen[pair] = viewed_at
+
+    db = SessionLocal()
+    try:
+        # Views of stories deleted in the meantime are dropped
+        live = {
+            story_id
+            for (story_id,) in db.query(Story.id)
+            .filter(Story.id.in_({story_id for story_id, _ in first_seen}))
+            .all()
+        }
+        inserted = insert_ignore_returning(
+            db,
+            StoryView,
+            [
+                {"story_id": story_id, "viewer_id": viewer_id, "viewed_at": viewed_at}
+                for (story_id, viewer_id), viewed_at in first_seen.items()
+                if story_id in live
+            ],
+            ("story_id", "viewer_id"),
+            returning=("story_id",),
+        )
+        deltas = Counter(story_id for (story_id,) in inserted)
+        add_to_counters(db, Story.views_count, deltas)
+        db.commit()
+        # Trays cached between the view and this flush still show the stories as unseen
+        invalidate_tray(*{viewer_id for _, viewer_id in first_seen})
+        return dict(deltas)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+story_view_buffer: WriteBuffer = WriteBuffer(
+    write_story_views,
+    interval=settings.STORY_VIEW_FLUSH_SECONDS,
+    max_items=settings.STORY_VIEW_BUFFER_MAX,
+)
+
+
+def record_views(viewer_id: int, story_ids: List[int]) -> None:
+    invalidate_tray(viewer_id)
+    # Set here rather than by the server default so SQLite stores it in the same
+    # format viewer cursors are compared in
+    viewed_at = datetime.now(timezone.utc)
+    story_view_buffer.add([(story_id, viewer_id, viewed_at) for story_id in story_ids])
@@ -0,0 +1,131 @@
+"""
+Friends-of-friends suggestions ("suggested for you").
+
+The follow graph is loaded into a SciPy CSR adjacency matrix ``A`` (row =
+follower, column = followed user). For a block of users ``B = A[users]``,
+``(B @ A)[u, x]`` counts how many of the people ``u`` follows also follow
+``x``: the mutual-follow score. Blocks of SUGGESTIONS_BATCH_ROWS users keep
+the intermediate product small; self and already-followed users are masked
+out before the top-K per row is taken.
+
+Follow/unfollow only mark the follower dirty (one row). The incremental job
+recomputes the dirty users plus their followers, the only users whose scores
+an edge change can move.
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.models.social import Follow, SuggestionDirtyUser, UserSuggestion
+from app.models.user import User
+
+
+def build_adjacency(
+    follower_ids: np.ndarray, following_ids: np.ndarray, size: int
+) -> sparse.csr_matrix:
+    data = np.ones(len(follower_ids), dtype=np.int32)
+    return sparse.csr_matrix((data, (follower_ids, following_ids)), shape=(size, size))
+
+
+def load_adjacency(db: Session) -> sparse.csr_matrix:
+    """Read every follow edge into a CSR matrix sized by the largest user id."""
+    size = (db.query(User.id).order_by(User.id.desc()).limit(1).scalar() or 0) + 1
+    rows = db.query(Follow.follower_id, Follow.following_id).yield_per(50000)
+    edges = np.fromiter((value for row in rows for value in row), dtype=np.int64).reshape(-1, 2)
+    return build_adjacency(edges[:, 0], edges[:, 1], size)
+
+
+def top_mutuals(
+    adjacency: sparse.csr_matrix, user_ids: Sequence[int], top_k: int
+) -> Dict[int, List[Tuple[int, int]]]:
+    """Top-K (suggested_user_id, mutual_count) per user, best first, ties by lower id."""
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    block = adjacency[user_ids]
+    scores = (block @ adjacency).tocsr()
+
+    # Zero out self and users already followed, then drop the explicit zeros
+    own = sparse.csr_matrix(
+        (np.ones(len(user_ids), dtype=np.int32), (np.arange(len(user_ids)), user_ids)),
+        shape=scores.shape,
+    )
+    excluded = ((block + own) > 0).astype(np.int32)
+    scores = (scores - scores.multiply(excluded)).tocsr()
+    scores.eliminate_zeros()
+
+    results = {}
+    for i, user_id in enumerate(user_ids.tolist()):
+        start, end = scores.indptr[i], scores.indptr[i + 1]
+        if start == end:
+            results[user_id] = []
+            continue
+        candidates = scores.indices[start:end]
+        counts = scores.data[start:end]
+        if len(candidates) > top_k:
+            keep = np.argpartition(-counts, top_k - 1)[:top_k]
+            candidates, counts = candidates[keep], counts[keep]
+        order = np.lexsort((candidates, -counts))
+        results[user_id] = list(zip(candidates[order].tolist(), counts[order].tolist()))
+    return results
+
+
+def store_suggestions(db: Session, results: Dict[int, List[Tuple[int, int]]]) -> int:
+    """Replace the stored suggestions of every user in `results`. Caller commits."""
+    if not results:
+        return 0
+    db.query(UserSuggestion).filter(UserSuggestion.user_id.in_(list(results))).delete(
+        synchronize_session=False
+    )
+    rows = [
+        {"user_id": user_id, "suggested_user_id": suggested_id, "mutual_count": count, "rank": rank}
+        for user_id, suggestions in results.items()
+        for rank, (suggested_id, count) in enumerate(suggestions)
+    ]
+    db.bulk_insert_mappings(UserSuggestion, rows)
+    return len(rows)
+
+
+def compute_and_store(
+    db: Session, adjacency: sparse.csr_matrix, user_ids: Iterable[int]
+) -> Tuple[int, int]:
+    """Recompute suggestions for `user_ids` in row blocks, committing each block. Returns (users, rows)."""
+    user_ids = sorted(int(user_id) for user_id in set(user_ids) if user_id < adjacency.shape[0])
+    batch = settings.SUGGESTIONS_BATCH_ROWS
+    stored = 0
+    for offset in range(0, len(user_ids), batch):
+        results = top_mutuals(
+            adjacency, user_ids[offset : offset + batch], settings.SUGGESTIONS_TOP_K
+        )
+        stored += store_suggestions(db, results)
+        db.commit()
+    return len(user_ids), stored
+
+
+def affected_users(adjacency: sparse.csr_matrix, changed_ids: Iterable[int]) -> np.ndarray:
+    """Users whose scores can move when `changed_ids` follow/unfollow someone: themselves and their followers."""
+    changed = np.asarray(
+        [user_id for user_id in changed_ids if user_id < adjacency.shape[0]], dtype=np.int64
+    )
+    if not len(changed):
+        return changed
+    followers = adjacency.tocsc()[:, changed].indices
+    return np.union1d(changed, followers)
+
+
+def mark_dirty(db: Session, user_id: int) -> None:
+    """Flag a user whose follows changed, inside the caller's transaction."""
+    updated = (
+        db.query(SuggestionDirtyUser)
+        .filter(SuggestionDirtyUser.user_id == user_id)
+        .update({SuggestionDirtyUser.marked_at: func.now()}, synchronize_session=False)
+    )
+    if not updated:
+        try:
+            with db.begin_nested():
+                db.add(SuggestionDirtyUser(user_id=user_id))
+        except IntegrityError:
+            pass  # Marked concurrently
@@ -0,0 +1,82 @@
+"""
+Batched user profile hydration.
+
+``build_users`` returns ``UserWithProfile`` objects for any number of users
+with one query each for profiles, post counts, follower counts and following
+counts, instead of four queries per user. Mutual-follower summaries come from
+the in-process follow graph, with the usernames for all of them loaded at once.
+With a sparse fieldset only the queries behind requested fields run.
+"""
+from typing import List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.post import Post
+from app.models.social import Follow
+from app.models.user import Profile, User
+from app.schemas.user import UserWithProfile
+from app.services.mutual_followers import get_mutual_followers_many
+from app.utils.fieldsets import only, response_model_for, wants
+
+
+def _grouped_counts(db: Session, group_column, count_column, user_ids: List[int]) -> dict:
+    return dict(
+        db.query(group_column, func.count(count_column))
+        .filter(group_column.in_(user_ids))
+        .group_by(group_column)
+        .all()
+    )
+
+
+def build_users(
+    db: Session,
+    users: List[User],
+    current_user_id: Optional[int] = None,
+    include_mutuals: bool = False,
+    fields: Optional[Set[str]] = None,
+) -> List[UserWithProfile]:
+    """Hydrate users with profile and stats; profile views also get the mutual-follower summary"""
+    if not users:
+        return []
+    user_ids = [user.id for user in users]
+    profiles = {}
+    if wants(fields, "profile"):
+        profiles = {
+            profile.user_id: profile
+            for profile in db.query(Profile).filter(Profile.user_id.in_(user_ids)).all()
+        }
+    posts_counts = (
+        _grouped_counts(db, Post.user_id, Post.id, user_ids) if wants(fields, "posts_count") else {}
+    )
+    followers_counts = {}
+    if wants(fields, "followers_count"):
+        followers_counts = _grouped_counts(db, Follow.following_id, Follow.id, user_ids)
+    following_counts = {}
+    if wants(fields, "following_count"):
+        following_counts = _grouped_counts(db, Follow.follower_id, Follow.id, user_ids)
+    mutuals = {}
+    if include_mutuals and current_user_id and wants(fields, "mutual_followers"):
+        mutuals = get_mutual_followers_many(db, current_user_id, user_ids)
+
+    model = response_model_for(UserWithProfile, fields)
+    return [
+        model(
+            **only(
+                {
+                    "id": user.id,
+                    "username": user.username,
+                    "email": user.email,
+                    "is_active": user.is_active,
+                    "date_joined": user.date_joined,
+                    "profile": profiles.get(user.id),
+                    "posts_count": posts_counts.get(user.id, 0),
+                    "followers_count": followers_counts.get(user.id, 0),
+                    "following_count": following_counts.get(user.id, 0),
+                    "mutual_followers": mutuals.get(user.id),
+                },
+                fields,
+            )
+        )
+        for user in users
+    ]
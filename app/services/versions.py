@@ -0,0 +1,34 @@
+"""
+Version counters for in-process caches in multi-worker deployments.
+
+A writer bumps the counter inside the transaction that changes the data;
+other workers compare it with the version their cache was built from.
+"""
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.cache import CacheVersion
+
+
+def get_version(db: Session, name: str) -> int:
+    version = db.query(CacheVersion.version).filter(CacheVersion.name == name).scalar()
+    return version or 0
+
+
+def bump_version(db: Session, name: str) -> int:
+    """Increment a counter as part of the caller's transaction and return the new value."""
+    updated = (
+        db.query(CacheVersion)
+        .filter(CacheVersion.name == name)
+        .update({CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False)
+    )
+    if not updated:
+        try:
+            with db.begin_nested():
+                db.add(CacheVersion(name=name, version=1))
+        except IntegrityError:
+            # Created concurrently; retry the increment on the existing row
+            db.query(CacheVersion).filter(CacheVersion.name == name).update(
+                {CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False
+            )
+    return get_version(db, name)
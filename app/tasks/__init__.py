@@ -2,10 +2,19 @@
 Celery task modules.
 """
 from app.tasks.notifications import create_notification_task, cleanup_old_notifications
-from app.tasks.stories import cleanup_expired_stories
+from app.tasks.stories import cleanup_expired_stories, cleanup_abandoned_uploads
+from app.tasks.media import generate_image_variants_task, purge_media_tombstones
+from app.tasks.suggestions import rebuild_suggestions, refresh_suggestions
+from app.tasks.comments import refresh_top_comments
 
 __all__ = [
     "create_notification_task",
     "cleanup_old_notifications",
     "cleanup_expired_stories",
+    "cleanup_abandoned_uploads",
+    "generate_image_variants_task",
+    "purge_media_tombstones",
+    "rebuild_suggestions",
+    "refresh_suggestions",
+    "refresh_top_comments",
 ]
@@ -0,0 +1,48 @@
+"""
+Celery tasks related to comments (precomputed top comments per post).
+"""
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.post import Post
+from app.services.comment_threads import top_comments_for_posts
+
+REFRESH_BATCH_SIZE = 500
+
+
+@celery_app.task(name="app.tasks.comments.refresh_top_comments")
+def refresh_top_comments(batch_size: int = REFRESH_BATCH_SIZE) -> dict:
+    """Recompute the embedded top comments of posts whose comments changed since the last run."""
+    db = SessionLocal()
+    try:
+        refreshed = 0
+        while True:
+            post_ids = [
+                post_id
+                for (post_id,) in db.query(Post.id)
+                .filter(Post.top_comments_stale == True)
+                .order_by(Post.id)
+                .limit(batch_size)
+                .all()
+            ]
+            if not post_ids:
+                break
+
+            # Clear the flag first: a comment written while we compute marks the post again
+            db.query(Post).filter(Post.id.in_(post_ids)).update(
+                {Post.top_comments_stale: False}, synchronize_session=False
+            )
+            top = top_comments_for_posts(db, post_ids, settings.TOP_COMMENTS_PER_POST)
+            for post_id, comments in top.items():
+                db.query(Post).filter(Post.id == post_id).update(
+                    {Post.top_comments: comments}, synchronize_session=False
+                )
+            db.commit()
+            refreshed += len(post_ids)
+
+        return {"status": "success", "refreshed": refreshed}
+    except Exception:  # pragma: no cover - logged by Celery
+        db.rollback()
+        raise  # Re-raise to let Celery handle retries
+    finally:
+        db.close()
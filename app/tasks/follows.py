@@ -0,0 +1,32 @@
+"""
+Celery tasks for the follow graph change log.
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.social import FollowChange
+
+
+@celery_app.task(name="app.tasks.follows.prune_follow_changes")
+def prune_follow_changes() -> dict:
+    """
+    Drop follow_changes entries older than FOLLOW_CHANGE_LOG_HOURS. A worker that falls
+    further behind than that rebuilds its follow graph from the follows table instead.
+    """
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.FOLLOW_CHANGE_LOG_HOURS)
+        removed = (
+            db.query(FollowChange)
+            .filter(FollowChange.created_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return {"status": "success", "removed": removed}
+    except Exception:  # pragma: no cover - logged by Celery
+        db.rollback()
+        raise  # Re-raise to let Celery handle retries
+    finally:
+        db.close()
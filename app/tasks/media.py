@@ -0,0 +1,173 @@
+"""
+Celery tasks related to uploaded media (image derivatives, deferred deletion).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.media import MediaTombstone
+from app.models.post import Post
+from app.models.social import Story
+from app.models.user import Profile
+from app.services.profile_cache import invalidate_profiles
+from app.utils.image_variants import generate_variants
+from app.utils.media_store import release_reference, unlink_unreferenced
+
+logger = logging.getLogger(__name__)
+
+# kind -> (model, filename column, variants column, upload folder)
+MEDIA_TARGETS = {
+    "post": (Post, "image", "image_variants", "posts"),
+    "profile": (Profile, "profile_picture", "profile_picture_variants", "profiles"),
+    "story": (Story, "image", "image_variants", "stories"),
+}
+
+
+def _store_image_variants(kind: str, object_id: int) -> dict:
+    model, file_field, variants_field, folder = MEDIA_TARGETS[kind]
+    db = SessionLocal()
+    try:
+        obj = db.query(model).filter(model.id == object_id).first()
+        if not obj or not getattr(obj, file_field):
+            return {"status": "skipped", "variants": 0}
+        if kind == "story" and obj.media_type != "image":
+            return {"status": "skipped", "variants": 0}
+
+        filename = getattr(obj, file_field)
+        variants = generate_variants(filename, folder)
+
+        # The file may have been replaced while we were resizing (e.g. a new profile picture)
+        db.refresh(obj)
+        if getattr(obj, file_field) != filename:
+            return {"status": "stale", "variants": 0}
+
+        setattr(obj, variants_field, variants)
+        db.commit()
+        if kind == "profile":
+            invalidate_profiles(obj.user_id)
+        return {"status": "success", "variants": len(variants)}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.media.generate_image_variants")
+def generate_image_variants_task(kind: str, object_id: int) -> dict:
+    """Background task that renders the responsive WebP sizes for an upload."""
+    return _store_image_variants(kind, object_id)
+
+
+def enqueue_image_variants(kind: str, object_id: int) -> None:
+    """
+    Helper used inside API routes.
+    Tries to enqueue the Celery task; if the broker is unreachable,
+    it will fall back to generating the variants synchronously.
+    """
+    try:
+        generate_image_variants_task.delay(kind=kind, object_id=object_id)
+    except Exception:
+        _store_image_variants(kind, object_id)
+
+
+def _unlink(tombstone_id: int, folder: str, path: str):
+    try:
+        unlink_unreferenced(folder, path)
+        return tombstone_id, None
+    except OSError as exc:
+        return tombstone_id, str(exc)
+
+
+@celery_app.task(name="app.tasks.media.purge_media_tombstones")
+def purge_media_tombstones(batch_size: int = None) -> dict:
+    """
+    Drop the file references recorded by deleted posts, stories and profile pictures.
+    Refcounts are released in one transaction, then unreferenced files are unlinked
+    in parallel. Failed unlinks stay queued and are retried on the next run, up to
+    MEDIA_PURGE_MAX_ATTEMPTS times; tombstones that reach the limit are logged and
+    reported as dead.
+    """
+    batch_size = batch_size or settings.MEDIA_PURGE_BATCH_SIZE
+    db = SessionLocal()
+    try:
+        tombstones = (
+            db.query(MediaTombstone)
+            .filter(MediaTombstone.attempts < settings.MEDIA_PURGE_MAX_ATTEMPTS)
+            .order_by(MediaTombstone.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not tombstones:
+            return {"status": "success", "purged": 0, "failed": 0, "dead": 0}
+
+        # Release references first so a retry never decrements the same blob twice.
+        # The conditional update claims each tombstone, so overlapping runs cannot both release it.
+        done_ids = []
+        to_unlink = []
+        for tombstone in tombstones:
+            if not tombstone.released:
+                claimed = (
+                    db.query(MediaTombstone)
+                    .filter(MediaTombstone.id == tombstone.id, MediaTombstone.released.is_(False))
+                    .update({MediaTombstone.released: True}, synchronize_session=False)
+                )
+                if not claimed:
+                    continue
+                if not release_reference(db, tombstone.folder, tombstone.path):
+                    # Still referenced elsewhere: nothing to unlink
+                    done_ids.append(tombstone.id)
+                    continue
+            to_unlink.append((tombstone.id, tombstone.folder, tombstone.path))
+        db.commit()
+
+        with ThreadPoolExecutor(max_workers=settings.MEDIA_PURGE_WORKERS) as pool:
+            results = list(pool.map(lambda job: _unlink(*job), to_unlink))
+
+        attempts = {tombstone.id: tombstone.attempts for tombstone in tombstones}
+        failed = dead = 0
+        for tombstone_id, error in results:
+            if error is None:
+                done_ids.append(tombstone_id)
+            else:
+                db.query(MediaTombstone).filter(MediaTombstone.id == tombstone_id).update(
+                    {
+                        MediaTombstone.attempts: MediaTombstone.attempts + 1,
+                        MediaTombstone.last_error: error,
+                    },
+                    synchronize_session=False,
+                )
+                failed += 1
+                if attempts[tombstone_id] + 1 >= settings.MEDIA_PURGE_MAX_ATTEMPTS:
+                    # No longer retried: the blob keeps its file until someone clears the tombstone
+                    logger.error(
+                        "Giving up on media tombstone %s after %s attempts: %s",
+                        tombstone_id,
+                        settings.MEDIA_PURGE_MAX_ATTEMPTS,
+                        error,
+                    )
+                    dead += 1
+        db.query(MediaTombstone).filter(MediaTombstone.id.in_(done_ids)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        return {"status": "success", "purged": len(done_ids), "failed": failed, "dead": dead}
+    except Exception:  # pragma: no cover - logged by Celery
+        db.rollback()
+        raise  # Re-raise to let Celery handle retries
+    finally:
+        db.close()
+
+
+def enqueue_media_purge() -> None:
+    """
+    Helper used inside API routes after a commit that wrote tombstones.
+    If the broker is unreachable the periodic purge picks them up instead,
+    so deletion never runs on the request path.
+    """
+    try:
+        purge_media_tombstones.delay()
+    except Exception:
+        pass
@@ -2,7 +2,7 @@
 Celery tasks related to notifications.
 """
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import List, Optional
 
 from app.celery_app import celery_app
 from app.core.database import SessionLocal
@@ -90,6 +90,33 @@ def create_notification(
         )
 
 
+@celery_app.task(name="app.tasks.notifications.create_notifications")
+def create_notifications_task(notifications: List[dict]) -> None:
+    """Background task that writes a batch of notifications in one transaction."""
+    db = SessionLocal()
+    try:
+        db.add_all([Notification(is_read=False, **notification) for notification in notifications])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def create_notifications(notifications: List[dict]) -> None:
+    """
+    Batch form of `create_notification` for bulk endpoints: one task for the
+    whole batch. Each dict takes the same keyword arguments.
+    """
+    if not notifications:
+        return
+    try:
+        create_notifications_task.delay(notifications)
+    except Exception:
+        create_notifications_task(notifications)
+
+
 @celery_app.task(name="app.tasks.notifications.cleanup_old_notifications")
 def cleanup_old_notifications(days: int = 30) -> dict:
     """Delete notifications that are read and older than the specified amount of days."""
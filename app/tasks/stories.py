@@ -1,38 +1,95 @@
 """
-Celery tasks related to stories (cleanup expired stories, delete media, etc.).
+Celery tasks related to stories (cleanup expired stories, abandoned uploads, etc.).
 """
-import os
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from app.celery_app import celery_app
+from app.core.config import settings
 from app.core.database import SessionLocal
-from app.models.social import Story
+from app.models.social import Story, StoryExpiry, StoryUpload
+from app.services.story_expiry import as_utc, due_bucket, expiry_bucket
+from app.utils.file_upload import schedule_file_deletion, discard_story_upload
+from app.tasks.media import enqueue_media_purge
+
+REAP_BATCH_SIZE = 500
 
 
 @celery_app.task(name="app.tasks.stories.cleanup_expired_stories")
-def cleanup_expired_stories() -> dict:
-    """Delete expired stories and remove the associated media from disk."""
+def cleanup_expired_stories(batch_size: int = REAP_BATCH_SIZE) -> dict:
+    """
+    Delete stories whose expiry bucket is due and remove the associated media.
+    Only the due range of the bucket index is read, never the whole stories table.
+    """
+    db = SessionLocal()
+    try:
+        due = due_bucket()
+        removed = 0
+        while True:
+            story_ids = [
+                story_id for (story_id,) in db.query(StoryExpiry.story_id)
+                .filter(StoryExpiry.bucket <= due)
+                .order_by(StoryExpiry.bucket)
+                .limit(batch_size)
+                .all()
+            ]
+            if not story_ids:
+                break
+
+            # A row can outlive its story (deleted before bucket rows were cascaded) and then
+            # point at a newer story that reused the id: only expired stories are deleted
+            now = datetime.now(timezone.utc)
+            stories = db.query(Story).filter(Story.id.in_(story_ids)).all()
+            rebucketed = {}
+            for story in stories:
+                if as_utc(story.expires_at) > now:
+                    rebucketed[story.id] = expiry_bucket(story.expires_at)
+                    continue
+                schedule_file_deletion(db, story.image, "stories")
+                db.delete(story)
+                removed += 1
+            for story_id, bucket in rebucketed.items():
+                db.query(StoryExpiry).filter(StoryExpiry.story_id == story_id).update(
+                    {StoryExpiry.bucket: bucket}, synchronize_session=False
+                )
+            # Expired stories take their rows with them; rows whose story is gone are dropped
+            orphaned = set(story_ids) - {story.id for story in stories}
+            if orphaned:
+                db.query(StoryExpiry).filter(StoryExpiry.story_id.in_(orphaned)).delete(
+                    synchronize_session=False
+                )
+            db.commit()
+
+        if removed:
+            enqueue_media_purge()
+        return {"status": "success", "removed": removed}
+    except Exception:  # pragma: no cover - logged by Celery
+        db.rollback()
+        raise  # Re-raise to let Celery handle retries
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.stories.cleanup_abandoned_uploads")
+def cleanup_abandoned_uploads() -> dict:
+    """Delete resumable story uploads that have not received data for a while."""
     db = SessionLocal()
     try:
-        now = datetime.now(timezone.utc)
-        expired = db.query(Story).filter(Story.expires_at <= now).all()
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.STORY_UPLOAD_EXPIRY_HOURS)
+        abandoned = db.query(StoryUpload).filter(StoryUpload.updated_at < cutoff).all()
         removed = 0
 
-        for story in expired:
-            file_path = os.path.join("uploads", "stories", story.image)
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except OSError:
-                    pass
-            db.delete(story)
+        for upload in abandoned:
+            try:
+                discard_story_upload(upload.id)
+            except OSError:
+                pass
+            db.delete(upload)
             removed += 1
 
         db.commit()
         return {"status": "success", "removed": removed}
-    except Exception as exc:  # pragma: no cover - logged by Celery
+    except Exception:  # pragma: no cover - logged by Celery
         db.rollback()
         raise  # Re-raise to let Celery handle retries
     finally:
         db.close()
-
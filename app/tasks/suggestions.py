@@ -0,0 +1,64 @@
+"""
+Celery tasks that (re)compute friends-of-friends suggestions.
+"""
+from app.celery_app import celery_app
+from app.core.database import SessionLocal
+from app.models.social import SuggestionDirtyUser
+from app.models.user import User
+from app.services.suggestions import affected_users, compute_and_store, load_adjacency
+
+
+@celery_app.task(name="app.tasks.suggestions.rebuild_suggestions")
+def rebuild_suggestions() -> dict:
+    """Recompute suggestions for every user from a fresh adjacency matrix."""
+    db = SessionLocal()
+    try:
+        # Anything marked before the snapshot is covered by this run
+        db.query(SuggestionDirtyUser).delete(synchronize_session=False)
+        db.commit()
+
+        adjacency = load_adjacency(db)
+        user_ids = [user_id for (user_id,) in db.query(User.id).all()]
+        users, stored = compute_and_store(db, adjacency, user_ids)
+        return {
+            "status": "success",
+            "users": users,
+            "suggestions": stored,
+            "edges": int(adjacency.nnz),
+        }
+    except Exception:  # pragma: no cover - logged by Celery
+        db.rollback()
+        raise  # Re-raise to let Celery handle retries
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.suggestions.refresh_suggestions")
+def refresh_suggestions() -> dict:
+    """Recompute suggestions only for users whose neighbourhood changed since the last run."""
+    db = SessionLocal()
+    try:
+        # Claim the dirty set up front; follows made while we compute mark users again for the next run
+        changed_ids = [user_id for (user_id,) in db.query(SuggestionDirtyUser.user_id).all()]
+        if not changed_ids:
+            return {"status": "success", "users": 0, "suggestions": 0}
+        db.query(SuggestionDirtyUser).filter(SuggestionDirtyUser.user_id.in_(changed_ids)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+
+        try:
+            adjacency = load_adjacency(db)
+            users, stored = compute_and_store(db, adjacency, affected_users(adjacency, changed_ids))
+        except Exception:
+            db.rollback()
+            for user_id in changed_ids:
+                db.merge(SuggestionDirtyUser(user_id=user_id))
+            db.commit()
+            raise
+        return {"status": "success", "users": users, "suggestions": stored}
+    except Exception:  # pragma: no cover - logged by Celery
+        db.rollback()
+        raise  # Re-raise to let Celery handle retries
+    finally:
+        db.close()
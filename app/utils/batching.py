@@ -0,0 +1,28 @@
+"""
+Request-side helpers for endpoints that take many ids at once.
+"""
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+
+def unique_batch(ids: List[int], noun: str, limit: Optional[int] = None) -> List[int]:
+    """Drop repeated ids (keeping request order) and enforce the per-request batch size."""
+    limit = limit or settings.SOCIAL_BATCH_MAX
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > limit:
+        raise HTTPException(status_code=400, detail=f"At most {limit} {noun} per request")
+    return ids
+
+
+def parse_ids(raw: str, noun: str, limit: Optional[int] = None) -> List[int]:
+    """Parse a comma-separated ``?ids=1,2,3`` value into unique ids in request order."""
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not ids:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+    return unique_batch(ids, noun, limit)
@@ -0,0 +1,197 @@
+"""
+Response compression for API payloads.
+
+``CompressionMiddleware`` negotiates brotli or gzip from ``Accept-Encoding``
+and compresses text-like responses (JSON, NDJSON, text) of at least
+``minimum_size`` bytes. Streamed responses are compressed chunk by chunk and
+flushed, so NDJSON lines still reach the client as they are produced.
+Bodies of ``thread_size`` bytes or more are compressed in a worker thread so a
+large feed or follower list does not hold up the event loop.
+
+Left alone:
+- paths under ``exclude_paths`` (``/uploads``: media is already compressed and
+  served with ranges and zero-copy sends),
+- responses that already have a ``Content-Encoding`` or are not text-like,
+- routes decorated with ``@uncompressed``.
+
+Brotli is optional; without the ``brotli`` package only gzip is offered.
+Compressed responses turn a strong ETag weak, since the bytes differ from the
+identity encoding.
+"""
+import zlib
+from typing import Callable, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def uncompressed(endpoint: Callable) -> Callable:
+    """Route decorator: never compress this endpoint's responses."""
+    endpoint.skip_compression = True
+    return endpoint
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Encodings this worker can produce, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """The available encoding with the highest q-value in `accept_encoding` (brotli wins ties), or None."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[token] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in available_encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class StreamCompressor:
+    """Incremental brotli or gzip stream."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._stream = brotli.Compressor(quality=brotli_quality)
+            self._compress, self._flush, self._finish = (
+                self._stream.process,
+                self._stream.flush,
+                self._stream.finish,
+            )
+        else:
+            self._stream = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            self._compress = self._stream.compress
+            self._flush = lambda: self._stream.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._stream.flush
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        """Compress `data`; the output is flushed so it can be sent on its own."""
+        return self._compress(data) + (self._finish() if last else self._flush())
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        thread_size: int = 64 * 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        exclude_paths: Tuple[str, ...] = ("/uploads",),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_size = thread_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressionResponder(self, scope, encoding, send).send)
+
+
+class _CompressionResponder:
+    """Holds back the response start until the first body chunk shows whether to compress."""
+
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, encoding: str, send: Send):
+        self.middleware = middleware
+        self.scope = scope
+        self.encoding = encoding
+        self._send = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not self._should_compress(len(body), more_body):
+                self.passthrough = True
+                await self._send(self.start)
+                await self._send(message)
+                return
+            self.compressor = StreamCompressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+            )
+            compressed = await self._compress(body, not more_body)
+            self._mark_encoded(None if more_body else len(compressed))
+            await self._send(self.start)
+        else:
+            compressed = await self._compress(body, not more_body)
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    def _should_compress(self, size: int, more_body: bool) -> bool:
+        headers = Headers(raw=self.start["headers"])
+        endpoint = self.scope.get("endpoint")
+        if self.start["status"] < 200 or self.start["status"] in (204, 304):
+            return False
+        if "content-encoding" in headers or getattr(endpoint, "skip_compression", False):
+            return False
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        return more_body or size >= self.middleware.minimum_size
+
+    async def _compress(self, data: bytes, last: bool) -> bytes:
+        if len(data) >= self.middleware.thread_size:
+            return await anyio.to_thread.run_sync(self.compressor.chunk, data, last)
+        return self.compressor.chunk(data, last)
+
+    def _mark_encoded(self, length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
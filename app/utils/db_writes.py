@@ -0,0 +1,145 @@
+"""
+Race-free write helpers for unique rows (likes, follows, story views) and
+for keeping denormalized counters in step with the rows they count.
+
+Inserts use the dialect's conflict-skipping form - ``ON CONFLICT DO NOTHING``
+on SQLite and PostgreSQL, ``INSERT IGNORE`` on MySQL - so "create unless it
+exists" is one statement and two concurrent requests for the same pair never
+surface as an IntegrityError. Where the database supports ``RETURNING`` the
+helpers also report exactly which rows were written. Everything runs in the
+caller's transaction.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+_RETURNING_DIALECTS = ("sqlite", "postgresql")
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _conflict_insert(db: Session, model, conflict_columns: Iterable[str]):
+    """An INSERT that skips rows violating the unique constraint, or None if the dialect has none."""
+    dialect = _dialect(db)
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+        return dialect_insert(model).on_conflict_do_nothing(index_elements=list(conflict_columns))
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        return dialect_insert(model).on_conflict_do_nothing(index_elements=list(conflict_columns))
+    if dialect in ("mysql", "mariadb"):
+        return insert(model).prefix_with("IGNORE")
+    return None
+
+
+def _insert_each(db: Session, model, rows: List[dict]) -> List[Tuple[dict, object]]:
+    """Fallback: one savepoint per row. Returns (row, primary key) for the rows that went in."""
+    inserted = []
+    for row in rows:
+        try:
+            with db.begin_nested():
+                result = db.connection().execute(insert(model), [row])
+            inserted.append((row, result.inserted_primary_key[0]))
+        except IntegrityError:
+            pass
+    return inserted
+
+
+def insert_ignore(db: Session, model, rows: List[dict], conflict_columns: Iterable[str]) -> int:
+    """
+    Insert `rows` in one statement, skipping any that violate the unique
+    constraint over `conflict_columns`. Returns the number of rows inserted.
+    """
+    if not rows:
+        return 0
+    stmt = _conflict_insert(db, model, conflict_columns)
+    if stmt is None:
+        return len(_insert_each(db, model, rows))
+    # Core execution on the session's connection keeps the DBAPI rowcount (the ORM bulk path drops it)
+    return db.connection().execute(stmt, rows).rowcount
+
+
+def insert_ignore_returning(
+    db: Session,
+    model,
+    rows: List[dict],
+    conflict_columns: Sequence[str],
+    returning: Sequence[str] = ("id",),
+) -> List[tuple]:
+    """
+    Like ``insert_ignore`` but returns the `returning` columns of exactly the
+    rows that were inserted (rows that already existed are left out).
+    SQLite and PostgreSQL do this in one statement; elsewhere each row gets a savepoint.
+    """
+    if not rows:
+        return []
+    if _dialect(db) in _RETURNING_DIALECTS:
+        stmt = _conflict_insert(db, model, conflict_columns)
+        stmt = stmt.returning(*[getattr(model, column) for column in returning])
+        return [tuple(row) for row in db.connection().execute(stmt, rows).all()]
+    return [
+        tuple(primary_key if column == "id" else row[column] for column in returning)
+        for row, primary_key in _insert_each(db, model, rows)
+    ]
+
+
+def insert_ignore_one(
+    db: Session, model, values: dict, conflict_columns: Sequence[str]
+) -> Optional[int]:
+    """Insert one row unless it exists, in one statement. Returns the new row's id, or None if it existed."""
+    if _dialect(db) in _RETURNING_DIALECTS:
+        inserted = insert_ignore_returning(db, model, [values], conflict_columns)
+        return inserted[0][0] if inserted else None
+    stmt = _conflict_insert(db, model, conflict_columns)
+    if stmt is None:
+        inserted = _insert_each(db, model, [values])
+        return inserted[0][1] if inserted else None
+    result = db.connection().execute(stmt, [values])
+    return result.lastrowid if result.rowcount else None
+
+
+def delete_returning(
+    db: Session, model, key_columns: Sequence[str], keys: List[tuple]
+) -> List[tuple]:
+    """
+    Delete the rows whose `key_columns` match one of `keys` and return the keys
+    that were actually deleted. One statement on SQLite and PostgreSQL.
+    """
+    if not keys:
+        return []
+    columns = [getattr(model, column) for column in key_columns]
+    condition = tuple_(*columns).in_(keys)
+    if _dialect(db) in _RETURNING_DIALECTS:
+        result = db.connection().execute(delete(model).where(condition).returning(*columns))
+        return [tuple(row) for row in result.all()]
+    # Lock what is about to go so the reported keys match what the DELETE removes
+    found = [
+        tuple(row)
+        for row in db.connection().execute(select(*columns).where(condition).with_for_update())
+    ]
+    if found:
+        db.connection().execute(delete(model).where(tuple_(*columns).in_(found)))
+    return found
+
+
+def add_to_counters(db: Session, counter, deltas: Dict[int, int]) -> None:
+    """
+    Add ``deltas[id]`` to the `counter` column (e.g. ``Story.views_count``) of each row.
+    One UPDATE per distinct delta, which in bulk writes is almost always just +1.
+    """
+    model = counter.class_
+    by_delta = defaultdict(list)
+    for row_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(row_id)
+    for delta, row_ids in by_delta.items():
+        db.query(model).filter(model.id.in_(row_ids)).update(
+            {counter: counter + delta}, synchronize_session=False
+        )
@@ -0,0 +1,40 @@
+"""
+Entity tags for conditional GETs.
+
+Handlers derive an ETag from a few cheap columns and counters that pin what
+the response would contain (``post_versions``, ``user_versions``) instead of
+building the response, and answer a matching ``If-None-Match`` with a bodiless
+304. ETags are strong; compressed responses carry them weakened (see
+``app.utils.compression``), so matching uses the weak comparison.
+"""
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+# Responses are per viewer: clients may keep a copy but must revalidate it
+REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of `etag` against an If-None-Match header value."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def conditional(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Tag `response` with `etag`; returns the 304 to send instead when the client's copy is current."""
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,70 @@
+"""
+Sparse fieldsets: ``?fields=id,image`` on list endpoints.
+
+The hydrators (``build_posts``, ``build_users``, ``build_stories``) take the
+parsed set and only run the queries behind the fields that were asked for.
+Sparse results are built on a copy of the response model whose fields are all
+optional, so field validators (e.g. variant URLs) still apply, and are
+serialized with just the requested keys (``model_list_response``).
+"""
+from functools import lru_cache
+from typing import Iterable, List, Optional, Set, Type
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, create_model
+
+from app.utils.responses import model_list_response
+
+FIELDS_DESCRIPTION = (
+    "Comma-separated response fields to return (default: all); `id` is always included"
+)
+
+
+def parse_fields(raw: Optional[str], model: Type[BaseModel]) -> Optional[Set[str]]:
+    """The requested top-level fields of `model`, or None for all of them. Unknown names are a 400."""
+    if raw is None:
+        return None
+    fields = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = fields - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    fields.add("id")
+    return fields
+
+
+def wants(fields: Optional[Set[str]], *names: str) -> bool:
+    """Whether any of `names` is part of the response."""
+    return fields is None or any(name in fields for name in names)
+
+
+@lru_cache(maxsize=None)
+def partial_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """A subclass of `model` with every field optional, for building sparse results."""
+    return create_model(
+        f"Partial{model.__name__}",
+        __base__=model,
+        **{name: (Optional[field.annotation], None) for name, field in model.model_fields.items()},
+    )
+
+
+def response_model_for(model: Type[BaseModel], fields: Optional[Set[str]]) -> Type[BaseModel]:
+    return model if fields is None else partial_model(model)
+
+
+def sparse_response(
+    items: List[BaseModel], fields: Optional[Set[str]], response: Optional[Response] = None
+):
+    """Serialize built list items, keeping only `fields` when a fieldset was requested."""
+    return model_list_response(items, response, include=fields)
+
+
+def only(values: dict, fields: Optional[Set[str]]) -> dict:
+    """Drop the entries of `values` that were not requested."""
+    if fields is None:
+        return values
+    return {name: value for name, value in values.items() if name in fields}
+
+
+def column_names(fields: Optional[Set[str]], columns: Iterable[str]) -> List[str]:
+    """The model columns among `columns` that the requested fields need."""
+    return [name for name in columns if fields is None or name in fields]
@@ -1,8 +1,14 @@
+import glob
 import os
+import shutil
 import uuid
+from contextlib import contextmanager
 from pathlib import Path
 from fastapi import UploadFile, HTTPException
+from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.models.media import MediaTombstone
+from app.utils.media_store import store_upload, release, temp_path_for
 
 async def save_upload_file(upload_file: UploadFile, folder: str) -> str:
     """Save an uploaded file and return its filename"""
@@ -15,74 +21,84 @@ async def save_upload_file(upload_file: UploadFile, folder: str) -> str:
             detail=f"Invalid file type. Allowed types: {', '.join(settings.ALLOWED_IMAGE_EXTENSIONS)}"
         )
     
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join("uploads", folder, unique_filename)
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    # Stream into the content-addressed store (size is validated while streaming)
+    return await store_upload(upload_file, folder, file_ext, settings.MAX_FILE_SIZE)
+
+# Allowed story media
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
+VIDEO_EXTENSIONS = ['.mp4', '.mov', '.avi', '.webm', '.mkv']
+
+def check_media_filename(filename: str) -> tuple:
+    """Validate a media filename and return (file_ext, media_type, max_size)"""
+    file_ext = Path(filename or "").suffix.lower()
     
-    # Read and validate file size
-    contents = await upload_file.read()
-    if len(contents) > settings.MAX_FILE_SIZE:
+    if file_ext not in IMAGE_EXTENSIONS + VIDEO_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / (1024*1024)}MB"
+            detail=(
+                f"Invalid file type. Allowed types: images ({', '.join(IMAGE_EXTENSIONS)}) "
+                f"or videos ({', '.join(VIDEO_EXTENSIONS)})"
+            )
         )
     
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    return unique_filename
+    media_type = "image" if file_ext in IMAGE_EXTENSIONS else "video"
+    max_size = settings.MAX_FILE_SIZE * 5 if media_type == "video" else settings.MAX_FILE_SIZE  # 5x larger for videos
+    return file_ext, media_type, max_size
 
 async def save_media_file(upload_file: UploadFile, folder: str) -> tuple:
     """Save an uploaded media file (image or video) and return (filename, media_type)"""
+    file_ext, media_type, max_size = check_media_filename(upload_file.filename)
     
-    # Check file extension
-    file_ext = Path(upload_file.filename).suffix.lower()
-    
-    # Define allowed extensions
-    image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-    video_extensions = ['.mp4', '.mov', '.avi', '.webm', '.mkv']
-    allowed_extensions = image_extensions + video_extensions
-    
-    if file_ext not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Allowed types: images ({', '.join(image_extensions)}) or videos ({', '.join(video_extensions)})"
-        )
-    
-    # Determine media type
-    media_type = "image" if file_ext in image_extensions else "video"
-    
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join("uploads", folder, unique_filename)
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    # Stream into the content-addressed store
+    filename = await store_upload(upload_file, folder, file_ext, max_size)
     
-    # Read and validate file size (allow larger files for videos)
-    contents = await upload_file.read()
-    max_size = settings.MAX_FILE_SIZE * 5 if media_type == "video" else settings.MAX_FILE_SIZE  # 5x larger for videos
-    
-    if len(contents) > max_size:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size for {media_type}: {max_size / (1024*1024):.1f}MB"
-        )
-    
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    return unique_filename, media_type
+    return filename, media_type
 
 def delete_file(filename: str, folder: str):
-    """Delete a file from the uploads folder"""
+    """Release a reference to an uploaded file; the last reference removes it (and its variants)"""
     if filename:
-        file_path = os.path.join("uploads", folder, filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        release(folder, filename)
+
+@contextmanager
+def release_on_failure(db: Session, filename: str, folder: str):
+    """
+    Wrap the commit of the row that points at a freshly stored file. Storing takes its
+    reference in a transaction of its own, so if the block fails the reference is dropped
+    again rather than keeping the blob alive forever.
+    """
+    try:
+        yield
+    except BaseException:
+        db.rollback()
+        delete_file(filename, folder)
+        raise
+
+def schedule_file_deletion(db: Session, filename: str, folder: str):
+    """
+    Record that a file reference should be dropped. The tombstone is committed (or rolled
+    back) together with the caller's transaction and purged later by a Celery task.
+    """
+    if filename:
+        db.add(MediaTombstone(folder=folder, path=filename))
+
+
+def story_upload_path(upload_id: str) -> str:
+    """Where the bytes of a resumable story upload accumulate until it is finalized"""
+    return temp_path_for(f"{upload_id}.upload")
+
+def story_segment_path(upload_id: str) -> str:
+    """A private file for the bytes of one chunk PUT, appended once it claims its offset"""
+    return temp_path_for(f"{upload_id}.{uuid.uuid4().hex}.segment")
+
+def append_story_segment(upload_id: str, segment_path: str, offset: int):
+    """Write a received segment into the partial file at `offset`, dropping anything after it"""
+    with open(story_upload_path(upload_id), "r+b") as f, open(segment_path, "rb") as segment:
+        f.seek(offset)
+        f.truncate()
+        shutil.copyfileobj(segment, f)
 
+def discard_story_upload(upload_id: str):
+    """Remove an abandoned upload's partial file and any segments left by dropped workers"""
+    for path in [story_upload_path(upload_id)] + glob.glob(temp_path_for(f"{upload_id}.*.segment")):
+        if os.path.exists(path):
+            os.remove(path)
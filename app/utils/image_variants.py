@@ -0,0 +1,89 @@
+"""
+Helpers for generating resized WebP derivatives of uploaded images.
+
+Variants live next to the original under ``uploads/<folder>/variants`` and are
+named ``<stem>_<width>w.webp``. The database stores the mapping of width to the
+path relative to the folder, the API exposes it as ``/uploads/...`` URLs.
+"""
+import glob
+import os
+from pathlib import PurePosixPath
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+VARIANTS_DIR = "variants"
+
+
+def variant_filename(filename: str, width: int) -> str:
+    """Return the variant path (relative to the upload folder) for a width."""
+    stem = PurePosixPath(filename).with_suffix("")
+    return str(PurePosixPath(VARIANTS_DIR) / f"{stem}_{width}w.webp")
+
+
+def generate_variants(filename: str, folder: str) -> Dict[str, str]:
+    """
+    Create the configured WebP widths for an uploaded image.
+    Never upscales; animated images are skipped so clients keep the original.
+    Returns {"<width>": "<relative path>"}.
+    """
+    source_path = os.path.join("uploads", folder, filename)
+    if not os.path.exists(source_path):
+        return {}
+
+    try:
+        return _render_variants(filename, source_path, folder)
+    except OSError:
+        # Not a decodable image (or disk error); the original is still served as-is
+        return {}
+
+
+def _render_variants(filename: str, source_path: str, folder: str) -> Dict[str, str]:
+    variants = {}
+    with Image.open(source_path) as img:
+        if getattr(img, "is_animated", False):
+            return {}
+
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+        widths = sorted({w for w in settings.IMAGE_VARIANT_WIDTHS if w <= img.width})
+        if not widths:
+            # Smaller than every configured width: still re-encode for the size win
+            widths = [img.width]
+
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+            relative_path = variant_filename(filename, width)
+            target_path = os.path.join("uploads", folder, relative_path)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            resized.save(target_path, "WEBP", quality=settings.IMAGE_VARIANT_QUALITY, method=4)
+            variants[str(width)] = relative_path
+
+    return variants
+
+
+def delete_variants(filename: str, folder: str):
+    """Delete every variant derived from an original file."""
+    if not filename:
+        return
+    stem = glob.escape(str(PurePosixPath(filename).with_suffix("")))
+    for path in glob.glob(os.path.join("uploads", folder, VARIANTS_DIR, f"{stem}_*w.webp")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def variant_urls(folder: str, variants: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Turn stored relative variant paths into URLs served under /uploads."""
+    if not variants:
+        return {}
+    return {
+        width: path if path.startswith("/") else f"/uploads/{folder}/{path}"
+        for width, path in variants.items()
+    }
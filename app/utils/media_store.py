@@ -0,0 +1,202 @@
+"""
+Content-addressed storage for uploaded media.
+
+Files are named after the SHA-256 of their bytes and fanned out over two
+levels of directories (``uploads/posts/ab/cd/abcd...ef.png``), so identical
+uploads are stored once and no single directory grows unbounded. Every stored
+file has a ``media_blobs`` row whose ``refcount`` tracks how many posts,
+profiles or stories point at it; the bytes are only unlinked when the last
+reference is released.
+"""
+import hashlib
+import os
+import uuid
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.exc import IntegrityError
+
+from app.core.database import SessionLocal
+from app.models.media import MediaBlob
+from app.utils.image_variants import delete_variants
+
+UPLOAD_ROOT = "uploads"
+TMP_DIR = os.path.join(UPLOAD_ROOT, ".tmp")
+CHUNK_SIZE = 1024 * 1024
+
+
+def shard_path(digest: str, ext: str) -> str:
+    """Relative path for a digest: 2 levels of 256-way fan-out."""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def _absolute(folder: str, path: str) -> str:
+    return os.path.join(UPLOAD_ROOT, folder, *path.split("/"))
+
+
+def _temp_path() -> str:
+    return temp_path_for(f"{uuid.uuid4()}.part")
+
+
+def temp_path_for(name: str) -> str:
+    """Path for an in-flight file in the (unserved) temp directory."""
+    os.makedirs(TMP_DIR, exist_ok=True)
+    return os.path.join(TMP_DIR, name)
+
+
+def hash_file(file_path: str) -> tuple:
+    """Return (sha256 hexdigest, size) of a file on disk."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+async def store_upload(upload_file: UploadFile, folder: str, ext: str, max_size: int) -> str:
+    """
+    Stream an upload to disk while hashing it, then move it to its
+    content-addressed location. Returns the path relative to the folder.
+    """
+    temp_path = _temp_path()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as f:
+            while chunk := await upload_file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File too large. Maximum size: {max_size / (1024*1024):.1f}MB",
+                    )
+                digest.update(chunk)
+                f.write(chunk)
+        return commit_file(temp_path, folder, ext, digest.hexdigest(), size)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def store_file(source_path: str, folder: str, ext: str) -> str:
+    """Move an existing file on disk into the store. Returns the relative path."""
+    digest, size = hash_file(source_path)
+    return commit_file(source_path, folder, ext, digest, size)
+
+
+def commit_file(source_path: str, folder: str, ext: str, digest: str, size: int) -> str:
+    """Take a reference on the blob for `digest` and make sure its bytes are in place."""
+    path = shard_path(digest, ext)
+    acquire(folder, path, digest, size)
+
+    target = _absolute(folder, path)
+    if os.path.exists(target):
+        os.remove(source_path)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source_path, target)
+    return path
+
+
+def acquire(folder: str, path: str, digest: str, size: int) -> None:
+    """Add one reference to a blob, creating its row on first use."""
+    db = SessionLocal()
+    try:
+        for _ in range(2):
+            updated = (
+                db.query(MediaBlob)
+                .filter(MediaBlob.folder == folder, MediaBlob.path == path)
+                .update({MediaBlob.refcount: MediaBlob.refcount + 1}, synchronize_session=False)
+            )
+            if updated:
+                db.commit()
+                return
+            try:
+                db.add(MediaBlob(folder=folder, path=path, sha256=digest, size=size, refcount=1))
+                db.commit()
+                return
+            except IntegrityError:
+                # Someone stored the same bytes concurrently; take a reference on theirs
+                db.rollback()
+        raise RuntimeError(f"Could not reference media blob {folder}/{path}")
+    finally:
+        db.close()
+
+
+def release(folder: str, path: Optional[str]) -> bool:
+    """
+    Drop one reference to a file. The bytes (and their resized variants) are
+    unlinked only when no references remain. Files that predate the store and
+    have no blob row are unlinked directly. Returns True if the file was removed.
+    """
+    if not path:
+        return False
+
+    db = SessionLocal()
+    try:
+        unreferenced = release_reference(db, folder, path)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return unlink_unreferenced(folder, path) if unreferenced else False
+
+
+def release_reference(db, folder: str, path: str) -> bool:
+    """
+    Decrement a blob's refcount inside the caller's transaction.
+    Returns True when nothing references the file any more (including legacy files without a row).
+    """
+    blob = db.query(MediaBlob).filter(MediaBlob.folder == folder, MediaBlob.path == path).first()
+    if blob is None:
+        return True
+
+    db.query(MediaBlob).filter(MediaBlob.id == blob.id).update(
+        {MediaBlob.refcount: MediaBlob.refcount - 1}, synchronize_session=False
+    )
+    deleted = (
+        db.query(MediaBlob)
+        .filter(MediaBlob.id == blob.id, MediaBlob.refcount <= 0)
+        .delete(synchronize_session=False)
+    )
+    return bool(deleted)
+
+
+def unlink_unreferenced(folder: str, path: str) -> bool:
+    """Remove an unreferenced file and its variants. Idempotent; returns True if bytes were removed."""
+    target = _absolute(folder, path)
+    if not os.path.exists(target):
+        delete_variants(path, folder)
+        return False
+
+    # Move aside first so a concurrent upload of the same bytes can re-create the file,
+    # then put it back if that upload took a new reference in the meantime.
+    trash = f"{target}.{uuid.uuid4().hex}.deleting"
+    os.replace(target, trash)
+
+    db = SessionLocal()
+    try:
+        referenced = (
+            db.query(MediaBlob.id)
+            .filter(MediaBlob.folder == folder, MediaBlob.path == path)
+            .first()
+            is not None
+        )
+    finally:
+        db.close()
+
+    if referenced:
+        if not os.path.exists(target):
+            os.replace(trash, target)
+        else:
+            os.remove(trash)
+        return False
+
+    os.remove(trash)
+    delete_variants(path, folder)
+    return True
@@ -0,0 +1,43 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor is the sort key of the last row on a page, url-safe base64 encoded
+so clients treat it as a token. The next page continues strictly after that
+key, so page cost does not depend on how deep the client has scrolled.
+"""
+import base64
+import json
+from typing import Any, Callable, List, Optional
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*key: Any) -> str:
+    raw = json.dumps(list(key), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], *types: Callable) -> Optional[List[Any]]:
+    """
+    Return the key stored in `cursor`, or None for the first page.
+    Each key part is converted with the matching callable in `types`
+    (e.g. ``decode_cursor(cursor, int)``). Malformed cursors are a 400.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+        if not isinstance(key, list) or len(key) != len(types):
+            raise ValueError(cursor)
+        return [convert(part) for convert, part in zip(types, key)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def set_next_cursor(response: Response, cursor: Optional[str]) -> None:
+    """Expose the next page's cursor; absent on the last page."""
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
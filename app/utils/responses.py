@@ -0,0 +1,94 @@
+"""
+Fast JSON and NDJSON responses for large lists.
+
+Returning models from a handler makes FastAPI validate them again against
+``response_model`` and then encode them through ``jsonable_encoder`` and the
+standard-library ``json``. Handlers that have already built their response
+models return ``model_list_response(...)`` instead: the list is serialized
+once, by pydantic-core, straight to bytes. ``response_model`` stays on the
+route for the OpenAPI schema.
+
+Clients that send ``Accept: application/x-ndjson`` to a streaming endpoint get
+one JSON object per line from ``ndjson_stream``, written as rows come off the
+database cursor, so the whole list is never held in memory.
+"""
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Set
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: type) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def _carried_headers(response: Optional[Response]) -> dict:
+    """Headers set on the injected `response` (e.g. X-Next-Cursor), which returning a Response would drop."""
+    if response is None:
+        return {}
+    return {
+        name: value
+        for name, value in response.headers.items()
+        if name not in ("content-length", "content-type")
+    }
+
+
+def model_list_response(
+    items: Sequence[BaseModel],
+    response: Optional[Response] = None,
+    include: Optional[Set[str]] = None,
+) -> Response:
+    """Serialize already-built response models in one pass, optionally keeping only `include` fields."""
+    body = b"[]"
+    if items:
+        body = _list_adapter(type(items[0])).dump_json(
+            list(items), include={"__all__": include} if include is not None else None
+        )
+    return Response(content=body, media_type="application/json", headers=_carried_headers(response))
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_stream(
+    make_query: Callable[[Session], Query],
+    render: Callable[[Session, list], Iterable[BaseModel]],
+    response: Optional[Response] = None,
+    chunk_size: Optional[int] = None,
+) -> StreamingResponse:
+    """
+    Stream `make_query(db)` as NDJSON. Rows are fetched `chunk_size` at a time
+    and turned into models by `render(db, rows)`, so per-row lookups can still
+    be batched. The stream outlives the request's session, so it runs on one
+    of its own.
+    """
+    chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+
+    def lines() -> Iterator[bytes]:
+        db = SessionLocal()
+        try:
+            rows = iter(make_query(db).yield_per(chunk_size))
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                yield b"".join(
+                    item.__pydantic_serializer__.to_json(item) + b"\n" for item in render(db, chunk)
+                )
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        lines(), media_type=NDJSON_MEDIA_TYPE, headers=_carried_headers(response)
+    )
@@ -0,0 +1,83 @@
+"""
+In-process write-behind buffer.
+
+Request handlers append items and return immediately; a daemon thread hands
+everything accumulated to `flush_fn` every `interval` seconds (or as soon as
+`max_items` are waiting), so many small writes become one transaction. Items
+that fail to flush are kept for the next attempt. Call `stop()` on shutdown
+to write out whatever is still pending.
+"""
+import logging
+import threading
+from typing import Callable, Generic, Hashable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=Hashable)
+
+
+class WriteBuffer(Generic[T]):
+    def __init__(self, flush_fn: Callable[[List[T]], object], interval: float, max_items: int):
+        self._flush_fn = flush_fn
+        self._interval = interval
+        self._max_items = max_items
+        self._items: dict = (
+            {}
+        )  # insertion-ordered set: duplicates collapse before they reach the DB
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, items: List[T]) -> None:
+        with self._lock:
+            for item in items:
+                self._items[item] = None
+            pending = len(self._items)
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(target=self._run, name="write-buffer", daemon=True)
+                self._thread.start()
+        if pending >= self._max_items:
+            self._wakeup.set()
+
+    def pending(self) -> List[T]:
+        with self._lock:
+            return list(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def flush(self):
+        """Write out everything pending now; returns `flush_fn`'s result (None if nothing was pending)."""
+        with self._flush_lock:
+            with self._lock:
+                items, self._items = list(self._items), {}
+            if not items:
+                return None
+            try:
+                return self._flush_fn(items)
+            except Exception:
+                with self._lock:
+                    # Keep the failed batch ahead of anything added meanwhile
+                    self._items = {**dict.fromkeys(items), **self._items}
+                raise
+
+    def stop(self) -> None:
+        """Stop the background thread and flush what is left."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._interval * 2)
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write buffer flush failed; retrying on the next interval")
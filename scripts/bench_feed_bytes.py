@@ -0,0 +1,107 @@
+"""
+Benchmark image bytes served per feed page: originals vs responsive variants.
+Run: python scripts/bench_feed_bytes.py [--page-size 20] [--width 320]
+or:  python scripts/bench_feed_bytes.py --synthetic 20   (no database needed)
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+
+def pick_variant(variants: dict, width: int):
+    """Smallest variant at least `width` wide, else the largest one available."""
+    if not variants:
+        return None
+    sizes = sorted(int(w) for w in variants)
+    chosen = next((w for w in sizes if w >= width), sizes[-1])
+    return variants[str(chosen)]
+
+
+def measure(files, width: int):
+    """files: list of (filename, variants) under uploads/posts"""
+    original = served = 0
+    for filename, variants in files:
+        original_size = os.path.getsize(os.path.join("uploads", "posts", filename))
+        variant = pick_variant(variants, width)
+        original += original_size
+        served += (
+            os.path.getsize(os.path.join("uploads", "posts", variant)) if variant else original_size
+        )
+    return original, served
+
+
+def synthetic_files(count: int):
+    from PIL import Image
+    from app.utils.image_variants import generate_variants
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_feed_"))
+    os.makedirs(os.path.join("uploads", "posts"))
+    files = []
+    started = time.perf_counter()
+    for i in range(count):
+        img = Image.effect_noise((1080, 1080), random.randint(20, 80)).convert("RGB")
+        filename = f"synthetic-{i}.png"
+        img.save(os.path.join("uploads", "posts", filename), "PNG")
+        files.append((filename, generate_variants(filename, "posts")))
+    elapsed = time.perf_counter() - started
+    print(
+        f"Derived variants for {count} images in {elapsed:.2f}s ({elapsed / count * 1000:.1f} ms/image)"
+    )
+    return files
+
+
+def database_files(page_size: int):
+    from sqlalchemy import desc
+    from app.core.database import SessionLocal
+    from app.models.post import Post
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Post.image, Post.image_variants)
+            .order_by(desc(Post.timestamp))
+            .limit(page_size)
+            .all()
+        )
+    finally:
+        db.close()
+    return [
+        (image, variants or {})
+        for image, variants in rows
+        if os.path.exists(os.path.join("uploads", "posts", image))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--width", type=int, default=320, help="tile width the client renders")
+    parser.add_argument(
+        "--synthetic", type=int, default=0, help="generate N images instead of using the DB"
+    )
+    args = parser.parse_args()
+
+    if args.synthetic:
+        files = synthetic_files(args.synthetic)
+    else:
+        os.chdir(backend_dir)
+        files = database_files(args.page_size)
+
+    if not files:
+        print("No post images found; try --synthetic 20")
+        return
+
+    original, served = measure(files, args.width)
+    print(f"Feed page of {len(files)} posts at {args.width}px tiles")
+    print(f"  originals: {original / 1024:10.1f} KiB")
+    print(f"  variants:  {served / 1024:10.1f} KiB  ({served / original * 100:.1f}% of original)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark list response encoding on synthetic rows: FastAPI's default path
+(re-validate against response_model, jsonable_encoder, json.dumps) against
+the one-pass ``model_list_response`` and the NDJSON line encoding used for
+streams. No database is needed.
+Run: python scripts/bench_json_responses.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+
+def synthetic_rows(rows: int):
+    from app.schemas.notification import NotificationResponse
+    from app.schemas.social import FollowerInfo
+
+    now = datetime.now()
+    followers = [
+        FollowerInfo(
+            id=i,
+            username=f"user{i}",
+            profile_picture=f"ab/cd/{i:064x}.jpg",
+            is_following=i % 3 == 0,
+        )
+        for i in range(rows)
+    ]
+    notifications = [
+        NotificationResponse(
+            id=i,
+            recipient_id=1,
+            sender_id=i,
+            notification_type="like",
+            message=f"user{i} liked your post",
+            post_id=i % 500,
+            is_read=i % 2 == 0,
+            timestamp=now - timedelta(seconds=i),
+            sender_username=f"user{i}",
+            sender_profile_picture=f"ab/cd/{i:064x}.jpg",
+        )
+        for i in range(rows)
+    ]
+    return [
+        ("followers", FollowerInfo, followers),
+        ("notifications", NotificationResponse, notifications),
+    ]
+
+
+def best_of(repeat: int, encode) -> tuple:
+    """Fastest of `repeat` runs in ms, and the encoded size."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from app.utils.responses import model_list_response
+
+    for name, model, items in synthetic_rows(args.rows):
+        field = create_response_field(name="response", type_=List[model])
+
+        def default_path():
+            content = asyncio.run(
+                serialize_response(field=field, response_content=items, is_coroutine=False)
+            )
+            return JSONResponse(content).body
+
+        def one_pass():
+            return model_list_response(items).body
+
+        def ndjson():
+            return b"".join(item.__pydantic_serializer__.to_json(item) + b"\n" for item in items)
+
+        baseline, baseline_size = best_of(args.repeat, default_path)
+        print(f"{name} ({args.rows} rows)")
+        print(
+            f"  {'response_model + json':<24} {baseline:8.1f} ms  {baseline_size / 1024:8.0f} KiB"
+        )
+        for label, encode in (("model_list_response", one_pass), ("ndjson lines", ndjson)):
+            elapsed, size = best_of(args.repeat, encode)
+            print(
+                f"  {label:<24} {elapsed:8.1f} ms  {size / 1024:8.0f} KiB  ({baseline / elapsed:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark /uploads throughput: plain StaticFiles vs MediaStaticFiles.
+Starts one uvicorn server per implementation against the same files and
+measures full downloads, 1 MiB range reads (video seeking) and revalidations.
+Run: python scripts/bench_media_serving.py [--requests 200] [--concurrency 16]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+import httpx
+
+IMAGE_SIZE = 2 * 1024 * 1024
+VIDEO_SIZE = 25 * 1024 * 1024
+
+
+def serve(kind: str, directory: str, port: int):
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.staticfiles import StaticFiles
+    from app.utils.media_files import MediaStaticFiles
+
+    static_class = MediaStaticFiles if kind == "media" else StaticFiles
+    app = Starlette(routes=[Mount("/uploads", static_class(directory=directory))])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def wait_until_up(url: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+async def run_scenario(url: str, total: int, concurrency: int, headers_for):
+    transferred = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=60) as client:
+
+        async def one(i):
+            nonlocal transferred
+            async with semaphore:
+                response = await client.get(url, headers=headers_for(i))
+                transferred += len(response.content)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+    return total / elapsed, transferred / elapsed / (1024 * 1024)
+
+
+async def bench(base_url: str, total: int, concurrency: int):
+    image_url = f"{base_url}/uploads/posts/image.jpg"
+    video_url = f"{base_url}/uploads/stories/video.mp4"
+    async with httpx.AsyncClient() as client:
+        etag = (await client.head(image_url)).headers.get("etag", "")
+
+    chunk = 1024 * 1024
+    scenarios = {
+        "full image": (image_url, lambda i: {}),
+        "video 1MiB seeks": (
+            video_url,
+            lambda i: {
+                "Range": f"bytes={(i * chunk) % (VIDEO_SIZE - chunk)}-{(i * chunk) % (VIDEO_SIZE - chunk) + chunk - 1}"
+            },
+        ),
+        "revalidate (ETag)": (image_url, lambda i: {"If-None-Match": etag}),
+    }
+    results = {}
+    for name, (url, headers_for) in scenarios.items():
+        results[name] = await run_scenario(url, total, concurrency, headers_for)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_media_")
+    for folder, name, size in (
+        ("posts", "image.jpg", IMAGE_SIZE),
+        ("stories", "video.mp4", VIDEO_SIZE),
+    ):
+        os.makedirs(os.path.join(directory, folder))
+        with open(os.path.join(directory, folder, name), "wb") as f:
+            f.write(os.urandom(size))
+
+    servers = {"StaticFiles": ("static", 8811), "MediaStaticFiles": ("media", 8812)}
+    processes = []
+    try:
+        for kind, port in servers.values():
+            process = multiprocessing.Process(
+                target=serve, args=(kind, directory, port), daemon=True
+            )
+            process.start()
+            processes.append(process)
+
+        for label, (_, port) in servers.items():
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_until_up(base_url + "/uploads/posts/image.jpg"))
+            results = asyncio.run(bench(base_url, args.requests, args.concurrency))
+            print(f"\n{label}")
+            for name, (rps, mib_per_s) in results.items():
+                print(f"  {name:<20} {rps:8.1f} req/s {mib_per_s:9.1f} MiB/s")
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark bytes on the wire per list page with and without response
+compression: a feed page of posts, a followers page and a notifications page,
+built from synthetic rows and encoded the way the API sends them. Reports the
+identity size, then gzip and brotli (when installed) sizes and compression
+times at the configured levels. No database is needed.
+Run: python scripts/bench_response_compression.py [--feed-size 20] [--page-size 50] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+
+def picture(rng: random.Random) -> str:
+    digest = "%064x" % rng.getrandbits(256)
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+
+
+def synthetic_pages(feed_size: int, page_size: int, seed: int):
+    from app.schemas.notification import NotificationResponse
+    from app.schemas.post import PostResponse, TagResponse, TopComment
+    from app.schemas.social import FollowerInfo
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    authors = [
+        (user_id, f"user_{user_id}", picture(rng)) for user_id in rng.sample(range(1, 100_000), 40)
+    ]
+    words = "sunset beach coffee friends weekend city travel food music morning".split()
+
+    posts = []
+    for post_id in range(feed_size):
+        user_id, username, avatar = rng.choice(authors)
+        image = picture(rng)
+        stem = image.rsplit(".", 1)[0]
+        posts.append(
+            PostResponse(
+                id=post_id,
+                user_id=user_id,
+                caption=" ".join(rng.choices(words, k=rng.randint(3, 15))),
+                image=image,
+                image_variants={str(w): f"{stem}_{w}w.webp" for w in (150, 320, 640, 1080)},
+                is_published=True,
+                timestamp=now - timedelta(minutes=post_id * 7),
+                username=username,
+                user_profile_picture=avatar,
+                likes_count=rng.randint(0, 5000),
+                comments_count=rng.randint(0, 300),
+                tags=[
+                    TagResponse(id=i, name=word, created_at=now)
+                    for i, word in enumerate(rng.sample(words, 2))
+                ],
+                is_liked=rng.random() < 0.3,
+                top_comments=[
+                    TopComment(
+                        id=post_id * 10 + i,
+                        user_id=commenter[0],
+                        username=commenter[1],
+                        user_profile_picture=commenter[2],
+                        text=" ".join(rng.choices(words, k=6)),
+                        timestamp=now,
+                        replies_count=rng.randint(0, 20),
+                    )
+                    for i, commenter in enumerate(rng.sample(authors, 2))
+                ],
+            )
+        )
+    followers = [
+        FollowerInfo(
+            id=user_id, username=username, profile_picture=avatar, is_following=rng.random() < 0.4
+        )
+        for user_id, username, avatar in (rng.choice(authors) for _ in range(page_size))
+    ]
+    notifications = []
+    for notification_id in range(page_size):
+        user_id, username, avatar = rng.choice(authors)
+        kind = rng.choice(["like", "comment", "follow"])
+        notifications.append(
+            NotificationResponse(
+                id=notification_id,
+                recipient_id=1,
+                sender_id=user_id,
+                notification_type=kind,
+                message=f"{username} {'liked your post' if kind == 'like' else 'commented on your post' if kind == 'comment' else 'started following you'}",
+                post_id=None if kind == "follow" else rng.randint(1, 500),
+                is_read=rng.random() < 0.5,
+                timestamp=now - timedelta(minutes=notification_id),
+                sender_username=username,
+                sender_profile_picture=avatar,
+            )
+        )
+    return [
+        ("feed page", posts),
+        ("followers page", followers),
+        ("notifications page", notifications),
+    ]
+
+
+def timed(repeat: int, compress, body: bytes):
+    """Compressed size and best-of-`repeat` time in ms."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = compress(body)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(out), best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--feed-size", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    from app.utils.compression import StreamCompressor, available_encodings
+    from app.utils.responses import model_list_response
+
+    for name, items in synthetic_pages(args.feed_size, args.page_size, args.seed):
+        body = model_list_response(items).body
+        print(f"{name} ({len(items)} items): identity {len(body):,} bytes")
+        for encoding in available_encodings():
+
+            def compress(data, encoding=encoding):
+                return StreamCompressor(
+                    encoding, settings.GZIP_LEVEL, settings.BROTLI_QUALITY
+                ).chunk(data, last=True)
+
+            size, elapsed = timed(args.repeat, compress, body)
+            print(f"  {encoding:<5} {size:>9,} bytes  {size / len(body):6.1%}  {elapsed:6.2f} ms")
+    if "br" not in available_encodings():
+        print("(brotli not installed: gzip only)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark the friends-of-friends suggestion build on a synthetic follow graph.
+Follow targets are drawn from a Zipf-like distribution so a few accounts are
+very popular, as in a real social graph. No database is needed.
+Run: python scripts/bench_suggestions.py [--users 100000] [--edges 1000000] [--sample 0]
+"""
+import argparse
+import os
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+import numpy as np
+
+
+def synthetic_edges(users: int, edges: int, seed: int):
+    rng = np.random.default_rng(seed)
+    followers = rng.integers(1, users + 1, size=edges)
+    # Popularity ~ 1 / rank^0.8, ranks shuffled so popular ids are spread out
+    weights = 1.0 / np.arange(1, users + 1) ** 0.8
+    targets = rng.choice(rng.permutation(users) + 1, size=edges, p=weights / weights.sum())
+    pairs = np.unique(np.stack([followers, targets], axis=1), axis=0)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    return pairs[:, 0], pairs[:, 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--edges", type=int, default=1_000_000)
+    parser.add_argument(
+        "--sample", type=int, default=0, help="only score N random users (0 = everyone)"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    from app.services.suggestions import build_adjacency, top_mutuals
+
+    started = time.perf_counter()
+    followers, targets = synthetic_edges(args.users, args.edges, args.seed)
+    print(
+        f"Generated {len(followers):,} unique follows among {args.users:,} users "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+    started = time.perf_counter()
+    adjacency = build_adjacency(followers, targets, args.users + 1)
+    print(
+        f"Adjacency build: {time.perf_counter() - started:.2f}s "
+        f"({adjacency.data.nbytes + adjacency.indices.nbytes + adjacency.indptr.nbytes:,} bytes)"
+    )
+
+    user_ids = np.arange(1, args.users + 1)
+    if args.sample:
+        user_ids = np.sort(
+            np.random.default_rng(args.seed).choice(user_ids, args.sample, replace=False)
+        )
+
+    batch = settings.SUGGESTIONS_BATCH_ROWS
+    started = time.perf_counter()
+    scored = with_suggestions = 0
+    for offset in range(0, len(user_ids), batch):
+        results = top_mutuals(
+            adjacency, user_ids[offset : offset + batch], settings.SUGGESTIONS_TOP_K
+        )
+        scored += len(results)
+        with_suggestions += sum(1 for suggestions in results.values() if suggestions)
+    elapsed = time.perf_counter() - started
+    print(
+        f"Top-{settings.SUGGESTIONS_TOP_K} for {scored:,} users: {elapsed:.2f}s "
+        f"({elapsed / scored * 1e6:.0f} us/user, batches of {batch})"
+    )
+    print(f"  {with_suggestions:,} users got at least one suggestion")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Move existing flat uploads (uploads/<folder>/<uuid>.<ext>) into the
+content-addressed store, deduplicating identical files, then rebuild the
+media_blobs reference counts from the posts, profiles and stories tables.
+Safe to re-run. Run it while traffic is low.
+Run: python scripts/migrate_media_store.py [--dry-run] [--delete-orphans]
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.core.database import SessionLocal
+from app.models.media import MediaBlob
+from app.tasks.media import MEDIA_TARGETS
+from app.utils.image_variants import variant_filename
+from app.utils.media_store import UPLOAD_ROOT, hash_file, shard_path
+
+
+def migrate_rows(db, dry_run: bool):
+    """Point every row with a flat filename at its sharded, hashed path."""
+    moved = deduplicated = missing = 0
+    bytes_saved = 0
+    seen = set()
+
+    for kind, (model, file_field, variants_field, folder) in MEDIA_TARGETS.items():
+        column = getattr(model, file_field)
+        rows = db.query(model).filter(column.isnot(None), ~column.contains("/")).all()
+        for row in rows:
+            filename = getattr(row, file_field)
+            source = os.path.join(UPLOAD_ROOT, folder, filename)
+            if not os.path.exists(source):
+                missing += 1
+                continue
+
+            digest, size = hash_file(source)
+            new_path = shard_path(digest, os.path.splitext(filename)[1].lower())
+            target = os.path.join(UPLOAD_ROOT, folder, *new_path.split("/"))
+
+            duplicate = (folder, new_path) in seen or os.path.exists(target)
+            seen.add((folder, new_path))
+            if duplicate:
+                deduplicated += 1
+                bytes_saved += size
+            moved += 1
+
+            if dry_run:
+                continue
+            if duplicate:
+                os.remove(source)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(source, target)
+            _move_variants(row, variants_field, folder, new_path)
+            setattr(row, file_field, new_path)
+        db.commit()
+        print(f"   {kind}: {len(rows)} rows checked")
+
+    return moved, deduplicated, missing, bytes_saved
+
+
+def _move_variants(row, variants_field, folder, new_path):
+    variants = getattr(row, variants_field) or {}
+    moved = {}
+    for width, old_variant in variants.items():
+        new_variant = variant_filename(new_path, int(width))
+        old_abs = os.path.join(UPLOAD_ROOT, folder, *old_variant.split("/"))
+        new_abs = os.path.join(UPLOAD_ROOT, folder, *new_variant.split("/"))
+        if os.path.exists(old_abs):
+            os.makedirs(os.path.dirname(new_abs), exist_ok=True)
+            os.replace(old_abs, new_abs)
+        if os.path.exists(new_abs):
+            moved[width] = new_variant
+    setattr(row, variants_field, moved or None)
+
+
+def rebuild_refcounts(db):
+    """Recount references so media_blobs matches what the tables point at."""
+    references = Counter()
+    for model, file_field, _, folder in MEDIA_TARGETS.values():
+        column = getattr(model, file_field)
+        for (path,) in db.query(column).filter(column.contains("/")).all():
+            references[(folder, path)] += 1
+
+    existing = {(blob.folder, blob.path): blob for blob in db.query(MediaBlob).all()}
+    for (folder, path), count in references.items():
+        blob = existing.pop((folder, path), None)
+        if blob is None:
+            absolute = os.path.join(UPLOAD_ROOT, folder, *path.split("/"))
+            if not os.path.exists(absolute):
+                continue
+            digest, size = hash_file(absolute)
+            db.add(MediaBlob(folder=folder, path=path, sha256=digest, size=size, refcount=count))
+        else:
+            blob.refcount = count
+
+    # Blobs nobody references any more
+    for blob in existing.values():
+        blob.refcount = 0
+    db.commit()
+    return len(references), len(existing)
+
+
+def find_orphans(db):
+    """Flat files left in the upload folders that no row references."""
+    referenced = set()
+    for model, file_field, _, folder in MEDIA_TARGETS.values():
+        for (path,) in db.query(getattr(model, file_field)).all():
+            referenced.add((folder, path))
+
+    orphans = []
+    for folder in {target[3] for target in MEDIA_TARGETS.values()}:
+        directory = os.path.join(UPLOAD_ROOT, folder)
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_file() and (folder, entry.name) not in referenced:
+                orphans.append(entry.path)
+    return orphans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="report what would change")
+    parser.add_argument(
+        "--delete-orphans", action="store_true", help="remove unreferenced flat files"
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print("📦 Migrating flat uploads into the content-addressed store...")
+        moved, deduplicated, missing, bytes_saved = migrate_rows(db, args.dry_run)
+        print(
+            f"✅ {moved} files {'would move' if args.dry_run else 'moved'}, {missing} missing on disk"
+        )
+        print(f"   {deduplicated} duplicates, {bytes_saved / (1024*1024):.1f}MB reclaimed")
+        if args.dry_run:
+            return
+
+        referenced, unreferenced = rebuild_refcounts(db)
+        print(f"🔢 Reference counts rebuilt for {referenced} blobs ({unreferenced} unreferenced)")
+
+        orphans = find_orphans(db)
+        print(f"🧹 {len(orphans)} unreferenced flat files")
+        if args.delete_orphans:
+            for path in orphans:
+                os.remove(path)
+            print("   deleted")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Re-derive responsive WebP variants for media that already exists on disk.
+Resizing runs in a process pool; database updates happen in this process.
+Run: python scripts/rebuild_image_variants.py [--kind post|profile|story] [--workers 4] [--all]
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sqlalchemy import JSON, or_
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.core.database import SessionLocal
+from app.tasks.media import MEDIA_TARGETS
+from app.utils.image_variants import generate_variants
+
+
+def collect_jobs(db, kinds, only_missing: bool):
+    """Return (kind, object_id, filename, folder) tuples that need variants."""
+    jobs = []
+    for kind in kinds:
+        model, file_field, variants_field, folder = MEDIA_TARGETS[kind]
+        query = db.query(model.id, getattr(model, file_field)).filter(
+            getattr(model, file_field).isnot(None)
+        )
+        if kind == "story":
+            query = query.filter(model.media_type == "image")
+        if only_missing:
+            # Rows cleared before the columns were none_as_null hold a JSON 'null' rather than NULL
+            variants = getattr(model, variants_field)
+            query = query.filter(or_(variants.is_(None), variants == JSON.NULL))
+        jobs.extend((kind, object_id, filename, folder) for object_id, filename in query.all())
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kind", choices=sorted(MEDIA_TARGETS), action="append")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--all", action="store_true", help="re-derive even if variants exist")
+    args = parser.parse_args()
+
+    kinds = args.kind or sorted(MEDIA_TARGETS)
+    db = SessionLocal()
+    try:
+        jobs = collect_jobs(db, kinds, only_missing=not args.all)
+        print(f"🖼️  Deriving variants for {len(jobs)} files with {args.workers} workers...")
+
+        done = 0
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(generate_variants, filename, folder): (kind, object_id, filename)
+                for kind, object_id, filename, folder in jobs
+            }
+            for future in as_completed(futures):
+                kind, object_id, filename = futures[future]
+                model, file_field, variants_field, _ = MEDIA_TARGETS[kind]
+                obj = db.query(model).filter(model.id == object_id).first()
+                if obj is None or getattr(obj, file_field) != filename:
+                    continue
+                setattr(obj, variants_field, future.result())
+                done += 1
+                if done % 200 == 0:
+                    db.commit()
+                    print(f"   {done}/{len(jobs)}")
+        db.commit()
+        print(f"✅ Updated {done} records")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Hammer one (user, post) like, one follow and one story view from many threads
+at once and check that exactly one row is written, no IntegrityError escapes
+and the denormalized counters match the rows. `--naive` runs the old
+SELECT-then-INSERT path instead to show the race it had.
+Uses a throwaway SQLite database unless --database-url is given.
+Run: python scripts/stress_upserts.py [--threads 32] [--rounds 20] [--naive]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument(
+        "--rounds", type=int, default=20, help="times every thread repeats the write"
+    )
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument(
+        "--naive", action="store_true", help="check-then-insert instead of the upsert helpers"
+    )
+    return parser.parse_args()
+
+
+def hammer(threads: int, rounds: int, write) -> Counter:
+    """Run `write()` from `threads` threads released together; tally what each call reported."""
+    outcomes = Counter()
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker():
+        start.wait()
+        for _ in range(rounds):
+            try:
+                result = "inserted" if write() else "skipped"
+            except Exception as exc:
+                result = type(exc).__name__
+            with lock:
+                outcomes[result] += 1
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return outcomes
+
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(), "stress.db"
+    )
+
+    from app.core.database import Base, SessionLocal, engine
+    from app.models.post import Post
+    from app.models.social import Follow, Like, Story, StoryView
+    from app.models.user import User
+    from app.utils.db_writes import add_to_counters, insert_ignore_one
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    users = [
+        User(username=f"stress{i}", email=f"stress{i}@example.com", password_hash="x")
+        for i in range(2)
+    ]
+    db.add_all(users)
+    db.flush()
+    post = Post(user_id=users[1].id, image="stress.png")
+    story = Story(
+        user_id=users[1].id,
+        image="stress.png",
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+    )
+    db.add_all([post, story])
+    db.commit()
+    liker, author, post_id, story_id = users[0].id, users[1].id, post.id, story.id
+    db.close()
+
+    def upsert(model, values, conflict_columns, counter=None, row_id=None):
+        def write():
+            session = SessionLocal()
+            try:
+                if args.naive:
+                    filters = [
+                        getattr(model, column) == values[column] for column in conflict_columns
+                    ]
+                    if session.query(model.id).filter(*filters).first():
+                        return False
+                    session.add(model(**values))
+                    session.flush()
+                    inserted = True
+                else:
+                    inserted = (
+                        insert_ignore_one(session, model, values, conflict_columns) is not None
+                    )
+                if inserted and counter is not None:
+                    add_to_counters(session, counter, {row_id: 1})
+                session.commit()
+                return inserted
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+        return write
+
+    targets = [
+        (
+            "like",
+            Like,
+            Like.post_id,
+            post_id,
+            upsert(
+                Like,
+                {"user_id": liker, "post_id": post_id},
+                ("user_id", "post_id"),
+                Post.likes_count,
+                post_id,
+            ),
+            lambda session: session.query(Post.likes_count).filter(Post.id == post_id).scalar(),
+        ),
+        (
+            "follow",
+            Follow,
+            Follow.follower_id,
+            liker,
+            upsert(
+                Follow,
+                {"follower_id": liker, "following_id": author},
+                ("follower_id", "following_id"),
+            ),
+            None,
+        ),
+        (
+            "story view",
+            StoryView,
+            StoryView.story_id,
+            story_id,
+            upsert(
+                StoryView,
+                {"story_id": story_id, "viewer_id": liker},
+                ("story_id", "viewer_id"),
+                Story.views_count,
+                story_id,
+            ),
+            lambda session: session.query(Story.views_count).filter(Story.id == story_id).scalar(),
+        ),
+    ]
+
+    print(
+        f"{args.threads} threads x {args.rounds} rounds per pair "
+        f"({'check-then-insert' if args.naive else 'upsert'}) on {engine.dialect.name}"
+    )
+    failed = False
+    for name, model, key_column, key, write, read_counter in targets:
+        outcomes = hammer(args.threads, args.rounds, write)
+        session = SessionLocal()
+        rows = session.query(model).filter(key_column == key).count()
+        counter = read_counter(session) if read_counter else None
+        session.close()
+        errors = {
+            outcome: n for outcome, n in outcomes.items() if outcome not in ("inserted", "skipped")
+        }
+        ok = rows == 1 and outcomes["inserted"] == 1 and not errors and counter in (None, 1)
+        failed |= not ok
+        print(
+            f"  {name:<10} inserted={outcomes['inserted']} skipped={outcomes['skipped']} rows={rows}"
+            + (f" counter={counter}" if counter is not None else "")
+            + (f" errors={errors}" if errors else "")
+            + ("  OK" if ok else "  FAILED")
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()